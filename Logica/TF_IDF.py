@@ -1,8 +1,14 @@
 import json
 import math
+import os
 import sys
 from pathlib import Path
 
+import numpy as np
+
+# Versão do formato do índice completo gravado em JSONs/indice_tfidf
+VERSAO_INDICE = 1
+
 #Aqui ele força a busca de todos os arquivos
 def find_file(name: str) -> Path:
 	script_dir = Path(__file__).resolve().parent
@@ -80,6 +86,55 @@ def top_terms_per_doc(tfidf_per_doc: dict, topk: int = 10):
 		out.append({'DocId': docid, 'Terms': formatted})
 	return out
 
+#Aqui ele grava o índice completo (todos os termos, não só os top-k) em arquivos .npy que a busca abre com mmap:
+#vocabulário ordenado + idf, matriz documento x termo em CSR, a mesma matriz termo x documento (CSC) e as normas L2 de cada documento
+def gravar_indice_completo(tfidf_per_doc: dict, idf: dict, out_dir: Path):
+	out_dir.mkdir(parents=True, exist_ok=True)
+	vocab = sorted(idf.keys())
+	term_id = {t: i for i, t in enumerate(vocab)}
+	doc_ids = sorted(tfidf_per_doc.keys())
+	indptr = [0]
+	indices = []
+	pesos = []
+	for docid in doc_ids:
+		for token, weight in sorted(tfidf_per_doc[docid].items(), key=lambda kv: term_id[kv[0]]):
+			if weight == 0:
+				continue
+			indices.append(term_id[token])
+			pesos.append(weight)
+		indptr.append(len(indices))
+	indptr = np.asarray(indptr, dtype=np.int64)
+	indices = np.asarray(indices, dtype=np.int32)
+	pesos64 = np.asarray(pesos, dtype=np.float64)
+	linhas = np.repeat(np.arange(len(doc_ids), dtype=np.int32), np.diff(indptr))
+	normas = np.sqrt(np.bincount(linhas, weights=pesos64 * pesos64, minlength=len(doc_ids)))
+	ordem = np.argsort(indices, kind='stable')
+	col_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+	np.cumsum(np.bincount(indices, minlength=len(vocab)), out=col_ptr[1:])
+	arrays = {
+		'doc_ids': np.asarray(doc_ids, dtype=np.int64),
+		'idf': np.asarray([idf[t] for t in vocab], dtype=np.float32),
+		'indptr': indptr,
+		'indices': indices,
+		'pesos': pesos64.astype(np.float32),
+		'normas': normas.astype(np.float32),
+		'col_ptr': col_ptr,
+		'col_linhas': linhas[ordem],
+		'col_pesos': pesos64[ordem].astype(np.float32),
+	}
+	#cada arquivo é gravado num .tmp e trocado com os.replace (quem já mapeou o antigo continua lendo o antigo);
+	#o vocabulario.json vai por último e leva os tamanhos, pra quem carregar conferir que os arrays são da mesma geração
+	for nome, arr in arrays.items():
+		tmp = out_dir / f'{nome}.npy.tmp'
+		with tmp.open('wb') as f:
+			np.save(f, arr)
+		os.replace(tmp, out_dir / f'{nome}.npy')
+	tmp = out_dir / 'vocabulario.json.tmp'
+	with tmp.open('w', encoding='utf-8') as f:
+		json.dump({'versao': VERSAO_INDICE, 'n_docs': len(doc_ids), 'nnz': int(len(indices)), 'termos': vocab}, f, ensure_ascii=False)
+	os.replace(tmp, out_dir / 'vocabulario.json')
+	return out_dir
+
 #Agora ele busca as outras informações como autor, titulo, etc e organiza tudo junto de acordo com o seu documento
 def main(argv):
 	import argparse
@@ -87,6 +142,8 @@ def main(argv):
 	parser.add_argument('--input', '-i', help='Caminho para dados_tokenizados.json (opcional).')
 	parser.add_argument('--topk', '-k', type=int, default=10, help='Número de termos significativos por documento (padrão 10).')
 	parser.add_argument('--output', '-o', help='Caminho de saída para termos (JSON).')
+	parser.add_argument('--metadados', '-m', help='Caminho do metadados.json (padrão: procurado a partir do script).')
+	parser.add_argument('--indice-dir', help='Pasta de saída do índice completo em binário (padrão: indice_tfidf ao lado do JSON de entrada).')
 	args = parser.parse_args(argv)
 	try:
 		input_path = Path(args.input) if args.input else find_file('dados_tokenizados.json')
@@ -102,7 +159,7 @@ def main(argv):
 	topk = args.topk if args.topk and args.topk > 0 else 10
 	result = top_terms_per_doc(tfidf_per_doc, topk=topk)
 	try:
-		meta_path = find_file('metadados.json')
+		meta_path = Path(args.metadados) if args.metadados else find_file('metadados.json')
 		with meta_path.open('r', encoding='utf-8') as mf:
 			metas = json.load(mf)
 		meta_map = {int(m.get('DocId')): m for m in metas}
@@ -123,9 +180,14 @@ def main(argv):
 		})
 	result = enriched
 	out_path = Path(args.output) if args.output else (input_path.parent / 'termos_significativos.json')
-	with out_path.open('w', encoding='utf-8') as f:
+	tmp = out_path.with_name(out_path.name + '.tmp')
+	with tmp.open('w', encoding='utf-8') as f:
 		json.dump(result, f, ensure_ascii=False, indent=2)
+	os.replace(tmp, out_path)
 	print(f"TF-IDF calculado para {len(docs)} documentos. Top {topk} termos por documento gravados em: {out_path}")
+	indice_dir = Path(args.indice_dir) if args.indice_dir else (input_path.parent / 'indice_tfidf')
+	gravar_indice_completo(tfidf_per_doc, idf, indice_dir)
+	print(f"Índice completo com {len(idf)} termos gravado em: {indice_dir}")
 	return 0
 if __name__ == '__main__':
 	raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,133 @@
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import FrozenSet, Iterable, List, Set, Tuple
+
+palavra_re = re.compile(r"\w+", flags=re.UNICODE)
+
+TAMANHO_CACHE = 65536
+# Sobe quando as regras da análise mudam: o manifesto do build (construcao.py) refaz os artefatos que dependem dela
+VERSAO_ANALISE = 2
+STOPWORDS_PADRAO = Path(__file__).parent.parent.resolve() / "stopwords.txt"
+
+# Regras do radicalizador leve (redução de plural e de feminino, no estilo do RSLP), já sem acento.
+# Cada regra é (sufixo, troca, tamanho mínimo do radical, exceções); vale a primeira que casar, na ordem
+_REGRAS_PLURAL: Tuple[Tuple[str, str, int, FrozenSet[str]], ...] = (
+    ("ns", "m", 1, frozenset()),
+    ("oes", "ao", 3, frozenset()),
+    ("aes", "ao", 1, frozenset({"maes"})),
+    ("ais", "al", 1, frozenset({"cais", "mais", "pais"})),
+    ("aises", "ais", 1, frozenset()),
+    # hipóteses/teses são plural de -tese; os outros -eses são de -ês (portugueses -> portugues, meses -> mes)
+    ("teses", "tese", 1, frozenset()),
+    ("eses", "es", 1, frozenset()),
+    ("eis", "el", 2, frozenset()),
+    ("ois", "ol", 2, frozenset({"pois", "depois", "dois"})),
+    ("is", "il", 2, frozenset({"lapis", "cais", "mais", "crucis", "biquinis", "tenis", "gratis", "oasis", "leis"})),
+    ("res", "r", 3, frozenset()),
+    ("zes", "z", 2, frozenset()),
+    ("s", "", 2, frozenset({"atlas", "simples", "tres", "portugues", "ingles", "frances", "japones", "chines",
+                            "holandes", "escoces", "irlandes", "burgues", "campones", "marques"})),
+)
+# Terminações que não são plural (classe -> classes sim, mas "congresso"/"bonus" não perdem o s)
+_SEM_PLURAL = ("ss", "us")
+_REGRAS_FEMININO: Tuple[Tuple[str, str, int, FrozenSet[str]], ...] = (
+    ("ona", "ao", 3, frozenset()),
+    ("ora", "or", 3, frozenset()),
+    ("inha", "inho", 3, frozenset({"rainha", "linha", "minha"})),
+    ("osa", "oso", 3, frozenset()),
+    ("iaca", "iaco", 3, frozenset()),
+    ("ica", "ico", 3, frozenset({"dica"})),
+    ("ada", "ado", 2, frozenset({"pitada"})),
+    ("ida", "ido", 3, frozenset({"vida", "duvida"})),
+    ("ima", "imo", 3, frozenset({"vitima"})),
+    ("iva", "ivo", 3, frozenset({"saliva", "oliva"})),
+    ("eira", "eiro", 3, frozenset({"beira", "cadeira", "bandeira", "feira", "capoeira", "barreira", "fronteira", "poeira", "cachoeira"})),
+)
+
+
+#Tira os acentos (violência -> violencia, ç -> c)
+def dobrar_acentos(texto: str) -> str:
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def _aplicar(termo: str, regras) -> str:
+    for sufixo, troca, minimo, excecoes in regras:
+        if termo.endswith(sufixo):
+            if termo in excecoes:
+                return termo
+            if len(termo) - len(sufixo) >= minimo:
+                return termo[:len(termo) - len(sufixo)] + troca
+            return termo
+    return termo
+
+
+#Radicalizador leve: só tira o plural e leva o feminino pro masculino (torcidas -> torcido, jogadoras -> jogador)
+def radical(termo: str) -> str:
+    if len(termo) < 4:
+        return termo
+    if not termo.endswith(_SEM_PLURAL):
+        termo = _aplicar(termo, _REGRAS_PLURAL)
+    return _aplicar(termo, _REGRAS_FEMININO)
+
+
+#Aqui fica a cadeia de análise usada igual na indexação e nas consultas: quebra em palavras, minúsculo, tira acento,
+#tira stopword e radicaliza. O resultado de cada palavra fica num cache LRU (o vocabulário repete muito)
+class Analisador:
+    def __init__(self, stopwords: Iterable[str] = ()):
+        self.stopwords: FrozenSet[str] = frozenset(dobrar_acentos(s.lower()) for s in stopwords)
+        self.termo = lru_cache(maxsize=TAMANHO_CACHE)(self._termo)
+
+    #Termo de índice de uma palavra; "" se ela (ou o radical dela, como dias -> dia) for stopword
+    def _termo(self, palavra: str) -> str:
+        t = dobrar_acentos(palavra.lower())
+        if t in self.stopwords:
+            return ""
+        r = radical(t)
+        return "" if r in self.stopwords else r
+
+    def termos(self, texto: str) -> List[str]:
+        out = []
+        for p in palavra_re.findall(texto):
+            t = self.termo(p)
+            if t:
+                out.append(t)
+        return out
+
+    #Mesmos termos do termos(), com a posição (início, fim) de cada palavra no texto original (usado nos trechos)
+    def trechos(self, texto: str) -> List[Tuple[int, int, str]]:
+        out = []
+        for m in palavra_re.finditer(texto):
+            t = self.termo(m.group(0))
+            if t:
+                out.append((m.start(), m.end(), t))
+        return out
+
+
+def carregar_stopwords(path: Path) -> Set[str]:
+    with Path(path).open(encoding='utf-8') as f:
+        return {line.strip().lower() for line in f if line.strip()}
+
+
+@lru_cache(maxsize=8)
+def _analisador_de(stopwords: FrozenSet[str]) -> Analisador:
+    return Analisador(stopwords)
+
+
+#Um analisador por conjunto de stopwords (o cache por palavra é compartilhado entre quem usa as mesmas)
+def obter_analisador(stopwords: Iterable[str]) -> Analisador:
+    return _analisador_de(frozenset(stopwords))
+
+
+#O analisador das consultas: as stopwords do stopwords.txt da raiz, as mesmas que o pipeline usa por padrão
+@lru_cache(maxsize=1)
+def analisador_padrao() -> Analisador:
+    return obter_analisador(carregar_stopwords(STOPWORDS_PADRAO) if STOPWORDS_PADRAO.exists() else ())
+
+
+#Primeira palavra em minúsculo, sem análise: pra termos que já vieram analisados dos arquivos do índice
+def primeira_palavra(texto: str) -> str:
+    m = palavra_re.search(texto.lower())
+    return m.group(0) if m else ""
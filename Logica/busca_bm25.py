@@ -0,0 +1,256 @@
+import heapq
+import math
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .busca_espaco_vetorial import _build_query_vector
+    from .TF_IDF import load_tokenized
+    from .correcao_termos import CorretorTermos, corrigir_vetor
+except ImportError:
+    from busca_espaco_vetorial import _build_query_vector
+    from TF_IDF import load_tokenized
+    from correcao_termos import CorretorTermos, corrigir_vetor
+
+K1_PADRAO = 1.2
+B_PADRAO = 0.75
+
+# Lista de um termo: (posições densas ordenadas, impacto de cada posting, maior impacto)
+Lista = Tuple[Sequence[int], Sequence[float], float]
+
+
+#Aqui ele monta o índice do BM25: pra cada termo a lista de documentos (posições densas, ordenadas) e o "impacto"
+#já calculado de cada posting (a contribuição do termo pro score daquele documento), mais o maior impacto do termo,
+#que é o limite superior usado pelo MaxScore pra pular documentos que não têm como entrar no top_k.
+#Num shard, estatisticas ({"n_docs", "media_tamanho", "df"} do corpus inteiro) substitui N, o tamanho médio e o df
+#locais, pra o score de cada documento ser o mesmo do índice sem shards
+class IndiceBM25:
+    def __init__(self, docs: Dict[int, Dict[str, int]], k1: float = K1_PADRAO, b: float = B_PADRAO,
+                 estatisticas: Optional[Dict] = None):
+        self.k1 = k1
+        self.b = b
+        # opcional: quem souber corrigir termos fora do vocabulário (montado só quando aparece um)
+        self.corretor: Optional[Callable[[], CorretorTermos]] = None
+        self.doc_ids = sorted(docs.keys())
+        n = len(self.doc_ids)
+        self.tamanhos = [sum(docs[d].values()) for d in self.doc_ids]
+        self.media_tamanho = (sum(self.tamanhos) / n) if n else 0.0
+        dfs: Dict[str, int] = {}
+        if estatisticas is not None:
+            n = estatisticas["n_docs"]
+            self.media_tamanho = estatisticas["media_tamanho"]
+            dfs = estatisticas["df"]
+
+        tfs: Dict[str, List] = {}
+        for pos, doc_id in enumerate(self.doc_ids):
+            for termo, tf in docs[doc_id].items():
+                if tf > 0:
+                    tfs.setdefault(termo, []).append((pos, tf))
+
+        self.postings: Dict[str, List[int]] = {}
+        self.impactos: Dict[str, List[float]] = {}
+        self.max_impacto: Dict[str, float] = {}
+        self.idf: Dict[str, float] = {}
+        for termo, lista in tfs.items():
+            idf = self._idf(n, dfs.get(termo, len(lista)))
+            self.idf[termo] = idf
+            self.postings[termo] = [pos for pos, _ in lista]
+            imp = [self._impacto(idf, tf, self.tamanhos[pos]) for pos, tf in lista]
+            self.impactos[termo] = imp
+            self.max_impacto[termo] = max(imp)
+        # termos do corpus que não aparecem aqui: sem postings, mas conhecidos (não viram correção)
+        for termo, df in dfs.items():
+            if termo not in self.idf:
+                self.idf[termo] = self._idf(n, df)
+
+    @staticmethod
+    def _idf(n: int, df: int) -> float:
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def _impacto(self, idf: float, tf: float, tamanho: int) -> float:
+        if self.media_tamanho > 0:
+            norm = 1.0 - self.b + self.b * tamanho / self.media_tamanho
+        else:
+            norm = 1.0
+        return idf * tf * (self.k1 + 1.0) / (tf + self.k1 * norm)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    #Termo do vocabulário do corpus (os de fora passam pelo corretor)
+    def conhece(self, termo: str) -> bool:
+        return termo in self.idf
+
+    def _lista(self, termo: str) -> Optional[Lista]:
+        postings = self.postings.get(termo)
+        if postings is None:
+            return None
+        return postings, self.impactos[termo], self.max_impacto[termo]
+
+    #Busca document-at-a-time com MaxScore: os termos são ordenados pelo limite superior; os de menor limite cuja soma
+    #não passa do limiar atual (o k-ésimo melhor score) viram "não essenciais" e só são consultados por busca binária
+    #nos documentos que saíram das listas essenciais e ainda podem superar o limiar.
+    #filtro (posições densas ordenadas, vindas das facetas ou de uma expressão booleana) restringe os documentos antes
+    #de pontuar: se ele for menor que as listas dos termos, pontua só os documentos dele por busca binária; senão o
+    #MaxScore pula os que não estão nele
+    def buscar(self, query: str, top_k: Optional[int] = 10, filtro: Optional[Sequence[int]] = None) -> List[Dict]:
+        query_vec = corrigir_vetor(_build_query_vector(query), self.conhece, self.corretor)
+        return self.buscar_vetor(query_vec, top_k, filtro)
+
+    #Mesma busca, com os termos já analisados ({termo: peso na consulta}); termos fora do índice são ignorados
+    def buscar_vetor(self, query_vec: Dict[str, float], top_k: Optional[int] = 10,
+                     filtro: Optional[Sequence[int]] = None) -> List[Dict]:
+        do_termo = {}
+        for t in query_vec:
+            lista = self._lista(t)
+            if lista is not None:
+                do_termo[t] = lista
+        termos = list(do_termo)
+        if not termos or (filtro is not None and not len(filtro)):
+            return []
+        k = top_k if top_k else len(self.doc_ids)
+        if filtro is not None and len(filtro) * len(termos) < sum(len(do_termo[t][0]) for t in termos):
+            return self._buscar_filtrados(do_termo, query_vec, k, filtro)
+        permitido = None
+        if filtro is not None:
+            permitido = bytearray(len(self.doc_ids))
+            for p in filtro:
+                permitido[p] = 1
+        termos.sort(key=lambda t: do_termo[t][2] * query_vec[t])
+        pesos = [query_vec[t] for t in termos]
+        listas = [do_termo[t][0] for t in termos]
+        impactos = [do_termo[t][1] for t in termos]
+        limites = [do_termo[t][2] * w for t, w in zip(termos, pesos)]
+        acumulado = []
+        soma = 0.0
+        for lim in limites:
+            soma += lim
+            acumulado.append(soma)
+
+        cursores = [0] * len(termos)
+        heap: List = []
+        limiar = 0.0
+        primeiro_essencial = 0
+        fim = len(self.doc_ids)
+
+        while True:
+            # documento candidato: o menor documento atual entre as listas essenciais
+            doc = fim
+            for i in range(primeiro_essencial, len(termos)):
+                c = cursores[i]
+                if c < len(listas[i]) and listas[i][c] < doc:
+                    doc = listas[i][c]
+            if doc == fim:
+                break
+            if permitido is not None and not permitido[doc]:
+                for i in range(primeiro_essencial, len(termos)):
+                    c = cursores[i]
+                    if c < len(listas[i]) and listas[i][c] == doc:
+                        cursores[i] = c + 1
+                continue
+
+            score = 0.0
+            for i in range(primeiro_essencial, len(termos)):
+                c = cursores[i]
+                if c < len(listas[i]) and listas[i][c] == doc:
+                    score += impactos[i][c] * pesos[i]
+                    cursores[i] = c + 1
+
+            # completa com os não essenciais, do maior limite pro menor, parando se já não dá pra passar o limiar
+            for i in range(primeiro_essencial - 1, -1, -1):
+                if len(heap) >= k and score + acumulado[i] <= limiar:
+                    break
+                lista = listas[i]
+                c = bisect_left(lista, doc, cursores[i])
+                cursores[i] = c
+                if c < len(lista) and lista[c] == doc:
+                    score += impactos[i][c] * pesos[i]
+
+            item = (score, -doc)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+            else:
+                continue
+            if len(heap) >= k:
+                limiar = heap[0][0]
+                while primeiro_essencial < len(termos) and acumulado[primeiro_essencial] <= limiar:
+                    primeiro_essencial += 1
+
+        heap.sort(reverse=True)
+        return [{'DocId': self.doc_ids[-neg], 'score': score} for score, neg in heap]
+
+    #Filtro pequeno: cada documento dele procura o próprio posting em cada lista por busca binária
+    def _buscar_filtrados(self, do_termo: Dict[str, Lista], query_vec: Dict[str, float], k: int,
+                          filtro: Sequence[int]) -> List[Dict]:
+        heap: List = []
+        for doc in filtro:
+            doc = int(doc)
+            score = 0.0
+            for t, (lista, impactos, _) in do_termo.items():
+                c = bisect_left(lista, doc)
+                if c < len(lista) and lista[c] == doc:
+                    score += impactos[c] * query_vec[t]
+            if score <= 0.0:
+                continue
+            item = (score, -doc)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        heap.sort(reverse=True)
+        return [{'DocId': self.doc_ids[-neg], 'score': score} for score, neg in heap]
+
+
+#BM25 servido do indice.bin mapeado (ou do CorpusVivo, com os segmentos por cima): as listas e os tamanhos dos
+#documentos vêm do arquivo, e os impactos de um termo são calculados (em numpy, com a mesma conta do _impacto) na
+#primeira consulta que usa o termo. N e o nº de tokens vêm do cabeçalho; nada do corpus é lido na abertura
+class IndiceBM25Binario(IndiceBM25):
+    def __init__(self, fonte, k1: float = K1_PADRAO, b: float = B_PADRAO, estatisticas: Optional[Dict] = None):
+        self.k1 = k1
+        self.b = b
+        self.corretor: Optional[Callable[[], CorretorTermos]] = None
+        self.fonte = fonte
+        self.doc_ids = fonte.doc_ids
+        self.n = len(self.doc_ids)
+        self.media_tamanho = (fonte.n_tokens / self.n) if self.n else 0.0
+        self._dfs: Optional[Dict[str, int]] = None
+        if estatisticas is not None:
+            self.n = estatisticas["n_docs"]
+            self.media_tamanho = estatisticas["media_tamanho"]
+            self._dfs = estatisticas["df"]
+        self._listas: Dict[str, Optional[Lista]] = {}
+
+    def conhece(self, termo: str) -> bool:
+        if self._dfs is not None:
+            return termo in self._dfs
+        return self.fonte.df(termo) > 0
+
+    def _lista(self, termo: str) -> Optional[Lista]:
+        if termo in self._listas:
+            return self._listas[termo]
+        lista = None
+        linhas_tfs = self.fonte.linhas_tfs(termo)
+        if linhas_tfs is not None:
+            linhas, tfs = linhas_tfs
+            df = self._dfs.get(termo, len(linhas)) if self._dfs is not None else len(linhas)
+            idf = self._idf(self.n, df)
+            if self.media_tamanho > 0:
+                norm = 1.0 - self.b + self.b * self.fonte.tamanhos_np[linhas] / self.media_tamanho
+            else:
+                norm = 1.0
+            tfs = tfs.astype(np.float64)
+            imp = idf * tfs * (self.k1 + 1.0) / (tfs + self.k1 * norm)
+            lista = (linhas.tolist(), imp.tolist(), float(imp.max()))
+        self._listas[termo] = lista
+        return lista
+
+
+#Carrega o dados_tokenizados.json (as contagens dão o tf e o tamanho de cada documento) e monta o índice
+def carregar_indice_bm25(path: str, k1: float = K1_PADRAO, b: float = B_PADRAO,
+                        estatisticas: Optional[Dict] = None) -> IndiceBM25:
+    return IndiceBM25(load_tokenized(Path(path)), k1=k1, b=b, estatisticas=estatisticas)
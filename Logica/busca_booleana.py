@@ -1,7 +1,15 @@
 import json
 import re
 import os
-from typing import Dict, Set, List, Union
+from fnmatch import fnmatchcase
+from typing import Dict, Set, List, Tuple, Union
+
+try:
+    from .indice_invertido import IndiceInvertido, construir_indice_invertido, _intersecao, _uniao, _diferenca, _complemento
+    from .analise import analisador_padrao, dobrar_acentos, primeira_palavra
+except ImportError:
+    from indice_invertido import IndiceInvertido, construir_indice_invertido, _intersecao, _uniao, _diferenca, _complemento
+    from analise import analisador_padrao, dobrar_acentos, primeira_palavra
 
 #Aqui ele so puxa o json com as palavras ja tokenizadas
 def _load_tokenized_docs(path: str) -> Dict[int, Set[str]]:
@@ -15,32 +23,83 @@ def _load_tokenized_docs(path: str) -> Dict[int, Set[str]]:
         for t in tokens_list:
             if isinstance(t, str):
                 parts = t.split(',')
-                word = parts[0].strip().lower()
-                m = re.findall(r"\w+", word, flags=re.UNICODE)
-                if m:
-                    token_set.add(m[0])
+                word = primeira_palavra(parts[0].strip())
+                if word:
+                    token_set.add(word)
         if doc_id is not None:
             docs[int(doc_id)] = token_set
     return docs
 
-# Aqui ele vai setar as funções para AND, OR e NOT e o sinal de parêntense como prioridade de calculo, pro usuário poder utilizar eles na pesquisa
+#Mesma normalização do _load_tokenized_docs, mas partindo de contagens já carregadas ({DocId: {termo: tf}})
+def _conjuntos_de_contagens(contagens: Dict[int, Dict[str, int]]) -> Dict[int, Set[str]]:
+    docs = {}
+    for doc_id, counts in contagens.items():
+        token_set = set()
+        for t in counts:
+            word = primeira_palavra(t)
+            if word:
+                token_set.add(word)
+        docs[int(doc_id)] = token_set
+    return docs
+
+_query_re = re.compile(r'"[^"]*"|\(|\)|\bNEAR/\d+\b|\bAND\b|\bOR\b|\bNOT\b|[^\s()"]+', flags=re.IGNORECASE)
+
+# Aqui ele vai setar as funções para AND, OR e NOT e o sinal de parêntense como prioridade de calculo, pro usuário poder utilizar eles na pesquisa.
+# Também reconhece frases entre aspas ("violência estádios") e o operador de proximidade NEAR/k (torcida NEAR/3 organizada)
 def _tokenize_query(query: str) -> List[str]:
     q = query
     q = q.replace('&&', ' AND ')
     q = q.replace('||', ' OR ')
     q = re.sub(r"!\s*", 'NOT ', q)
-    tokens = re.findall(r"\(|\)|\bAND\b|\bOR\b|\bNOT\b|[^\s()]+", q, flags=re.IGNORECASE)
+    tokens = _query_re.findall(q)
     return [t for t in tokens if t.strip()]
 
-# Normalização do termo pra garantir que não vai dar problema com a busca
+_curinga_re = re.compile(r"[\w*?]*\w[\w*?]*", flags=re.UNICODE)
+
+# Normalização do termo pela mesma análise dos documentos (stopword vira termo vazio).
+# Os curingas * e ? ficam no termo (futeb*, estádio?) e ele só perde maiúsculas e acentos, sem radical
 def _normalize_term(term: str) -> str:
-    m = re.findall(r"\w+", term, flags=re.UNICODE)
-    return m[0].lower() if m else ""
+    m = _curinga_re.search(term)
+    if m and _is_curinga(m.group(0)):
+        return dobrar_acentos(m.group(0).lower())
+    palavra = primeira_palavra(term)
+    return analisador_padrao().termo(palavra) if palavra else ""
+
+
+def _is_curinga(tok: str) -> bool:
+    return '*' in tok or '?' in tok
+
+
+def _is_frase(tok: str) -> bool:
+    return len(tok) >= 2 and tok[0] == '"' and tok[-1] == '"'
+
+
+#Só NEAR/<número> é operador (o mesmo padrão do _query_re); "NEAR/abc" é um termo como outro qualquer
+_near_re = re.compile(r'NEAR/\d+')
+
+
+def _is_near(up: str) -> bool:
+    return _near_re.fullmatch(up) is not None
+
+
+#Frase normalizada: as palavras analisadas (stopwords saem) separadas por um espaço, ainda entre aspas
+def _normalize_frase(tok: str) -> str:
+    return '"' + ' '.join(analisador_padrao().termos(tok[1:-1])) + '"'
+
+
+def _palavras_frase(tok: str) -> List[str]:
+    return tok[1:-1].split()
+
 
+def _prec(up: str) -> int:
+    if _is_near(up):
+        return 4
+    return {'NOT': 3, 'AND': 2, 'OR': 1}.get(up, 0)
 
-#Aqui ele le o NOT, AND, OR e os parêntenses e aplica a lógica de cada um
-def _infix_to_postfix(tokens: List[str]) -> List[str]:
-    prec = {'NOT': 3, 'AND': 2, 'OR': 1}
+
+#Aqui ele le o NOT, AND, OR e os parêntenses e aplica a lógica de cada um.
+#Com normalizar=False os termos e frases já vêm normalizados (chave do cache do motor) e passam direto
+def _infix_to_postfix(tokens: List[str], normalizar: bool = True) -> List[str]:
     output = []
     stack = []
 
@@ -55,17 +114,21 @@ def _infix_to_postfix(tokens: List[str]) -> List[str]:
                 output.append(stack.pop())
             if stack and stack[-1] == '(':
                 stack.pop()
-        elif up in ('AND', 'OR', 'NOT'):
+        elif up in ('AND', 'OR', 'NOT') or _is_near(up):
             while stack:
                 top = stack[-1]
                 if top == '(':
                     break
                 top_up = top.upper()
-                if (prec.get(top_up, 0) > prec.get(up, 0)) or (prec.get(top_up, 0) == prec.get(up, 0) and up != 'NOT'):
+                if (_prec(top_up) > _prec(up)) or (_prec(top_up) == _prec(up) and up != 'NOT'):
                     output.append(stack.pop())
                 else:
                     break
             stack.append(up)
+        elif not normalizar:
+            output.append(tok)
+        elif _is_frase(tok):
+            output.append(_normalize_frase(tok))
         else:
             nt = _normalize_term(tok)
             output.append(nt)
@@ -81,7 +144,8 @@ def _eval_postfix_for_doc(postfix: List[str], doc_tokens: Set[str]) -> bool:
     st: List[bool] = []
     for tok in postfix:
         up = tok.upper()
-        if up == 'AND':
+        # sem posições aqui: NEAR vale como AND e a frase como "todas as palavras no documento"
+        if up == 'AND' or _is_near(up):
             if len(st) < 2:
                 return False
             b = st.pop()
@@ -98,16 +162,93 @@ def _eval_postfix_for_doc(postfix: List[str], doc_tokens: Set[str]) -> bool:
                 return False
             a = st.pop()
             st.append(not a)
+        elif _is_frase(tok):
+            palavras = _palavras_frase(tok)
+            st.append(bool(palavras) and all(w in doc_tokens for w in palavras))
         else:
             if not tok:
                 st.append(False)
+            elif _is_curinga(tok):
+                st.append(any(fnmatchcase(t, tok) for t in doc_tokens))
             else:
                 st.append(tok in doc_tokens)
 
     return bool(st and st[-1])
 
+#Aqui ele avalia o postfix direto nas listas de postings. Cada item da pilha é (negado, lista):
+#quando negado=True a lista representa o complemento, assim AND NOT vira diferença e o universo
+#inteiro só é percorrido se a consulta terminar num NOT puro
+def _eval_postfix_indice(postfix: List[str], indice: IndiceInvertido) -> List[int]:
+    st: List[Tuple[bool, List[int]]] = []
+    for tok in postfix:
+        up = tok.upper()
+        if up in ('AND', 'OR') or _is_near(up):
+            if len(st) < 2:
+                return []
+            nb, b = st.pop()
+            na, a = st.pop()
+            if up != 'OR':
+                if not na and not nb:
+                    st.append((False, _intersecao(a, b)))
+                elif not na:
+                    st.append((False, _diferenca(a, b)))
+                elif not nb:
+                    st.append((False, _diferenca(b, a)))
+                else:
+                    st.append((True, _uniao(a, b)))
+            else:
+                if not na and not nb:
+                    st.append((False, _uniao(a, b)))
+                elif not na:
+                    st.append((True, _diferenca(b, a)))
+                elif not nb:
+                    st.append((True, _diferenca(a, b)))
+                else:
+                    st.append((True, _intersecao(a, b)))
+        elif up == 'NOT':
+            if len(st) < 1:
+                return []
+            na, a = st.pop()
+            st.append((not na, a))
+        elif _is_frase(tok):
+            palavras = _palavras_frase(tok)
+            lista = indice.lista(palavras[0]) if palavras else []
+            for w in palavras[1:]:
+                lista = _intersecao(lista, indice.lista(w))
+            st.append((False, lista))
+        elif _is_curinga(tok):
+            # curinga é a união das listas dos termos que casam com o padrão
+            lista = []
+            for termo in indice.postings:
+                if fnmatchcase(termo, tok):
+                    lista = _uniao(lista, indice.lista(termo))
+            st.append((False, lista))
+        else:
+            st.append((False, indice.lista(tok) if tok else []))
+
+    if not st:
+        return []
+    negado, lista = st[-1]
+    if negado:
+        return _complemento(lista, indice.doc_ids)
+    return list(lista)
+
+
+#Carrega o dados_tokenizados.json uma vez e devolve o índice invertido pronto pra ser reaproveitado
+def carregar_indice_booleano(path: str) -> IndiceInvertido:
+    return construir_indice_invertido(_load_tokenized_docs(path))
+
+
+#Busca usando o índice já carregado em memória; retorna só os DocIds que satisfazem a consulta (ordenados)
+def busca_booleana_indice(query: str, indice: IndiceInvertido) -> List[int]:
+    tokens = _tokenize_query(query)
+    if not tokens:
+        return []
+    postfix = _infix_to_postfix(tokens)
+    return _eval_postfix_indice(postfix, indice)
+
 #Aqui ele realmente realiza a busca no documento dados_tokenizados.json, a parte logica já está feita
-def busca_booleana(query: str, tokenized_docs: Union[str, Dict[int, Set[str]]]) -> Dict[int, bool]:
+def busca_booleana(query: str, tokenized_docs: Union[str, Dict[int, Set[str]], IndiceInvertido]) -> Dict[int, bool]:
 
     if isinstance(tokenized_docs, str):
         path = tokenized_docs
@@ -132,6 +273,9 @@ def busca_booleana(query: str, tokenized_docs: Union[str, Dict[int, Set[str]]])
             raise FileNotFoundError(f"Arquivo de tokens não encontrado. Tente passar o caminho correto. Caminhos testados: {tried}")
 
         docs = _load_tokenized_docs(found)
+    elif isinstance(tokenized_docs, IndiceInvertido):
+        matched = set(busca_booleana_indice(query, tokenized_docs))
+        return {doc_id: doc_id in matched for doc_id in tokenized_docs.doc_ids}
     else:
         docs = tokenized_docs
 
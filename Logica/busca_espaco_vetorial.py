@@ -1,13 +1,16 @@
 import json
 import os
 import math
-import re
 from typing import Dict, List, Tuple, Optional
 
-#Normalização novamente pra garantir que não há maiusculo e caractere especial
+try:
+    from .analise import analisador_padrao, primeira_palavra
+except ImportError:
+    from analise import analisador_padrao, primeira_palavra
+
+#Normalização novamente pra garantir que não há maiusculo e caractere especial (os termos do arquivo já vêm analisados)
 def _normalize(term: str) -> str:
-    m = re.findall(r"\w+", term, flags=re.UNICODE)
-    return m[0].lower() if m else ""
+    return primeira_palavra(term)
 
 #Aqui ele carrega os termos significativos e armazena os outros parametros como nome do arquivo, id etc
 def _load_term_vectors(path: str) -> Dict[int, Dict[str, float]]:
@@ -45,11 +48,10 @@ def _compute_doc_norms(doc_vectors: Dict[int, Dict[str, float]]) -> Dict[int, fl
     return norms
 
 
+#A consulta passa pela mesma análise dos documentos (minúsculo, sem acento, sem stopword, radical)
 def _build_query_vector(query: str) -> Dict[str, float]:
-    tokens = re.findall(r"\w+", query, flags=re.UNICODE)
-    q = [t.lower() for t in tokens]
     vec: Dict[str, float] = {}
-    for t in q:
+    for t in analisador_padrao().termos(query):
         vec[t] = vec.get(t, 0.0) + 1.0
     return vec
 
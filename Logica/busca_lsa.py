@@ -0,0 +1,222 @@
+import json
+import math
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .busca_espaco_vetorial import _build_query_vector
+    from .busca_vetorial_esparsa import MatrizTfIdf, selecionar_top_k
+    from .correcao_termos import CorretorTermos, corrigir_vetor
+except ImportError:
+    from busca_espaco_vetorial import _build_query_vector
+    from busca_vetorial_esparsa import MatrizTfIdf, selecionar_top_k
+    from correcao_termos import CorretorTermos, corrigir_vetor
+
+# Busca semântica latente (LSA): a matriz documento x termo do TF-IDF é aproximada por uma SVD truncada A ~ U S V^T
+# de posto k. Cada documento vira A V = U S (k números) e a consulta é dobrada no mesmo espaço por q V, então
+# "torcedores" e "torcida" ficam perto mesmo sem dividir termos. Gravado em JSONs/indice_lsa (mmap na leitura):
+#   docs.npy   -> embeddings dos documentos (float32, N x k, já normalizados)
+#   termos.npy -> V (float32, termos x k), pra dobrar a consulta
+#   doc_ids.npy, idf.npy e info.json (versão, k, valores singulares, tamanhos e o vocabulário)
+VERSAO_LSA = 1
+DIMENSOES_LSA = 100
+# colunas extras e iterações de potência da SVD randomizada (Halko, Martinsson e Tropp)
+SOBREAMOSTRAGEM = 10
+ITERACOES_POTENCIA = 4
+# entradas (não zeros x colunas) de cada pedaço dos produtos esparsos, pra limitar a memória
+ENTRADAS_BLOCO = 1 << 23
+# cosseno mínimo pra um documento entrar no resultado (abaixo disso é ruído de arredondamento do float32)
+MIN_COSSENO = 1e-6
+
+
+#Produto esparso x denso por pedaços de linhas: (ptr, idx, val) é a matriz em CSR (ou a transposta, em CSC)
+def _produto(ptr: np.ndarray, idx: np.ndarray, val: np.ndarray, x: np.ndarray) -> np.ndarray:
+    n = len(ptr) - 1
+    out = np.zeros((n, x.shape[1]))
+    limite = max(1, ENTRADAS_BLOCO // x.shape[1])
+    ini = 0
+    while ini < n:
+        fim = min(max(int(np.searchsorted(ptr, ptr[ini] + limite, side='right')) - 1, ini + 1), n)
+        a, b = int(ptr[ini]), int(ptr[fim])
+        if b > a:
+            tam = np.diff(ptr[ini:fim + 1])
+            cheias = tam > 0
+            parcelas = np.asarray(val[a:b], dtype=np.float64)[:, None] * x[np.asarray(idx[a:b], dtype=np.int64)]
+            out[ini:fim][cheias] = np.add.reduceat(parcelas, np.asarray(ptr[ini:fim], dtype=np.int64)[cheias] - a, axis=0)
+        ini = fim
+    return out
+
+
+#Aqui ele calcula a SVD truncada de posto k com o algoritmo randomizado: projeta A num subespaço aleatório de k+p
+#colunas, refina com iterações de potência (reortogonalizando com QR) e faz a SVD densa só da matriz pequena
+#Q^T A. Só usa produtos de A e A^T por matrizes densas finas, então escala com o número de não zeros
+def svd_randomizada(matriz: MatrizTfIdf, k: int, sobreamostragem: int = SOBREAMOSTRAGEM,
+                    iteracoes: int = ITERACOES_POTENCIA, semente: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n_docs, n_termos = len(matriz), len(matriz.vocab)
+    k = max(1, min(k, n_docs, n_termos))
+    l = min(k + sobreamostragem, n_docs, n_termos)
+
+    def a_vezes(x):
+        return _produto(matriz.indptr, matriz.indices, matriz.data, x)
+
+    def at_vezes(y):
+        return _produto(matriz.col_ptr, matriz.col_linhas, matriz.col_valores, y)
+
+    rng = np.random.default_rng(semente)
+    q, _ = np.linalg.qr(a_vezes(rng.standard_normal((n_termos, l))))
+    for _ in range(iteracoes):
+        z, _ = np.linalg.qr(at_vezes(q))
+        q, _ = np.linalg.qr(a_vezes(z))
+    u_b, s, vt = np.linalg.svd(at_vezes(q).T, full_matrices=False)
+    return (q @ u_b)[:, :k], s[:k], vt[:k].T
+
+
+def _normalizar_linhas(x: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(x, axis=1, keepdims=True)
+    return np.divide(x, normas, out=np.zeros_like(x), where=normas > 0)
+
+
+#Calcula e grava o indice_lsa a partir da matriz do indice_tfidf. Devolve o posto usado
+def gravar_indice_lsa(matriz: MatrizTfIdf, pasta: Path, k: int = DIMENSOES_LSA, semente: int = 0) -> int:
+    u, s, v = svd_randomizada(matriz, k, semente=semente)
+    # A V = U S: o embedding de cada documento, no mesmo espaço da consulta dobrada (q V)
+    docs = _normalizar_linhas(u * s)
+    termos = sorted(matriz.vocab, key=matriz.vocab.__getitem__)
+    idf = matriz.idf if matriz.idf is not None else np.ones(len(termos))
+    arrays = {
+        'doc_ids': np.asarray(matriz.doc_ids, dtype=np.int64),
+        'docs': docs.astype(np.float32),
+        'termos': v.astype(np.float32),
+        'idf': np.asarray(idf, dtype=np.float32),
+    }
+    info = {'versao': VERSAO_LSA, 'k': int(len(s)), 'n_docs': len(matriz), 'valores_singulares': s.tolist(),
+            'termos': termos}
+    _gravar(Path(pasta), arrays, info)
+    return int(len(s))
+
+
+#Grava os .npy e por último o info.json (com os tamanhos), cada um num .tmp trocado com os.replace
+def _gravar(pasta: Path, arrays: Dict[str, np.ndarray], info: Dict):
+    pasta.mkdir(parents=True, exist_ok=True)
+    for nome, arr in arrays.items():
+        tmp = pasta / f'{nome}.npy.tmp'
+        with tmp.open('wb') as f:
+            np.save(f, arr)
+        os.replace(tmp, pasta / f'{nome}.npy')
+    tmp = pasta / 'info.json.tmp'
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False)
+    os.replace(tmp, pasta / 'info.json')
+
+
+#Grava em pasta só as linhas dos doc_ids pedidos do indice_lsa de origem (um shard): a base V, o idf e o vocabulário
+#são os do corpus inteiro, então a consulta é dobrada igual e os cossenos não mudam
+def gravar_fatia_lsa(origem: Path, pasta: Path, doc_ids: Sequence[int]) -> int:
+    origem = Path(origem)
+    with (origem / 'info.json').open(encoding='utf-8') as f:
+        info = json.load(f)
+    lsa = carregar_indice_lsa(origem)
+    linhas = np.flatnonzero(np.isin(lsa.doc_ids, np.asarray(doc_ids, dtype=np.int64)))
+    arrays = {
+        'doc_ids': lsa.doc_ids[linhas],
+        'docs': np.asarray(lsa.docs[linhas], dtype=np.float32),
+        'termos': np.asarray(lsa.termos, dtype=np.float32),
+        'idf': lsa.idf.astype(np.float32),
+    }
+    info['n_docs'] = int(len(linhas))
+    _gravar(Path(pasta), arrays, info)
+    return int(len(linhas))
+
+
+#Aqui ele guarda os embeddings e pontua a consulta com um único produto matriz x vetor denso (docs . q)
+class MatrizLsa:
+    def __init__(self, doc_ids: np.ndarray, vocab: Dict[str, int], termos: np.ndarray, docs: np.ndarray,
+                 idf: np.ndarray):
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.vocab = vocab
+        self.termos = termos
+        self.docs = docs
+        self.idf = idf
+        self.corretor: Optional[Callable[[], CorretorTermos]] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    #Vetor TF-IDF de termos -> embedding unitário (None se nenhum termo está no vocabulário)
+    def dobrar(self, pesos: Dict[str, float]) -> Optional[np.ndarray]:
+        ids = [self.vocab[t] for t in pesos if t in self.vocab]
+        if not ids:
+            return None
+        w = np.asarray([pesos[t] for t in pesos if t in self.vocab], dtype=np.float64) * self.idf[ids]
+        vetor = w @ np.asarray(self.termos[ids], dtype=np.float64)
+        norma = math.sqrt(float(vetor @ vetor))
+        return vetor / norma if norma > 0 else None
+
+    def _vetor_consulta(self, query: str) -> Optional[np.ndarray]:
+        return self.dobrar(corrigir_vetor(_build_query_vector(query), self.vocab.__contains__, self.corretor))
+
+    #Só entram documentos com cosseno acima de MIN_COSSENO: no espaço latente quase todos têm algum valor
+    def _selecionar(self, scores: np.ndarray, top_k: Optional[int], linhas: Optional[np.ndarray] = None) -> List[Dict]:
+        doc_ids = self.doc_ids if linhas is None else self.doc_ids[linhas]
+        ok = np.flatnonzero(scores > MIN_COSSENO)
+        return selecionar_top_k(doc_ids[ok], scores[ok], top_k)
+
+    def pontuar(self, query: str) -> np.ndarray:
+        q = self._vetor_consulta(query)
+        if q is None:
+            return np.zeros(len(self.doc_ids))
+        return self.docs @ q.astype(np.float32)
+
+    def buscar(self, query: str, top_k: Optional[int] = None, linhas: Optional[np.ndarray] = None) -> List[Dict]:
+        q = self._vetor_consulta(query)
+        if q is None:
+            return []
+        docs = self.docs if linhas is None else self.docs[linhas]
+        return self._selecionar(docs @ q.astype(np.float32), top_k, linhas)
+
+    #Lote: as consultas dobradas viram uma matriz (consultas x k) e tudo sai de um produto docs . Q^T
+    def buscar_lote(self, queries: List[str], top_k: Optional[int] = None) -> List[List[Dict]]:
+        vetores = [self._vetor_consulta(q) for q in queries]
+        validos = [i for i, v in enumerate(vetores) if v is not None]
+        out: List[List[Dict]] = [[] for _ in queries]
+        if validos:
+            scores = np.asarray(self.docs @ np.stack([vetores[i] for i in validos]).T.astype(np.float32))
+            for j, i in enumerate(validos):
+                out[i] = self._selecionar(scores[:, j], top_k)
+        return out
+
+    #Cópia em memória com documentos trocados: os removidos saem e os novos (por segmento incremental) são dobrados
+    #no espaço latente pelas contagens de termos, sem refazer a SVD
+    def com_documentos(self, novos: Dict[int, Dict[str, int]], removidos) -> "MatrizLsa":
+        manter = ~np.isin(self.doc_ids, np.fromiter(set(removidos) | set(novos), dtype=np.int64))
+        doc_ids = [self.doc_ids[manter]]
+        docs = [np.asarray(self.docs[manter], dtype=np.float32)]
+        zero = np.zeros(self.docs.shape[1], dtype=np.float32)
+        for doc_id, contagens in novos.items():
+            v = self.dobrar(contagens)
+            doc_ids.append(np.asarray([doc_id], dtype=np.int64))
+            docs.append((zero if v is None else v.astype(np.float32))[None, :])
+        matriz = MatrizLsa(np.concatenate(doc_ids), self.vocab, self.termos, np.concatenate(docs), self.idf)
+        matriz.corretor = self.corretor
+        return matriz
+
+
+def carregar_indice_lsa(pasta: Path) -> MatrizLsa:
+    pasta = Path(pasta)
+    with (pasta / 'info.json').open(encoding='utf-8') as f:
+        info = json.load(f)
+    if info.get('versao') != VERSAO_LSA:
+        raise ValueError(f"Versão do índice LSA em {pasta} não suportada: {info.get('versao')}")
+
+    def _abrir(nome: str) -> np.ndarray:
+        return np.load(pasta / f'{nome}.npy', mmap_mode='r')
+
+    doc_ids, docs, termos, idf = _abrir('doc_ids'), _abrir('docs'), _abrir('termos'), _abrir('idf')
+    k, n_docs, n_termos = info.get('k'), info.get('n_docs'), len(info.get('termos', ()))
+    if len(doc_ids) != n_docs or docs.shape != (n_docs, k) or termos.shape != (n_termos, k) or len(idf) != n_termos:
+        raise ValueError(f"Índice LSA em {pasta} inconsistente (gravação em andamento?).")
+    vocab = {t: i for i, t in enumerate(info['termos'])}
+    return MatrizLsa(doc_ids, vocab, termos, docs, np.asarray(idf, dtype=np.float64))
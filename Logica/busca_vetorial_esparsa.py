@@ -0,0 +1,335 @@
+import json
+import math
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .busca_espaco_vetorial import _load_term_vectors, _build_query_vector, _find_file_with_fallback
+    from .TF_IDF import VERSAO_INDICE
+    from .correcao_termos import CorretorTermos, corrigir_vetor
+except ImportError:
+    from busca_espaco_vetorial import _load_term_vectors, _build_query_vector, _find_file_with_fallback
+    from TF_IDF import VERSAO_INDICE
+    from correcao_termos import CorretorTermos, corrigir_vetor
+
+
+#Aqui ele guarda os pesos TF-IDF como uma matriz esparsa documento x termo (formato CSR), com as normas L2 já calculadas.
+#Também guarda a transposta (termo x documento) pra que a pontuação só toque nas colunas dos termos da consulta
+class MatrizTfIdf:
+    def __init__(self, doc_ids: List[int], vocab: Dict[str, int], indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                 normas: Optional[np.ndarray] = None, col_ptr: Optional[np.ndarray] = None,
+                 col_linhas: Optional[np.ndarray] = None, col_valores: Optional[np.ndarray] = None,
+                 idf: Optional[np.ndarray] = None):
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.vocab = vocab
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.idf = idf
+        # opcional: quem souber corrigir termos fora do vocabulário (montado só quando aparece um)
+        self.corretor: Optional[Callable[[], CorretorTermos]] = None
+        if normas is not None and col_ptr is not None:
+            # índice binário: tudo já vem pronto do TF_IDF.py (e mapeado em memória)
+            self.normas = normas
+            self.col_ptr = col_ptr
+            self.col_linhas = col_linhas
+            self.col_valores = col_valores
+            return
+        n_docs = len(doc_ids)
+        linhas = np.repeat(np.arange(n_docs, dtype=np.int64), np.diff(indptr))
+        self.normas = np.sqrt(np.bincount(linhas, weights=data * data, minlength=n_docs))
+        ordem = np.argsort(indices, kind='stable')
+        self.col_linhas = linhas[ordem]
+        self.col_valores = data[ordem]
+        self.col_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=len(vocab)), out=self.col_ptr[1:])
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    #Vetor da consulta analisado, com os termos fora do vocabulário corrigidos
+    def vetor_consulta(self, query: str) -> Dict[str, float]:
+        return corrigir_vetor(_build_query_vector(query), self.vocab.__contains__, self.corretor)
+
+    #Produtos escalares (sem normalizar) de vários vetores de consulta com todos os documentos: é um único produto
+    #esparso (consultas x termos) . (termos x documentos). A coluna de cada termo é lida (e convertida) uma vez só
+    #no lote, mesmo que várias consultas usem o termo
+    def produtos(self, vetores: List[Dict[str, float]]) -> np.ndarray:
+        n = len(self.doc_ids)
+        linhas = []
+        valores = []
+        colunas: Dict[int, tuple] = {}
+        for qi, query_vec in enumerate(vetores):
+            for term, qw in query_vec.items():
+                t = self.vocab.get(term)
+                if t is None:
+                    continue
+                col = colunas.get(t)
+                if col is None:
+                    a, b = self.col_ptr[t], self.col_ptr[t + 1]
+                    col = (self.col_linhas[a:b].astype(np.int64), self.col_valores[a:b].astype(np.float64))
+                    colunas[t] = col
+                linhas.append(col[0] + qi * n)
+                valores.append(col[1] * qw)
+        if linhas:
+            dots = np.bincount(np.concatenate(linhas), weights=np.concatenate(valores), minlength=len(vetores) * n)
+            dots = dots.astype(np.float64, copy=False)
+        else:
+            dots = np.zeros(len(vetores) * n)
+        return dots.reshape(len(vetores), n)
+
+    #Pontua várias consultas de uma vez (cosseno com todos os documentos)
+    def pontuar_lote(self, queries: List[str]) -> np.ndarray:
+        vetores = [self.vetor_consulta(q) for q in queries]
+        return _cossenos(self.produtos(vetores), vetores, self.normas)
+
+    def pontuar(self, query: str) -> np.ndarray:
+        return self.pontuar_lote([query])[0]
+
+    #Pontua só as linhas pedidas (ordenadas), pro pré-filtro de facetas. Se as linhas filtradas tiverem menos entradas
+    #que as colunas dos termos da consulta, percorre as linhas (CSR) e cruza com os termos; senão usa as colunas
+    def pontuar_linhas(self, query: str, linhas: np.ndarray) -> np.ndarray:
+        linhas = np.asarray(linhas, dtype=np.int64)
+        query_vec = self.vetor_consulta(query)
+        norma_q = math.sqrt(sum(v * v for v in query_vec.values()))
+        termos = sorted((self.vocab[t], w) for t, w in query_vec.items() if t in self.vocab)
+        if not termos or not len(linhas):
+            return np.zeros(len(linhas))
+        custo_colunas = sum(int(self.col_ptr[t + 1] - self.col_ptr[t]) for t, _ in termos)
+        ini = np.asarray(self.indptr[linhas], dtype=np.int64)
+        tam = np.asarray(self.indptr[linhas + 1], dtype=np.int64) - ini
+        total = int(tam.sum())
+        if total >= custo_colunas:
+            return self.pontuar(query)[linhas]
+        q_ids = np.asarray([t for t, _ in termos], dtype=np.int64)
+        q_pesos = np.asarray([w for _, w in termos], dtype=np.float64)
+        pos = np.repeat(ini - (np.cumsum(tam) - tam), tam) + np.arange(total)
+        ids = np.asarray(self.indices[pos], dtype=np.int64)
+        k = np.minimum(np.searchsorted(q_ids, ids), len(q_ids) - 1)
+        casou = q_ids[k] == ids
+        dono = np.repeat(np.arange(len(linhas)), tam)[casou]
+        pesos = np.asarray(self.data[pos[casou]], dtype=np.float64) * q_pesos[k[casou]]
+        dots = np.bincount(dono, weights=pesos, minlength=len(linhas)).astype(np.float64)
+        denom = norma_q * np.asarray(self.normas[linhas], dtype=np.float64)
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    def _selecionar(self, scores: np.ndarray, top_k: Optional[int], linhas: Optional[np.ndarray] = None) -> List[Dict]:
+        return selecionar_top_k(self.doc_ids if linhas is None else self.doc_ids[linhas], scores, top_k)
+
+    def buscar(self, query: str, top_k: Optional[int] = None, linhas: Optional[np.ndarray] = None) -> List[Dict]:
+        if linhas is not None:
+            return self._selecionar(self.pontuar_linhas(query, linhas), top_k, linhas)
+        return self._selecionar(self.pontuar(query), top_k)
+
+    def buscar_lote(self, queries: List[str], top_k: Optional[int] = None) -> List[List[Dict]]:
+        if not queries:
+            return []
+        scores = self.pontuar_lote(queries)
+        return [self._selecionar(linha, top_k) for linha in scores]
+
+
+#Aqui ele pontua o TF-IDF do corpus vivo (o indice.bin com os segmentos incrementais por cima, ver CorpusVivo) sem
+#montar matriz nenhuma: o peso de um termo num documento é tf*ln(N/df) com o N e o df vivos, e só as listas dos
+#termos da consulta são lidas (e guardadas já com o idf). As normas dos documentos da base saem dos momentos gravados
+#no indice.bin (norma² = L²·A - 2L·B + C, com L = ln N), corrigidos só nas listas dos termos cujo df mudou; as dos
+#documentos dos segmentos são calculadas direto. As linhas são as posições densas do corpus (DocIds em ordem)
+class MatrizSobreposta:
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.corretor: Optional[Callable[[], CorretorTermos]] = None
+        self.doc_ids = corpus.doc_ids_np
+        self._idf: Dict[str, float] = {}
+        self._colunas: Dict[str, Optional[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._normas: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def idf(self, termo: str) -> float:
+        idf = self._idf.get(termo)
+        if idf is None:
+            df = self.corpus.df(termo)
+            idf = math.log(len(self.doc_ids) / df) if df > 0 else 0.0
+            self._idf[termo] = idf
+        return idf
+
+    #Linhas e pesos do termo no corpus vivo (None se ele não está em nenhum documento vivo)
+    def _coluna(self, termo: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if termo not in self._colunas:
+            linhas_tfs = self.corpus.linhas_tfs(termo)
+            if linhas_tfs is not None:
+                linhas_tfs = (linhas_tfs[0], linhas_tfs[1] * self.idf(termo))
+            self._colunas[termo] = linhas_tfs
+        return self._colunas[termo]
+
+    @property
+    def normas(self) -> np.ndarray:
+        if self._normas is None:
+            binario = self.corpus.binario
+            momentos = np.asarray(binario.momentos, dtype=np.float64)
+            a = momentos[:, 0]
+            b = momentos[:, 1].copy()
+            c = momentos[:, 2].copy()
+            for termo in self.corpus.termos_tocados():
+                base = binario.linhas_tfs(termo)
+                df = self.corpus.df(termo)
+                if base is None or df <= 0:
+                    continue
+                ln_antes, ln_agora = math.log(binario.df(termo)), math.log(df)
+                tf2 = np.square(base[1].astype(np.float64))
+                b[base[0]] += tf2 * (ln_agora - ln_antes)
+                c[base[0]] += tf2 * (ln_agora * ln_agora - ln_antes * ln_antes)
+            ln_n = math.log(len(self.doc_ids)) if len(self.doc_ids) else 0.0
+            quadrados = np.maximum(ln_n * ln_n * a - 2.0 * ln_n * b + c, 0.0)
+            novos = [math.sqrt(sum((tf * self.idf(t)) ** 2 for t, tf in self.corpus.estado.docs[d]['Tokens'].items()))
+                     for d in self.corpus.novos]
+            self._normas = self.corpus.juntar(np.sqrt(quadrados), np.asarray(novos, dtype=np.float64))
+        return self._normas
+
+    #Termos conhecidos são os do corpus vivo (um termo que só estava em documentos removidos vira correção)
+    def vetor_consulta(self, query: str) -> Dict[str, float]:
+        return corrigir_vetor(_build_query_vector(query), lambda t: self.corpus.df(t) > 0, self.corretor)
+
+    def produtos(self, vetores: List[Dict[str, float]]) -> np.ndarray:
+        n = len(self.doc_ids)
+        linhas = []
+        valores = []
+        for qi, query_vec in enumerate(vetores):
+            for termo, qw in query_vec.items():
+                col = self._coluna(termo)
+                if col is not None:
+                    linhas.append(col[0] + qi * n)
+                    valores.append(col[1] * qw)
+        if not linhas:
+            return np.zeros((len(vetores), n))
+        dots = np.bincount(np.concatenate(linhas), weights=np.concatenate(valores), minlength=len(vetores) * n)
+        return dots.astype(np.float64, copy=False).reshape(len(vetores), n)
+
+    def pontuar_lote(self, queries: List[str]) -> np.ndarray:
+        vetores = [self.vetor_consulta(q) for q in queries]
+        return _cossenos(self.produtos(vetores), vetores, self.normas)
+
+    def pontuar(self, query: str) -> np.ndarray:
+        return self.pontuar_lote([query])[0]
+
+    def buscar(self, query: str, top_k: Optional[int] = None, linhas: Optional[np.ndarray] = None) -> List[Dict]:
+        scores = self.pontuar(query)
+        if linhas is None:
+            return selecionar_top_k(self.doc_ids, scores, top_k)
+        return selecionar_top_k(self.doc_ids[linhas], scores[linhas], top_k)
+
+    def buscar_lote(self, queries: List[str], top_k: Optional[int] = None) -> List[List[Dict]]:
+        if not queries:
+            return []
+        return [selecionar_top_k(self.doc_ids, linha, top_k) for linha in self.pontuar_lote(queries)]
+
+    #Os n documentos vivos mais parecidos com uma linha (cosseno > 0; empate fica com o menor DocId), contando os
+    #dos segmentos
+    def vizinhos(self, linha: int, n: int) -> List[Tuple[int, float]]:
+        vetor = {t: tf * self.idf(t) for t, tf in self.corpus.contagens(linha).items()}
+        scores = _cossenos(self.produtos([vetor]), [vetor], self.normas)[0]
+        scores[linha] = 0.0
+        outras = np.flatnonzero(scores > 0)
+        return [(r['DocId'], r['score']) for r in selecionar_top_k(self.doc_ids[outras], scores[outras], n)]
+
+
+#Divide os produtos escalares pelas normas das consultas e dos documentos (cosseno; zero onde alguma norma é zero)
+def _cossenos(dots: np.ndarray, vetores: List[Dict[str, float]], normas: np.ndarray) -> np.ndarray:
+    normas_q = np.asarray([math.sqrt(sum(v * v for v in vec.values())) for vec in vetores], dtype=np.float64)
+    denom = normas_q[:, None] * np.asarray(normas, dtype=np.float64)[None, :]
+    return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+
+#Seleciona os top_k com argpartition (sem ordenar tudo); empates na fronteira seguem a ordem dos documentos, igual ao
+#sort estável. doc_ids[i] é o documento de scores[i] (com pré-filtro, só os das linhas filtradas)
+def selecionar_top_k(doc_ids: np.ndarray, scores: np.ndarray, top_k: Optional[int]) -> List[Dict]:
+    n = len(scores)
+    if top_k and top_k < n:
+        k = top_k
+        parcial = np.argpartition(-scores, k - 1)[:k]
+        limite = scores[parcial].min()
+        maiores = np.flatnonzero(scores > limite)
+        empates = np.flatnonzero(scores == limite)[:k - len(maiores)]
+        sel = np.concatenate([maiores, empates])
+    else:
+        sel = np.arange(n)
+    sel = sel[np.lexsort((sel, -scores[sel]))]
+    return [{'DocId': int(doc_ids[i]), 'score': float(scores[i])} for i in sel]
+
+
+#Monta a matriz a partir do termos_significativos.json (mesma leitura do busca_espaco_vetorial, só que feita uma vez)
+def carregar_matriz_tfidf(termos_path: str) -> MatrizTfIdf:
+    return matriz_de_vetores(_load_term_vectors(termos_path))
+
+
+#Monta a matriz direto de um mapa {DocId: {termo: peso}} (por exemplo o que o TF_IDF.compute_tfidf devolve)
+def matriz_de_vetores(doc_vectors: Dict[int, Dict[str, float]]) -> MatrizTfIdf:
+    vocab: Dict[str, int] = {}
+    doc_ids = []
+    indptr = [0]
+    indices = []
+    data = []
+    for doc_id, vec in doc_vectors.items():
+        doc_ids.append(doc_id)
+        for term, w in vec.items():
+            indices.append(vocab.setdefault(term, len(vocab)))
+            data.append(w)
+        indptr.append(len(indices))
+    return MatrizTfIdf(
+        doc_ids,
+        vocab,
+        np.asarray(indptr, dtype=np.int64),
+        np.asarray(indices, dtype=np.int64),
+        np.asarray(data, dtype=np.float64),
+    )
+
+
+#Abre o índice completo gravado pelo TF_IDF.py (pasta indice_tfidf). Os arrays são mapeados com mmap,
+#então só as páginas das colunas dos termos consultados são lidas do disco
+def carregar_indice_binario(indice_dir: str) -> MatrizTfIdf:
+    base = Path(indice_dir)
+    with (base / 'vocabulario.json').open('r', encoding='utf-8') as f:
+        cab = json.load(f)
+    if cab.get('versao') != VERSAO_INDICE:
+        raise ValueError(f"Versão do índice em {base} não suportada: {cab.get('versao')}")
+
+    def _abrir(nome: str) -> np.ndarray:
+        return np.load(base / f'{nome}.npy', mmap_mode='r')
+
+    vocab = {t: i for i, t in enumerate(cab['termos'])}
+    indptr = _abrir('indptr')
+    col_ptr = _abrir('col_ptr')
+    n_docs = cab.get('n_docs')
+    nnz = cab.get('nnz')
+    # se algum .npy for de outra gravação (índice sendo regravado) os tamanhos não batem com o cabeçalho
+    if len(indptr) != n_docs + 1 or len(col_ptr) != len(vocab) + 1 or (nnz is not None and int(indptr[-1]) != nnz):
+        raise ValueError(f"Índice em {base} inconsistente (gravação em andamento?).")
+    return MatrizTfIdf(
+        _abrir('doc_ids'),
+        vocab,
+        indptr,
+        _abrir('indices'),
+        _abrir('pesos'),
+        normas=_abrir('normas'),
+        col_ptr=col_ptr,
+        col_linhas=_abrir('col_linhas'),
+        col_valores=_abrir('col_pesos'),
+        idf=_abrir('idf'),
+    )
+
+
+#Mesmo formato de retorno do busca_espaco_vetorial ([{DocId, score}] e 'Título' se passar os metadados)
+def busca_espaco_vetorial_esparsa(query: str, matriz: MatrizTfIdf, metadados_path: Optional[str] = None, top_k: Optional[int] = None) -> List[Dict]:
+    results = matriz.buscar(query, top_k=top_k)
+    if metadados_path:
+        meta_file = _find_file_with_fallback(metadados_path, os.path.join('..', 'JSONs', 'metadados.json'))
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            metas = json.load(f)
+        meta_map = {int(m.get('DocId')): m for m in metas}
+        for r in results:
+            m = meta_map.get(r['DocId'])
+            r['Título'] = m.get('Titulo') if m else None
+    return results
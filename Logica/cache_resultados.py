@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+CAPACIDADE_PADRAO = 1024
+TTL_PADRAO = 300.0
+
+
+#Aqui ele guarda os resultados já ranqueados (DocId/score) das últimas consultas: LRU com limite de entradas e de
+#idade (TTL). Cada entrada é marcada com a geração do índice; quando chega uma geração nova o cache inteiro é
+#descartado, então nunca sai resultado de um índice que já foi trocado
+class CacheResultados:
+    def __init__(self, capacidade: int = CAPACIDADE_PADRAO, ttl: float = TTL_PADRAO,
+                 relogio: Callable[[], float] = time.monotonic):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._relogio = relogio
+        self._entradas: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.geracao: Optional[int] = None
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def _trocar_geracao(self, geracao: int):
+        if geracao != self.geracao:
+            if self._entradas:
+                self.invalidacoes += 1
+            self._entradas.clear()
+            self.geracao = geracao
+
+    def obter(self, geracao: int, chave: Hashable):
+        if self.capacidade <= 0:
+            return None
+        with self._lock:
+            self._trocar_geracao(geracao)
+            item = self._entradas.get(chave)
+            if item is None:
+                self.faltas += 1
+                return None
+            criado, valor = item
+            if self.ttl > 0 and self._relogio() - criado > self.ttl:
+                del self._entradas[chave]
+                self.expirados += 1
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def guardar(self, geracao: int, chave: Hashable, valor):
+        if self.capacidade <= 0:
+            return
+        with self._lock:
+            # resultado calculado numa geração que já foi trocada não entra
+            if self.geracao is not None and geracao < self.geracao:
+                return
+            self._trocar_geracao(geracao)
+            self._entradas[chave] = (self._relogio(), valor)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.capacidade:
+                self._entradas.popitem(last=False)
+                self.despejos += 1
+
+    #Busca no cache ou calcula (fora do lock: duas buscas iguais ao mesmo tempo calculam as duas, sem travar as outras)
+    def obter_ou_calcular(self, geracao: int, chave: Hashable, calcular: Callable[[], object]):
+        valor = self.obter(geracao, chave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(geracao, chave, valor)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estado(self) -> Dict:
+        consultas = self.acertos + self.faltas
+        return {
+            "entradas": len(self._entradas),
+            "capacidade": self.capacidade,
+            "ttl": self.ttl,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": (self.acertos / consultas) if consultas else None,
+            "despejos": self.despejos,
+            "expirados": self.expirados,
+            "invalidacoes": self.invalidacoes,
+        }
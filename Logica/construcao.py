@@ -0,0 +1,447 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .preparacao import preparar_documentos
+    from .tokenizacao import tokenizar_documentos, token_re
+    from .analise import carregar_stopwords, VERSAO_ANALISE
+    from . import TF_IDF
+    from .formato_binario import gravar_de_jsons, VERSAO as VERSAO_BINARIO
+    from .busca_vetorial_esparsa import carregar_indice_binario
+    from .vizinhos import (N_VIZINHOS, FRACAO_REFAZER, VERSAO_VIZINHOS, resolver_metodo, calcular_vizinhos,
+                           atualizar_vizinhos, carregar_vizinhos, gravar_vizinhos)
+    from .busca_lsa import DIMENSOES_LSA, VERSAO_LSA, gravar_indice_lsa
+    from .shards import PARTICOES, VERSAO_SHARDS, gravar_shards
+    from .publicacao import hash_conteudo, hashes_fontes, motivo_publicacao, publicar_geracao
+except ImportError:
+    from preparacao import preparar_documentos
+    from tokenizacao import tokenizar_documentos, token_re
+    from analise import carregar_stopwords, VERSAO_ANALISE
+    import TF_IDF
+    from formato_binario import gravar_de_jsons, VERSAO as VERSAO_BINARIO
+    from busca_vetorial_esparsa import carregar_indice_binario
+    from vizinhos import (N_VIZINHOS, FRACAO_REFAZER, VERSAO_VIZINHOS, resolver_metodo, calcular_vizinhos,
+                          atualizar_vizinhos, carregar_vizinhos, gravar_vizinhos)
+    from busca_lsa import DIMENSOES_LSA, VERSAO_LSA, gravar_indice_lsa
+    from shards import PARTICOES, VERSAO_SHARDS, gravar_shards
+    from publicacao import hash_conteudo, hashes_fontes, motivo_publicacao, publicar_geracao
+
+# Manifesto do build, na pasta JSONs:
+#   arquivos -> {caminho relativo: {mtime_ns, tamanho, hash}}; o hash só é recalculado quando mtime/tamanho mudam
+#   etapas   -> {etapa: {config, entradas: {caminho: hash}, saidas: {caminho: hash}, docs: {DocId: hash}}}
+# Uma etapa está em dia quando a config (stopwords, versão da análise, topk...) e os hashes das entradas e das
+# saídas batem com o que foi gravado; nas etapas por documento, o hash de cada documento diz quais reaproveitar
+MANIFESTO = "manifesto_build.json"
+VERSAO_MANIFESTO = 1
+TOPK_PADRAO = 10
+
+
+def _hash_bytes(dados: bytes) -> str:
+    return hashlib.blake2b(dados, digest_size=16).hexdigest()
+
+
+def hash_texto(texto: str) -> str:
+    return _hash_bytes(texto.encode('utf-8'))
+
+
+def hash_config(**valores) -> str:
+    return hash_texto(json.dumps(valores, sort_keys=True, ensure_ascii=False))
+
+
+class ManifestoBuild:
+    def __init__(self, jsons_dir: Path):
+        self.dir = Path(jsons_dir)
+        self.path = self.dir / MANIFESTO
+        self.dados: Dict = {"versao": VERSAO_MANIFESTO, "arquivos": {}, "etapas": {}}
+        try:
+            with self.path.open(encoding='utf-8') as f:
+                dados = json.load(f)
+            if dados.get("versao") == VERSAO_MANIFESTO:
+                self.dados = dados
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _rel(self, path: Path) -> str:
+        return Path(os.path.relpath(Path(path).resolve(), self.dir.resolve())).as_posix()
+
+    def hash_arquivo(self, path: Path) -> Optional[str]:
+        path = Path(path)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        rel = self._rel(path)
+        info = self.dados["arquivos"].get(rel)
+        if info and info["mtime_ns"] == st.st_mtime_ns and info["tamanho"] == st.st_size:
+            return info["hash"]
+        h = hash_conteudo(path)
+        self.dados["arquivos"][rel] = {"mtime_ns": st.st_mtime_ns, "tamanho": st.st_size, "hash": h}
+        return h
+
+    #Motivo de a etapa precisar rodar de novo, ou None se ela está em dia
+    def motivo(self, etapa: str, config: str, entradas: List[Path], saidas: List[Path]) -> Optional[str]:
+        reg = self.dados["etapas"].get(etapa)
+        if reg is None:
+            return "sem registro no manifesto"
+        if reg["config"] != config:
+            return "configuração mudou"
+        for p in entradas:
+            if reg["entradas"].get(self._rel(p)) != self.hash_arquivo(p):
+                return f"{Path(p).name} mudou"
+        for p in saidas:
+            h = self.hash_arquivo(p)
+            if h is None:
+                return f"{Path(p).name} não existe"
+            if reg["saidas"].get(self._rel(p)) != h:
+                return f"{Path(p).name} foi alterado fora do build"
+        return None
+
+    #Hash de cada documento da última execução, se a config for a mesma e a saída for a que o build gravou
+    #(saída editada à mão não serve de cache)
+    def docs_reaproveitaveis(self, etapa: str, config: str, saida: Path) -> Dict[str, str]:
+        reg = self.dados["etapas"].get(etapa)
+        if reg is None or reg["config"] != config:
+            return {}
+        h = self.hash_arquivo(saida)
+        if h is None or reg["saidas"].get(self._rel(saida)) != h:
+            return {}
+        return reg.get("docs", {})
+
+    def registrar(self, etapa: str, config: str, entradas: List[Path], saidas: List[Path],
+                  docs: Optional[Dict[str, str]] = None):
+        self.dados["etapas"][etapa] = {
+            "config": config,
+            "entradas": {self._rel(p): self.hash_arquivo(p) for p in entradas},
+            "saidas": {self._rel(p): self.hash_arquivo(p) for p in saidas},
+            "docs": docs or {},
+        }
+
+    def gravar(self):
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump(self.dados, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def _config_preparacao(h_stop: Optional[str]) -> str:
+    return hash_config(etapa="preparacao", stopwords=h_stop, analise=VERSAO_ANALISE)
+
+
+def _config_tokenizacao() -> str:
+    return hash_config(etapa="tokenizacao", padrao=token_re.pattern)
+
+
+#Chave de cada documento nas etapas por documento: o hash do Resumo que entra nela
+def _hash_resumo(item: Dict) -> str:
+    return hash_texto(str(item.get('Resumo', '')))
+
+
+#Registra no manifesto a preparação e a tokenização que já foram gravadas por fora, com as mesmas funções e as mesmas
+#stopwords (a ingestão paralela do ingestao.py): o construir() seguinte as dá como em dia e só roda o que vem depois
+def registrar_etapas_prontas(jsons_dir: Path, stopwords: Path):
+    jsons_dir = Path(jsons_dir)
+    manifesto = ManifestoBuild(jsons_dir)
+    metadados = jsons_dir / "metadados.json"
+    preparados = jsons_dir / "dadospreparados.json"
+    tokenizados = jsons_dir / "dados_tokenizados.json"
+    etapas = (("preparacao", _config_preparacao(manifesto.hash_arquivo(stopwords)), metadados, preparados),
+              ("tokenizacao", _config_tokenizacao(), preparados, tokenizados))
+    for etapa, config, entrada, saida in etapas:
+        with entrada.open(encoding='utf-8') as f:
+            docs = {str(item.get('DocId')): _hash_resumo(item) for item in json.load(f)}
+        manifesto.registrar(etapa, config, [entrada], [saida], docs)
+    manifesto.gravar()
+
+
+#Etapa que gera uma saída por documento (preparação, tokenização): só os documentos cujo hash mudou são refeitos,
+#os outros são copiados da saída anterior. Devolve quantos foram refeitos
+def _etapa_por_documento(manifesto: ManifestoBuild, etapa: str, config: str, entrada: Path, saida: Path,
+                         processar: Callable[[Dict], Dict], chave_doc: Callable[[Dict], str]) -> int:
+    hashes = manifesto.docs_reaproveitaveis(etapa, config, saida)
+    anteriores: Dict[str, Dict] = {}
+    if hashes:
+        with saida.open(encoding='utf-8') as f:
+            anteriores = {str(d.get('DocId')): d for d in json.load(f)}
+    with entrada.open(encoding='utf-8') as f:
+        data = json.load(f)
+    out = []
+    docs: Dict[str, str] = {}
+    refeitos = 0
+    for item in data:
+        doc_id = str(item.get('DocId'))
+        h = chave_doc(item)
+        docs[doc_id] = h
+        anterior = anteriores.get(doc_id)
+        if anterior is not None and hashes.get(doc_id) == h:
+            out.append(anterior)
+        else:
+            out.append(processar(item))
+            refeitos += 1
+    tmp = saida.with_name(saida.name + '.tmp')
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, saida)
+    manifesto.registrar(etapa, config, [entrada], [saida], docs)
+    return refeitos
+
+
+#Vizinhos de cada documento pela matriz do indice_tfidf. Quando só alguns documentos mudaram (pelos hashes da
+#tokenização), atualiza a gravação anterior em vez de refazer todos os pares
+def _etapa_vizinhos(manifesto: ManifestoBuild, jsons_dir: Path, entradas: List[Path], n: int, metodo: str,
+                    verificar: bool, relatorio: Dict[str, str], tempos: Optional[Dict[str, float]]):
+    pasta = jsons_dir / "vizinhos"
+    saidas = [pasta / "doc_ids.npy", pasta / "ids.npy", pasta / "scores.npy"]
+    indice_dir = entradas[-1].parent
+    if not (indice_dir / "vocabulario.json").exists():
+        relatorio["vizinhos"] = "desatualizada: vocabulario.json não existe"
+        return
+    matriz = carregar_indice_binario(str(indice_dir))
+    metodo = resolver_metodo(metodo, len(matriz))
+    config = hash_config(etapa="vizinhos", n=n, metodo=metodo, versao=VERSAO_VIZINHOS)
+    motivo = manifesto.motivo("vizinhos", config, entradas, saidas)
+    if motivo is None:
+        relatorio["vizinhos"] = "em dia"
+        return
+    if verificar:
+        relatorio["vizinhos"] = f"desatualizada: {motivo}"
+        return
+    inicio = time.perf_counter()
+    print(f"Calculando vizinhos ({motivo}) ...")
+    docs = dict(manifesto.dados["etapas"].get("tokenizacao", {}).get("docs", {}))
+    hashes = manifesto.docs_reaproveitaveis("vizinhos", config, saidas[1])
+    anterior = None
+    if hashes and docs:
+        mudados = {int(d) for d, h in docs.items() if hashes.get(d) != h}
+        if len(mudados) + len(set(hashes) - set(docs)) <= FRACAO_REFAZER * len(matriz):
+            try:
+                anterior = carregar_vizinhos(pasta)
+            except (FileNotFoundError, ValueError):
+                anterior = None
+    if anterior is not None:
+        ids, scores, refeitos = atualizar_vizinhos(matriz, anterior, mudados, n, metodo)
+        relatorio["vizinhos"] = f"{refeitos} documento(s) refeito(s)"
+    else:
+        ids, scores = calcular_vizinhos(matriz, n, metodo)
+        relatorio["vizinhos"] = f"refeita ({metodo})"
+    gravar_vizinhos(pasta, matriz.doc_ids, ids, scores, metodo)
+    manifesto.registrar("vizinhos", config, entradas, saidas, docs)
+    if tempos is not None:
+        tempos["vizinhos"] = time.perf_counter() - inicio
+
+
+#Aqui ele roda as etapas do pipeline que estão desatualizadas em relação ao manifesto: preparação e tokenização
+#refazem só os documentos que mudaram; o TF-IDF depende do corpus inteiro (N e df), então roda inteiro, mas só
+#quando os tokens, os títulos ou o topk mudaram; os vizinhos ("mais como este") recalculam só os documentos que
+#mudaram e quem os tinha na lista; a SVD do LSA (se lsa > 0) é refeita inteira quando a matriz muda; o indice.bin
+#(de onde a busca lê as listas, e sobre o qual os segmentos incrementais são sobrepostos) é regravado quando alguma
+#entrada dele mudou, e com binario=False um indice.bin antigo é apagado; os shards são regravados inteiros quando
+#qualquer artefato do corpus muda: com shards=None (o padrão) os que já existem seguem com o número e a partição
+#gravados no info.json, com shards > 0 são refeitos com o novo número e com shards=0 a pasta é apagada. Só no fim, com todas as etapas gravadas, os artefatos são
+#publicados numa geração nova (publicacao.py) e o ponteiro que o servidor observa é trocado.
+#Devolve o que aconteceu com cada etapa (e, se tempos for passado, os segundos de cada uma)
+def construir(jsons_dir: Path, stopwords: Path, topk: int = TOPK_PADRAO, forcar: bool = False,
+              binario: bool = True, verificar: bool = False,
+              tempos: Optional[Dict[str, float]] = None, vizinhos: int = N_VIZINHOS,
+              metodo_vizinhos: str = "auto", lsa: int = DIMENSOES_LSA, shards: Optional[int] = None,
+              particao: str = "faixa") -> Dict[str, str]:
+    jsons_dir = Path(jsons_dir)
+    manifesto = ManifestoBuild(jsons_dir)
+    if forcar:
+        manifesto.dados["etapas"] = {}
+    metadados = jsons_dir / "metadados.json"
+    preparados = jsons_dir / "dadospreparados.json"
+    tokenizados = jsons_dir / "dados_tokenizados.json"
+    termos = jsons_dir / "termos_significativos.json"
+    vocabulario = jsons_dir / "indice_tfidf" / "vocabulario.json"
+    indice_bin = jsons_dir / "indice.bin"
+    if not metadados.exists():
+        raise FileNotFoundError(f"metadados.json não encontrado em {jsons_dir}")
+    h_stop = manifesto.hash_arquivo(stopwords)
+    relatorio: Dict[str, str] = {}
+
+    config = _config_preparacao(h_stop)
+    motivo = manifesto.motivo("preparacao", config, [metadados], [preparados])
+    if motivo is None:
+        relatorio["preparacao"] = "em dia"
+    elif verificar:
+        relatorio["preparacao"] = f"desatualizada: {motivo}"
+    else:
+        inicio = time.perf_counter()
+        print(f"Gerando dadospreparados.json ({motivo}) ...")
+        stops = carregar_stopwords(stopwords)
+        n = _etapa_por_documento(manifesto, "preparacao", config, metadados, preparados,
+                                 lambda item: preparar_documentos([item], stops)[0], _hash_resumo)
+        relatorio["preparacao"] = f"{n} documento(s) refeito(s)"
+        if tempos is not None:
+            tempos["preparacao"] = time.perf_counter() - inicio
+
+    config = _config_tokenizacao()
+    motivo = manifesto.motivo("tokenizacao", config, [preparados], [tokenizados])
+    if motivo is None:
+        relatorio["tokenizacao"] = "em dia"
+    elif verificar:
+        relatorio["tokenizacao"] = f"desatualizada: {motivo}"
+    else:
+        inicio = time.perf_counter()
+        print(f"Gerando dados_tokenizados.json ({motivo}) ...")
+        n = _etapa_por_documento(manifesto, "tokenizacao", config, preparados, tokenizados,
+                                 lambda item: tokenizar_documentos([item])[0], _hash_resumo)
+        relatorio["tokenizacao"] = f"{n} documento(s) refeito(s)"
+        if tempos is not None:
+            tempos["tokenizacao"] = time.perf_counter() - inicio
+
+    config = hash_config(etapa="tfidf", topk=topk, versao=TF_IDF.VERSAO_INDICE)
+    motivo = manifesto.motivo("tfidf", config, [tokenizados, metadados], [termos, vocabulario])
+    if motivo is None:
+        relatorio["tfidf"] = "em dia"
+    elif verificar:
+        relatorio["tfidf"] = f"desatualizada: {motivo}"
+    else:
+        inicio = time.perf_counter()
+        print(f"Gerando termos_significativos.json ({motivo}) ...")
+        codigo = TF_IDF.main(['--input', str(tokenizados), '--output', str(termos), '--topk', str(topk),
+                              '--metadados', str(metadados), '--indice-dir', str(vocabulario.parent)])
+        if codigo:
+            raise RuntimeError(f"TF_IDF terminou com código {codigo}")
+        manifesto.registrar("tfidf", config, [tokenizados, metadados], [termos, vocabulario])
+        relatorio["tfidf"] = "refeita"
+        if tempos is not None:
+            tempos["tfidf"] = time.perf_counter() - inicio
+
+    if vizinhos > 0:
+        _etapa_vizinhos(manifesto, jsons_dir, [tokenizados, vocabulario.parent / "pesos.npy"], vizinhos,
+                        metodo_vizinhos, verificar, relatorio, tempos)
+
+    if lsa > 0:
+        entradas = [tokenizados, vocabulario.parent / "pesos.npy"]
+        pasta_lsa = jsons_dir / "indice_lsa"
+        saidas = [pasta_lsa / "docs.npy", pasta_lsa / "termos.npy", pasta_lsa / "info.json"]
+        config = hash_config(etapa="lsa", k=lsa, versao=VERSAO_LSA)
+        motivo = manifesto.motivo("lsa", config, entradas, saidas)
+        if motivo is None:
+            relatorio["lsa"] = "em dia"
+        elif verificar:
+            relatorio["lsa"] = f"desatualizada: {motivo}"
+        else:
+            inicio = time.perf_counter()
+            print(f"Calculando a SVD do LSA ({motivo}) ...")
+            k = gravar_indice_lsa(carregar_indice_binario(str(vocabulario.parent)), pasta_lsa, lsa)
+            manifesto.registrar("lsa", config, entradas, saidas)
+            relatorio["lsa"] = f"refeita (k={k})"
+            if tempos is not None:
+                tempos["lsa"] = time.perf_counter() - inicio
+
+    if not binario and indice_bin.exists() and not verificar:
+        # a busca não pode servir listas de um corpus que já mudou
+        indice_bin.unlink()
+    if binario:
+        config = hash_config(etapa="binario", versao=VERSAO_BINARIO, stopwords=h_stop, analise=VERSAO_ANALISE)
+        entradas = [metadados, preparados, tokenizados]
+        motivo = manifesto.motivo("binario", config, entradas, [indice_bin])
+        if motivo is None:
+            relatorio["binario"] = "em dia"
+        elif verificar:
+            relatorio["binario"] = f"desatualizada: {motivo}"
+        else:
+            inicio = time.perf_counter()
+            print(f"Gerando indice.bin ({motivo}) ...")
+            gravar_de_jsons(tokenizados, metadados, preparados, indice_bin)
+            manifesto.registrar("binario", config, entradas, [indice_bin])
+            relatorio["binario"] = "refeita"
+            if tempos is not None:
+                tempos["binario"] = time.perf_counter() - inicio
+
+    pasta_shards = jsons_dir / "shards"
+    if shards is None:
+        # sem pedido explícito, os shards que existem continuam com o mesmo número e partição (e em dia com o corpus);
+        # uma pasta sem info.json legível é apagada
+        try:
+            with (pasta_shards / "info.json").open(encoding='utf-8') as f:
+                info = json.load(f)
+            shards, particao = int(info["n"]), info.get("particao", particao)
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            shards = 0
+    if shards > 0:
+        entradas = [metadados, preparados, tokenizados, vocabulario.parent / "pesos.npy"]
+        entradas += [p for p in (jsons_dir / "indice_lsa" / "docs.npy", indice_bin) if p.exists()]
+        saidas = [pasta_shards / "info.json", pasta_shards / "estatisticas.json"]
+        config = hash_config(etapa="shards", n=shards, particao=particao, versao=VERSAO_SHARDS)
+        motivo = manifesto.motivo("shards", config, entradas, saidas)
+        if motivo is None:
+            relatorio["shards"] = "em dia"
+        elif verificar:
+            relatorio["shards"] = f"desatualizada: {motivo}"
+        else:
+            inicio = time.perf_counter()
+            print(f"Gravando {shards} shard(s) ({motivo}) ...")
+            info = gravar_shards(jsons_dir, shards, particao)
+            manifesto.registrar("shards", config, entradas, saidas)
+            relatorio["shards"] = f"refeita ({info['n']} shards por {particao})"
+            if tempos is not None:
+                tempos["shards"] = time.perf_counter() - inicio
+    elif pasta_shards.exists():
+        # shards = 0: a pasta é do build, e shards que não acompanham o corpus não podem ficar pra trás
+        if verificar:
+            relatorio["shards"] = "desatualizada: shards gravados serão apagados"
+        else:
+            shutil.rmtree(pasta_shards)
+            manifesto.dados["etapas"].pop("shards", None)
+            relatorio["shards"] = "apagados"
+
+    fontes = hashes_fontes(jsons_dir, stopwords, manifesto.hash_arquivo)
+    motivo = motivo_publicacao(jsons_dir, manifesto.hash_arquivo, fontes)
+    if motivo is None:
+        relatorio["publicacao"] = "em dia"
+    elif verificar:
+        relatorio["publicacao"] = f"desatualizada: {motivo}"
+    else:
+        pasta = publicar_geracao(jsons_dir, manifesto.hash_arquivo, fontes)
+        relatorio["publicacao"] = f"publicada em {pasta.relative_to(jsons_dir).as_posix()}"
+
+    if not verificar:
+        manifesto.gravar()
+    return relatorio
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description='Refaz só as etapas do pipeline (e os documentos) que mudaram.')
+    parser.add_argument('--dados', '-d', help='Pasta JSONs (padrão: procurada a partir do script).')
+    parser.add_argument('--topk', '-k', type=int, default=TOPK_PADRAO, help='Termos significativos por documento (padrão 10).')
+    parser.add_argument('--forcar', action='store_true', help='Ignora o manifesto e refaz tudo.')
+    parser.add_argument('--sem-binario', action='store_true',
+                        help='Não gera o indice.bin (a busca lê os JSONs e, com segmentos, refaz o corpus em memória).')
+    parser.add_argument('--vizinhos', type=int, default=N_VIZINHOS, help='Vizinhos ("mais como este") por documento (0 = não calcula).')
+    parser.add_argument('--metodo-vizinhos', choices=('auto', 'exato', 'lsh'), default='auto',
+                        help='exato (produto em blocos), lsh (MinHash) ou auto (exato até 20 mil documentos).')
+    parser.add_argument('--lsa', type=int, default=DIMENSOES_LSA, help='Dimensões do LSA (0 = não calcula).')
+    parser.add_argument('--shards', type=int,
+                        help='Grava o índice particionado em N shards (0 = apaga os shards; padrão: mantém os que existem, em dia com o corpus).')
+    parser.add_argument('--particao', choices=PARTICOES, default='faixa',
+                        help='Como dividir os documentos entre os shards: faixa de DocIds ou hash do DocId.')
+    parser.add_argument('--verificar', action='store_true', help='Só informa o que está desatualizado (código 1 se houver).')
+    args = parser.parse_args(argv)
+    try:
+        jsons_dir = Path(args.dados) if args.dados else TF_IDF.find_file('metadados.json').parent
+    except FileNotFoundError as e:
+        print(str(e))
+        return 2
+    relatorio = construir(jsons_dir, jsons_dir.parent / 'stopwords.txt', topk=args.topk, forcar=args.forcar,
+                          binario=not args.sem_binario, verificar=args.verificar, vizinhos=args.vizinhos,
+                          metodo_vizinhos=args.metodo_vizinhos, lsa=args.lsa, shards=args.shards,
+                          particao=args.particao)
+    for etapa, situacao in relatorio.items():
+        print(f"{etapa}: {situacao}")
+    if args.verificar and any(s != "em dia" for s in relatorio.values()):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main(sys.argv[1:]))
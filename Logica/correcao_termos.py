@@ -0,0 +1,147 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .analise import Analisador, analisador_padrao, dobrar_acentos as _sem_acento
+except ImportError:
+    from analise import Analisador, analisador_padrao, dobrar_acentos as _sem_acento
+
+# Termos mais curtos que isso não são corrigidos (qualquer troca vira outra palavra)
+TAMANHO_MINIMO = 3
+MAX_CORRECOES = 3
+TAMANHO_CACHE = 4096
+OPERADORES = ('AND', 'OR', 'NOT', 'NEAR')
+
+_palavra_re = re.compile(r"\w+", flags=re.UNICODE)
+
+
+#Com duas marcas de borda em cada lado, até palavras de 3 letras guardam trigramas depois de uma troca
+def _trigramas(termo: str) -> Set[str]:
+    t = f"##{termo}##"
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+#Distância de edição (Levenshtein) que desiste assim que toda a linha passa de limite; devolve limite + 1 nesse caso
+def _distancia_limitada(a: str, b: str, limite: int) -> int:
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(atual) > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+
+#Forma escrita mais frequente (em minúsculo, com acento) de cada termo do índice nos textos originais: a sugestão
+#da consulta mostra "torcida" e não o radical "torcido". No empate fica a primeira em ordem alfabética
+def formas_de_superficie(textos: Iterable[str], analisador: Analisador) -> Dict[str, str]:
+    contagem: Dict[str, Counter] = {}
+    for texto in textos:
+        for palavra in _palavra_re.findall(texto.lower()):
+            termo = analisador.termo(palavra)
+            if termo:
+                contagem.setdefault(termo, Counter())[palavra] += 1
+    return {termo: min(c.items(), key=lambda kv: (-kv[1], kv[0]))[0] for termo, c in contagem.items()}
+
+
+#Aqui ele monta um índice de trigramas (sem acento, então erro só de acento fica com distância zero) do vocabulário: os candidatos a correção de um termo são só os
+#termos que dividem trigramas suficientes com ele (contados pelas listas dos trigramas da consulta, sem varrer o
+#vocabulário inteiro), e só esses passam pela distância de edição
+class CorretorTermos:
+    def __init__(self, dfs: Dict[str, int], stopwords: Optional[Set[str]] = None,
+                 formas: Optional[Callable[[], Dict[str, str]]] = None):
+        self.termos = sorted(dfs)
+        self.dfs = [dfs[t] for t in self.termos]
+        self._conhecidos = set(self.termos)
+        self._sem_acento = [_sem_acento(t) for t in self.termos]
+        self.stopwords = stopwords or set()
+        # termo -> forma escrita pra mostrar na sugestão (só é montado quando a primeira sugestão aparece)
+        self.formas = formas
+        self.trigramas: Dict[str, List[int]] = {}
+        for i, t in enumerate(self._sem_acento):
+            for g in _trigramas(t):
+                self.trigramas.setdefault(g, []).append(i)
+        self.corrigir = lru_cache(maxsize=TAMANHO_CACHE)(self._corrigir)
+
+    def __contains__(self, termo: str) -> bool:
+        return termo in self._conhecidos
+
+    #Erros permitidos: 1 em palavras curtas, 2 nas maiores
+    @staticmethod
+    def _limite(termo: str) -> int:
+        return 1 if len(termo) <= 5 else 2
+
+    #Termos do vocabulário mais próximos de um termo desconhecido (menor distância, depois maior df); vazio se o
+    #termo já existe, é stopword ou não tem nada perto o bastante
+    def _corrigir(self, termo: str) -> Tuple[str, ...]:
+        if termo in self._conhecidos or termo in self.stopwords or len(termo) < TAMANHO_MINIMO or termo.isdigit():
+            return ()
+        alvo = _sem_acento(termo)
+        limite = self._limite(alvo)
+        gramas = _trigramas(alvo)
+        # cada edição destrói no máximo 3 trigramas
+        minimo = max(1, len(gramas) - 3 * limite)
+        contagem = Counter()
+        for g in gramas:
+            contagem.update(self.trigramas.get(g, ()))
+        achados = []
+        for i, comuns in contagem.items():
+            if comuns < minimo:
+                continue
+            d = _distancia_limitada(alvo, self._sem_acento[i], limite)
+            if d <= limite:
+                achados.append((d, _distancia_limitada(termo, self.termos[i], limite + 1), -self.dfs[i], self.termos[i]))
+        if not achados:
+            return ()
+        achados.sort()
+        melhor = achados[0][0]
+        return tuple(t for d, _, _, t in achados[:MAX_CORRECOES] if d == melhor)
+
+    #Como um termo do índice aparece escrito nos textos; sem as formas, o próprio termo
+    def forma(self, termo: str) -> str:
+        if self.formas is None:
+            return termo
+        return self.formas().get(termo, termo)
+
+    #Troca, na consulta, as palavras desconhecidas pela forma escrita da melhor correção ("você quis dizer");
+    #None se nada mudou
+    def sugerir_consulta(self, query: str) -> Optional[str]:
+        mudou = False
+
+        def _trocar(m: re.Match) -> str:
+            nonlocal mudou
+            palavra = m.group(0)
+            # operador ou pedaço de curinga (torc*) fica como está
+            vizinhos = query[max(m.start() - 1, 0):m.start()] + query[m.end():m.end() + 1]
+            if palavra.upper() in OPERADORES or '*' in vizinhos or '?' in vizinhos:
+                return palavra
+            correcoes = self.corrigir(analisador_padrao().termo(palavra))
+            if not correcoes:
+                return palavra
+            mudou = True
+            forma = self.forma(correcoes[0])
+            return forma.capitalize() if palavra[:1].isupper() else forma
+
+        sugestao = _palavra_re.sub(_trocar, query)
+        return sugestao if mudou else None
+
+
+#Vetor da consulta com os termos desconhecidos trocados pela correção mais próxima que exista no vocabulário de quem vai
+#pontuar (conhece); o peso do termo errado vai pra correção
+def corrigir_vetor(query_vec: Dict[str, float], conhece: Callable[[str], bool],
+                   corretor: Optional[Callable[[], CorretorTermos]]) -> Dict[str, float]:
+    if corretor is None or all(conhece(t) for t in query_vec):
+        return query_vec
+    c = corretor()
+    vec: Dict[str, float] = {}
+    for termo, peso in query_vec.items():
+        if not conhece(termo):
+            termo = next((t for t in c.corrigir(termo) if conhece(t)), termo)
+        vec[termo] = vec.get(termo, 0.0) + peso
+    return vec
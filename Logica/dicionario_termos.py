@@ -0,0 +1,73 @@
+import heapq
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Prefixos até esse tamanho têm as melhores completações calculadas na montagem (são os de faixa mais larga)
+PREFIXO_PRECALCULADO = 2
+MAX_COMPLETACOES = 10
+MAX_EXPANSAO = 2000
+TAMANHO_CACHE = 4096
+
+
+#Aqui ele guarda o vocabulário ordenado (com o df de cada termo) pra achar por busca binária a faixa de termos
+#que começam com um prefixo; curingas * e ? são resolvidos só dentro da faixa do prefixo antes do primeiro curinga
+class DicionarioTermos:
+    def __init__(self, dfs: Dict[str, int]):
+        self.termos = sorted(dfs)
+        self.dfs = [dfs[t] for t in self.termos]
+        self._topo: Dict[str, List[Tuple[str, int]]] = {}
+        for termo, df in zip(self.termos, self.dfs):
+            for n in range(1, min(PREFIXO_PRECALCULADO, len(termo)) + 1):
+                heap = self._topo.setdefault(termo[:n], [])
+                item = (df, _inverso(termo), termo)
+                if len(heap) < MAX_COMPLETACOES:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        self._topo = {p: [(t, df) for df, _, t in sorted(h, reverse=True)] for p, h in self._topo.items()}
+        self.expandir = lru_cache(maxsize=TAMANHO_CACHE)(self._expandir)
+        self.completar = lru_cache(maxsize=TAMANHO_CACHE)(self._completar)
+
+    def __len__(self) -> int:
+        return len(self.termos)
+
+    def faixa(self, prefixo: str) -> Tuple[int, int]:
+        lo = bisect_left(self.termos, prefixo)
+        hi = bisect_left(self.termos, prefixo + '\U0010ffff', lo)
+        return lo, hi
+
+    #Termos do vocabulário que casam com o padrão (futeb*, estádio?); sem curinga devolve o próprio termo se existir
+    def _expandir(self, padrao: str) -> Tuple[str, ...]:
+        if '*' not in padrao and '?' not in padrao:
+            lo, hi = self.faixa(padrao)
+            return (padrao,) if lo < hi and self.termos[lo] == padrao else ()
+        corte = min(i for i in (padrao.find('*'), padrao.find('?')) if i >= 0)
+        lo, hi = self.faixa(padrao[:corte])
+        if padrao[corte:] == '*':
+            return tuple(self.termos[lo:min(hi, lo + MAX_EXPANSAO)])
+        regex = re.compile(''.join('.*' if c == '*' else '.' if c == '?' else re.escape(c) for c in padrao) + r'\Z')
+        out = []
+        for i in range(lo, hi):
+            if regex.match(self.termos[i]):
+                out.append(self.termos[i])
+                if len(out) >= MAX_EXPANSAO:
+                    break
+        return tuple(out)
+
+    #As completações mais frequentes (maior df) de um prefixo
+    def _completar(self, prefixo: str, n: int = MAX_COMPLETACOES) -> Tuple[Tuple[str, int], ...]:
+        if not prefixo:
+            return ()
+        if len(prefixo) <= PREFIXO_PRECALCULADO and n <= MAX_COMPLETACOES:
+            return tuple(self._topo.get(prefixo, [])[:n])
+        lo, hi = self.faixa(prefixo)
+        melhores = heapq.nlargest(n, range(lo, hi), key=lambda i: (self.dfs[i], _inverso(self.termos[i])))
+        return tuple((self.termos[i], self.dfs[i]) for i in melhores)
+
+
+#Chave que faz a ordem alfabética "ao contrário" dentro do heap, pra empate de df sair em ordem alfabética. O 1 no
+#fim (maior que qualquer -ord) faz um termo vir antes dos que começam com ele (gol antes de goleiro)
+def _inverso(termo: str) -> Tuple[int, ...]:
+    return tuple(-ord(c) for c in termo) + (1,)
@@ -0,0 +1,118 @@
+import heapq
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .analise import dobrar_acentos
+    from .motor_bitset import _posicoes_para_bitset
+except ImportError:
+    from analise import dobrar_acentos
+    from motor_bitset import _posicoes_para_bitset
+
+# Campos dos metadados que viram faceta; no Autor cada nome separado por vírgula é um valor
+CAMPOS_FACETA = ("Autor", "Filiacao", "Arquivo")
+MAX_VALORES_FACETA = 10
+# Filtros já normalizados: ((campo, (valor, ...)), ...), ordenados. Valores do mesmo campo são OR entre si e campos
+# diferentes são AND. É hashable, então entra direto na chave do cache de resultados
+Filtros = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+#Valor de faceta comparável: sem acento, minúsculo e com os espaços normalizados ("Ensslin, Sandra" = "ensslin, sandra")
+def chave_valor(valor: str) -> str:
+    return " ".join(dobrar_acentos(str(valor)).lower().split())
+
+
+def valores_do_campo(campo: str, valor) -> List[str]:
+    if not valor:
+        return []
+    partes = str(valor).split(",") if campo == "Autor" else [str(valor)]
+    return [p.strip() for p in partes if p.strip()]
+
+
+#Aceita {campo: valor} ou {campo: [valores]}; campo fora de CAMPOS_FACETA é erro (ValueError)
+def normalizar_filtros(filtros: Optional[Mapping[str, Iterable[str]]]) -> Filtros:
+    if not filtros:
+        return ()
+    out = []
+    for campo, valores in filtros.items():
+        if campo not in CAMPOS_FACETA:
+            raise ValueError(f"campo de faceta desconhecido: {campo}")
+        if isinstance(valores, str):
+            valores = [valores]
+        chaves = tuple(sorted({chave_valor(v) for v in valores if v and str(v).strip()}))
+        if chaves:
+            out.append((campo, chaves))
+    return tuple(sorted(out))
+
+
+#Posições (ordenadas) dos bits ligados, vetorizado: serve pra levar um filtro pro espaço de linhas de outro motor
+def posicoes_de_bits(bits: int, n: int) -> np.ndarray:
+    buf = np.frombuffer(bits.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(buf, bitorder='little')[:n])
+
+
+#Aqui ele monta, pra cada campo, valor -> bitset dos documentos (no mesmo espaço denso do motor booleano, então o
+#filtro é um AND direto com o resultado da consulta). Também guarda os valores de cada documento, pra contar as
+#facetas de um resultado pequeno sem passar por todos os valores do campo
+class IndiceFacetas:
+    def __init__(self, doc_ids: Sequence[int], metas: Iterable[Mapping]):
+        self.n_docs = len(doc_ids)
+        self.rotulos: Dict[str, Dict[str, str]] = {c: {} for c in CAMPOS_FACETA}
+        self.valores_doc: Dict[str, List[Tuple[str, ...]]] = {c: [] for c in CAMPOS_FACETA}
+        posicoes: Dict[str, Dict[str, List[int]]] = {c: {} for c in CAMPOS_FACETA}
+        for pos, meta in enumerate(metas):
+            for campo in CAMPOS_FACETA:
+                chaves = []
+                for valor in valores_do_campo(campo, meta.get(campo)):
+                    chave = chave_valor(valor)
+                    if chave in chaves:
+                        continue
+                    chaves.append(chave)
+                    posicoes[campo].setdefault(chave, []).append(pos)
+                    self.rotulos[campo].setdefault(chave, valor)
+                self.valores_doc[campo].append(tuple(chaves))
+        self.bits: Dict[str, Dict[str, int]] = {
+            campo: {chave: _posicoes_para_bitset(lista, self.n_docs) for chave, lista in valores.items()}
+            for campo, valores in posicoes.items()
+        }
+
+    #Bitset dos documentos que passam nos filtros (None = sem filtro)
+    def filtro(self, filtros: Filtros) -> Optional[int]:
+        if not filtros:
+            return None
+        resultado = (1 << self.n_docs) - 1
+        for campo, chaves in filtros:
+            bits = 0
+            for chave in chaves:
+                bits |= self.bits[campo].get(chave, 0)
+            resultado &= bits
+            if not resultado:
+                break
+        return resultado
+
+    #Contagem de cada valor dentro do resultado (bitset). Resultado pequeno: conta pelos valores dos documentos dele;
+    #grande: um AND + bit_count por valor do campo. Devolve os n valores mais frequentes de cada campo
+    def contar(self, bits: int, campos: Sequence[str] = CAMPOS_FACETA,
+               n: int = MAX_VALORES_FACETA) -> Dict[str, List[Dict]]:
+        total = bits.bit_count()
+        posicoes = None
+        out = {}
+        for campo in campos:
+            if total < len(self.bits[campo]):
+                if posicoes is None:
+                    posicoes = posicoes_de_bits(bits, self.n_docs)
+                valores_doc = self.valores_doc[campo]
+                contagem = Counter(chave for p in posicoes for chave in valores_doc[p])
+                itens = [(c, chave) for chave, c in contagem.items()]
+            else:
+                itens = []
+                for chave, b in self.bits[campo].items():
+                    c = (b & bits).bit_count()
+                    if c:
+                        itens.append((c, chave))
+            rotulos = self.rotulos[campo]
+            melhores = heapq.nsmallest(n, itens, key=lambda it: (-it[0], rotulos[it[1]]))
+            out[campo] = [{"valor": rotulos[chave], "contagem": c} for c, chave in melhores]
+        return out
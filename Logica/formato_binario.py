@@ -0,0 +1,388 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .TF_IDF import find_file, load_tokenized
+    from .analise import Analisador, analisador_padrao
+    from .tokenizacao import posicoes_termos
+except ImportError:
+    from TF_IDF import find_file, load_tokenized
+    from analise import Analisador, analisador_padrao
+    from tokenizacao import posicoes_termos
+
+# É daqui que o booleano (bitsets) e o BM25 leem as listas e os tamanhos dos documentos, termo a termo e sob demanda;
+# os pesos TF-IDF ficam no indice_tfidf. Com segmentos incrementais, o df, os tamanhos e os momentos gravados aqui
+# são a base que o CorpusVivo corrige, sem ler o corpus. Layout do arquivo (little-endian). Cabeçalho: MAGIC,
+# versão, nº de documentos, nº de termos, nº de tokens do corpus e o offset de cada seção. Seções, nesta ordem:
+#   termo_offsets  u64[T+1]  -> início de cada termo no termo_blob (termos ordenados, UTF-8)
+#   termo_blob
+#   post_offsets   u64[T+1]  -> início da lista de cada termo no post_blob
+#   post_blob                -> por posting: varint(delta da linha do documento) + varint(tf)
+#   post_ptr       u64[T+1]  -> índice do primeiro posting de cada termo (df acumulado)
+#   doc_ids        i64[N]    -> DocId de cada linha (ordenado)
+#   tamanhos       u32[N]    -> nº de tokens de cada documento
+#   doc_ptr        u64[N+1]  -> início dos termos de cada documento nas duas seções abaixo
+#   doc_termos     u32[nnz]  -> número de cada termo do documento (em ordem)
+#   doc_tfs        u32[nnz]  -> tf de cada um
+#   momentos       f64[3N]   -> por documento, soma de tf², tf²·ln(df) e tf²·(ln df)²: com eles a norma TF-IDF
+#                               (soma de (tf·(ln N - ln df))²) sai pra qualquer N sem percorrer os termos
+#   str_offsets    u64[N*C+1]-> início de cada campo de texto (CAMPOS) de cada documento no str_blob
+#   str_blob
+#   tok_ptr        u64[N+1]  -> primeiro token indexado de cada documento nas duas seções abaixo
+#   tok_spans      u32[2K]   -> (início, fim) de cada token indexado, em caracteres do Resumo original
+#   tok_termos     u32[K]    -> número do termo de cada token no dicionário (SEM_TERMO se não estiver nele)
+#   pos_ptr        u64[P+1]  -> início das posições de cada posting (na ordem do post_blob) no pos_blob
+#   pos_blob                 -> posições do termo no ResumoPreparado (varint do delta), pras frases e o NEAR/k
+MAGIC = b'SRIB'
+VERSAO = 5
+SEM_TERMO = 0xFFFFFFFF
+CAMPOS = ('Titulo', 'Autor', 'Filiacao', 'Arquivo', 'Resumo', 'ResumoPreparado')
+_SECOES = ('termo_offsets', 'termo_blob', 'post_offsets', 'post_blob', 'post_ptr', 'doc_ids', 'tamanhos',
+           'doc_ptr', 'doc_termos', 'doc_tfs', 'momentos', 'str_offsets', 'str_blob', 'tok_ptr', 'tok_spans',
+           'tok_termos', 'pos_ptr', 'pos_blob')
+_CABECALHO = struct.Struct('<4sIIIQ' + 'Q' * (len(_SECOES) + 1))
+
+
+def _varint(n: int, out: bytearray):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+#Decodifica de uma vez uma sequência inteira de varints (em numpy, sem laço Python por byte)
+def _ler_varints(buf) -> np.ndarray:
+    b = np.frombuffer(buf, dtype=np.uint8)
+    if not len(b):
+        return np.zeros(0, dtype=np.int64)
+    ultimo = b < 0x80
+    inicio = np.flatnonzero(np.concatenate(([True], ultimo[:-1])))
+    grupo = np.cumsum(ultimo) - ultimo
+    partes = (b & 0x7F).astype(np.int64) << ((np.arange(len(b)) - inicio[grupo]) * 7)
+    return np.add.reduceat(partes, inicio)
+
+
+#Aqui ele grava o índice inteiro num arquivo só. Grava num .tmp e troca no final, pra quem estiver lendo nunca ver arquivo pela metade
+#As posições dos tokens no Resumo saem da mesma cadeia de análise que gerou as contagens
+def gravar_indice_binario(path: Path, metadados: List[Dict], contagens: Dict[int, Dict[str, int]],
+                          preparados: Optional[Dict[int, str]] = None,
+                          analisador: Optional[Analisador] = None) -> Path:
+    analisador = analisador or analisador_padrao()
+    meta_map = {int(m.get('DocId')): m for m in metadados}
+    preparados = preparados or {}
+    doc_ids = sorted(set(meta_map) | set(contagens))
+    linha = {d: i for i, d in enumerate(doc_ids)}
+
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for doc_id in doc_ids:
+        for termo, tf in contagens.get(doc_id, {}).items():
+            postings.setdefault(termo, []).append((linha[doc_id], int(tf)))
+    termos = sorted(postings)
+
+    termo_offsets = [0]
+    termo_blob = bytearray()
+    post_offsets = [0]
+    post_blob = bytearray()
+    post_ptr = [0]
+    posicoes = [posicoes_termos(preparados.get(d, '')) for d in doc_ids]
+    pos_ptr = [0]
+    pos_blob = bytearray()
+    for termo in termos:
+        termo_blob += termo.encode('utf-8')
+        termo_offsets.append(len(termo_blob))
+        anterior = 0
+        for row, tf in postings[termo]:
+            _varint(row - anterior, post_blob)
+            _varint(tf, post_blob)
+            anterior = row
+            p_anterior = 0
+            for p in posicoes[row].get(termo, ()):
+                _varint(p - p_anterior, pos_blob)
+                p_anterior = p
+            pos_ptr.append(len(pos_blob))
+        post_offsets.append(len(post_blob))
+        post_ptr.append(post_ptr[-1] + len(postings[termo]))
+
+    tamanhos = [int(sum(contagens.get(d, {}).values())) for d in doc_ids]
+    numero = {t: i for i, t in enumerate(termos)}
+    doc_ptr = [0]
+    doc_termos: List[int] = []
+    doc_tfs: List[int] = []
+    for doc_id in doc_ids:
+        for i, tf in sorted((numero[t], int(tf)) for t, tf in contagens.get(doc_id, {}).items()):
+            doc_termos.append(i)
+            doc_tfs.append(tf)
+        doc_ptr.append(len(doc_termos))
+    ln_df = np.log(np.diff(np.asarray(post_ptr, dtype=np.float64)))[np.asarray(doc_termos, dtype=np.int64)]
+    tf2 = np.square(np.asarray(doc_tfs, dtype=np.float64))
+    dono = np.repeat(np.arange(len(doc_ids)), np.diff(doc_ptr))
+    momentos = np.stack([np.bincount(dono, weights=w, minlength=len(doc_ids))
+                         for w in (tf2, tf2 * ln_df, tf2 * ln_df * ln_df)], axis=1)
+    str_offsets = [0]
+    str_blob = bytearray()
+    for doc_id in doc_ids:
+        meta = meta_map.get(doc_id, {})
+        for campo in CAMPOS:
+            if campo == 'ResumoPreparado':
+                valor = preparados.get(doc_id, '')
+            elif campo == 'Titulo':
+                valor = meta.get('Titulo') or meta.get('Título') or ''
+            else:
+                valor = meta.get(campo) or ''
+            str_blob += str(valor).encode('utf-8')
+            str_offsets.append(len(str_blob))
+
+    tok_ptr = [0]
+    tok_spans: List[int] = []
+    tok_termos: List[int] = []
+    for doc_id in doc_ids:
+        resumo = str(meta_map.get(doc_id, {}).get('Resumo') or '')
+        for ini, fim, termo in analisador.trechos(resumo):
+            tok_spans += (ini, fim)
+            tok_termos.append(numero.get(termo, SEM_TERMO))
+        tok_ptr.append(len(tok_termos))
+
+    secoes = {
+        'termo_offsets': struct.pack(f'<{len(termo_offsets)}Q', *termo_offsets),
+        'termo_blob': bytes(termo_blob),
+        'post_offsets': struct.pack(f'<{len(post_offsets)}Q', *post_offsets),
+        'post_blob': bytes(post_blob),
+        'post_ptr': struct.pack(f'<{len(post_ptr)}Q', *post_ptr),
+        'doc_ids': struct.pack(f'<{len(doc_ids)}q', *doc_ids),
+        'tamanhos': struct.pack(f'<{len(tamanhos)}I', *tamanhos),
+        'doc_ptr': struct.pack(f'<{len(doc_ptr)}Q', *doc_ptr),
+        'doc_termos': struct.pack(f'<{len(doc_termos)}I', *doc_termos),
+        'doc_tfs': struct.pack(f'<{len(doc_tfs)}I', *doc_tfs),
+        'momentos': momentos.astype('<f8').tobytes(),
+        'str_offsets': struct.pack(f'<{len(str_offsets)}Q', *str_offsets),
+        'str_blob': bytes(str_blob),
+        'tok_ptr': struct.pack(f'<{len(tok_ptr)}Q', *tok_ptr),
+        'tok_spans': struct.pack(f'<{len(tok_spans)}I', *tok_spans),
+        'tok_termos': struct.pack(f'<{len(tok_termos)}I', *tok_termos),
+        'pos_ptr': struct.pack(f'<{len(pos_ptr)}Q', *pos_ptr),
+        'pos_blob': bytes(pos_blob),
+    }
+    offsets = []
+    pos = _CABECALHO.size
+    for nome in _SECOES:
+        pos += (-pos) % 8  # cada seção começa alinhada em 8 bytes
+        offsets.append(pos)
+        pos += len(secoes[nome])
+    offsets.append(pos)
+
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with tmp.open('wb') as f:
+        f.write(_CABECALHO.pack(MAGIC, VERSAO, len(doc_ids), len(termos), sum(tamanhos), *offsets))
+        for nome, inicio in zip(_SECOES, offsets):
+            f.write(b'\0' * (inicio - f.tell()))
+            f.write(secoes[nome])
+    os.replace(tmp, path)
+    return path
+
+
+#Leitor do índice: abre com mmap e não decodifica nada antes de ser pedido. Vários processos que abrem o mesmo
+#arquivo compartilham as mesmas páginas do page cache. Tem .lista(termo) e .doc_ids, então também serve direto
+#pro busca_booleana_indice; o MotorBitset e o BM25 do gerenciador leem as listas por linhas_tfs
+class IndiceBinario:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with self.path.open('rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+        cab = _CABECALHO.unpack_from(self._buf, 0)
+        magic, versao, self.n_docs, self.n_termos, self.n_tokens = cab[:5]
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} não é um índice binário válido.")
+        if versao != VERSAO:
+            raise ValueError(f"Versão do índice em {self.path} não suportada: {versao}")
+        offs = cab[5:]
+        sec = {nome: (offs[i], offs[i + 1]) for i, nome in enumerate(_SECOES)}
+
+        def _vetor(nome: str, fmt: str):
+            ini, fim = sec[nome]
+            tam = struct.calcsize(fmt)
+            return self._buf[ini:ini + ((fim - ini) // tam) * tam].cast(fmt)
+
+        self._termo_offsets = _vetor('termo_offsets', 'Q')
+        self._termo_blob = self._buf[sec['termo_blob'][0]:sec['termo_blob'][1]]
+        self._post_offsets = _vetor('post_offsets', 'Q')
+        self._post_blob = self._buf[sec['post_blob'][0]:sec['post_blob'][1]]
+        self._post_ptr = _vetor('post_ptr', 'Q')
+        self.doc_ids: Sequence[int] = _vetor('doc_ids', 'q')
+        self.tamanhos: Sequence[int] = _vetor('tamanhos', 'I')[:self.n_docs]
+
+        # as mesmas páginas vistas pelo numpy (contas vetorizadas do BM25 e dos segmentos); o tamanho vem da contagem,
+        # não da seção, que pode ter o alinhamento no fim
+        def _np(nome: str, dtype: str, n: int) -> np.ndarray:
+            return np.frombuffer(self._mm, dtype=dtype, count=n, offset=sec[nome][0])
+
+        self.doc_ids_np = _np('doc_ids', '<i8', self.n_docs)
+        self.tamanhos_np = _np('tamanhos', '<u4', self.n_docs)
+        self._doc_ptr = _vetor('doc_ptr', 'Q')
+        nnz = self._doc_ptr[self.n_docs]
+        self._doc_termos = _np('doc_termos', '<u4', nnz)
+        self._doc_tfs = _np('doc_tfs', '<u4', nnz)
+        self.momentos = _np('momentos', '<f8', 3 * self.n_docs).reshape(-1, 3)
+        self._str_offsets = _vetor('str_offsets', 'Q')
+        self._str_blob = self._buf[sec['str_blob'][0]:sec['str_blob'][1]]
+        self._tok_ptr = _vetor('tok_ptr', 'Q')
+        self._tok_spans = _vetor('tok_spans', 'I')
+        self._tok_termos = _vetor('tok_termos', 'I')
+        self._pos_ptr = _vetor('pos_ptr', 'Q')
+        self._pos_blob = self._buf[sec['pos_blob'][0]:sec['pos_blob'][1]]
+        self._linhas_do_termo = lru_cache(maxsize=256)(self._decodificar_linhas)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def termo(self, i: int) -> str:
+        return bytes(self._termo_blob[self._termo_offsets[i]:self._termo_offsets[i + 1]]).decode('utf-8')
+
+    #Busca binária no dicionário de termos (ordenado), decodificando só os termos visitados
+    def buscar_termo(self, termo: str) -> Optional[int]:
+        alvo = termo.encode('utf-8')
+        lo, hi = 0, self.n_termos
+        while lo < hi:
+            mid = (lo + hi) // 2
+            atual = bytes(self._termo_blob[self._termo_offsets[mid]:self._termo_offsets[mid + 1]])
+            if atual < alvo:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_termos and bytes(self._termo_blob[self._termo_offsets[lo]:self._termo_offsets[lo + 1]]) == alvo:
+            return lo
+        return None
+
+    def df(self, termo: str) -> int:
+        i = self.buscar_termo(termo)
+        return 0 if i is None else self._post_ptr[i + 1] - self._post_ptr[i]
+
+    #df de todos os termos (pro dicionário de curingas/autocompletar e pro corretor; decodifica o vocabulário inteiro)
+    def dfs(self) -> Dict[str, int]:
+        return {self.termo(i): self._post_ptr[i + 1] - self._post_ptr[i] for i in range(self.n_termos)}
+
+    #Números dos termos (em ordem) e tf de cada um numa linha
+    def termos_da_linha(self, linha: int) -> Tuple[np.ndarray, np.ndarray]:
+        a, b = self._doc_ptr[linha], self._doc_ptr[linha + 1]
+        return self._doc_termos[a:b], self._doc_tfs[a:b]
+
+    #Linhas (em ordem crescente) e tf dos documentos de um termo, decodificados de uma vez em arrays; None se o termo
+    #não está no dicionário
+    def linhas_tfs(self, termo: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = self.buscar_termo(termo)
+        if i is None:
+            return None
+        valores = _ler_varints(self._post_blob[self._post_offsets[i]:self._post_offsets[i + 1]])
+        return np.cumsum(valores[0::2]), valores[1::2]
+
+    def _decodificar_linhas(self, i: int) -> np.ndarray:
+        return np.cumsum(_ler_varints(self._post_blob[self._post_offsets[i]:self._post_offsets[i + 1]])[0::2])
+
+    #Posições (no ResumoPreparado) de um termo numa linha: acha o posting da linha por busca binária nas linhas do
+    #termo (decodificadas uma vez e guardadas) e decodifica só as posições dele
+    def posicoes(self, termo: str, linha: int) -> List[int]:
+        i = self.buscar_termo(termo)
+        if i is None:
+            return []
+        linhas = self._linhas_do_termo(i)
+        k = int(np.searchsorted(linhas, linha))
+        if k == len(linhas) or linhas[k] != linha:
+            return []
+        j = self._post_ptr[i] + k
+        return np.cumsum(_ler_varints(self._pos_blob[self._pos_ptr[j]:self._pos_ptr[j + 1]])).tolist()
+
+    #Decodifica a lista de um termo: [(linha, tf)], linhas em ordem crescente
+    def postings_linhas(self, termo: str) -> List[Tuple[int, int]]:
+        lista = self.linhas_tfs(termo)
+        if lista is None:
+            return []
+        return list(zip(lista[0].tolist(), lista[1].tolist()))
+
+    def lista(self, termo: str) -> List[int]:
+        return [self.doc_ids[row] for row, _ in self.postings_linhas(termo)]
+
+    def linha(self, doc_id: int) -> Optional[int]:
+        i = bisect_left(self.doc_ids, doc_id)
+        if i < self.n_docs and self.doc_ids[i] == doc_id:
+            return i
+        return None
+
+    def campo(self, doc_id: int, campo: str) -> str:
+        row = self.linha(doc_id)
+        if row is None:
+            return ''
+        k = row * len(CAMPOS) + CAMPOS.index(campo)
+        return bytes(self._str_blob[self._str_offsets[k]:self._str_offsets[k + 1]]).decode('utf-8')
+
+    #Monta o dict de metadados de um documento (mesmas chaves do metadados.json) só quando é pedido
+    def documento(self, doc_id: int) -> Dict:
+        row = self.linha(doc_id)
+        if row is None:
+            return {}
+        doc = {'DocId': int(doc_id)}
+        base = row * len(CAMPOS)
+        for j, campo in enumerate(CAMPOS):
+            doc[campo] = bytes(self._str_blob[self._str_offsets[base + j]:self._str_offsets[base + j + 1]]).decode('utf-8')
+        return doc
+
+
+    #Tokens indexados do Resumo de um documento: spans [ini0, fim0, ini1, fim1, ...] e o número do termo de cada um
+    #(fatias do mmap, nada é decodificado nem re-tokenizado)
+    def tokens(self, doc_id: int) -> Tuple[Sequence[int], Sequence[int]]:
+        row = self.linha(doc_id)
+        if row is None:
+            return (), ()
+        ini, fim = self._tok_ptr[row], self._tok_ptr[row + 1]
+        return self._tok_spans[2 * ini:2 * fim], self._tok_termos[ini:fim]
+
+
+def abrir_indice_binario(path: str) -> IndiceBinario:
+    return IndiceBinario(path)
+
+
+#Gera o índice binário a partir dos JSONs que o pipeline já produz; devolve quantos documentos foram gravados
+def gravar_de_jsons(tok_path: Path, meta_path: Path, prep_path: Optional[Path], out_path: Path) -> int:
+    with meta_path.open('r', encoding='utf-8') as f:
+        metadados = json.load(f)
+    preparados = {}
+    if prep_path is not None and prep_path.exists():
+        with prep_path.open('r', encoding='utf-8') as f:
+            preparados = {int(d.get('DocId')): d.get('Resumo', '') for d in json.load(f)}
+    contagens = load_tokenized(tok_path)
+    gravar_indice_binario(out_path, metadados, contagens, preparados)
+    return len(contagens)
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description='Gerar o índice binário (indice.bin) a partir dos JSONs.')
+    parser.add_argument('--saida', '-o', help='Caminho de saída (padrão: indice.bin na pasta JSONs).')
+    args = parser.parse_args(argv)
+    try:
+        tok_path = find_file('dados_tokenizados.json')
+        meta_path = find_file('metadados.json')
+    except FileNotFoundError as e:
+        print(str(e))
+        return 2
+    try:
+        prep_path = find_file('dadospreparados.json')
+    except FileNotFoundError:
+        prep_path = None
+    out_path = Path(args.saida) if args.saida else (tok_path.parent / 'indice.bin')
+    n = gravar_de_jsons(tok_path, meta_path, prep_path, out_path)
+    print(f"Índice binário com {n} documentos gravado em: {out_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main(sys.argv[1:]))
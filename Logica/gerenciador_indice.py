@@ -0,0 +1,931 @@
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Hashable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+try:
+    from .preparacao import carregar_stopwords
+    from . import TF_IDF
+    from .busca_booleana import (carregar_indice_booleano, _conjuntos_de_contagens, _tokenize_query, _normalize_term,
+                                 _normalize_frase, _palavras_frase, _is_frase, _is_near, _is_curinga)
+    from .indice_invertido import construir_indice_invertido
+    from .motor_bitset import MotorBitset, _chave_consulta, _posicoes_para_bitset
+    from .busca_vetorial_esparsa import (MatrizTfIdf, MatrizSobreposta, carregar_matriz_tfidf, carregar_indice_binario,
+                                         matriz_de_vetores)
+    from .busca_bm25 import IndiceBM25, IndiceBM25Binario, carregar_indice_bm25, K1_PADRAO, B_PADRAO
+    from .formato_binario import IndiceBinario, abrir_indice_binario
+    from .indexacao_incremental import EstadoIncremental, CorpusVivo
+    from .indice_posicional import IndicePosicional, PosicionalBinario
+    from .dicionario_termos import DicionarioTermos
+    from .correcao_termos import CorretorTermos, formas_de_superficie
+    from .busca_espaco_vetorial import _build_query_vector
+    from .cache_resultados import CacheResultados, CAPACIDADE_PADRAO, TTL_PADRAO
+    from .paginacao import ResultadoBooleano, ResultadoDocIds, ResultadoRanqueado, prefixo_para
+    from .trechos import Trecho, gerar_trecho, TAMANHO_TRECHO
+    from .analise import obter_analisador
+    from .facetas import IndiceFacetas, Filtros, CAMPOS_FACETA, MAX_VALORES_FACETA, posicoes_de_bits
+    from .vizinhos import Vizinhos, N_VIZINHOS, carregar_vizinhos, vizinhos_de_linha
+    from .busca_lsa import MatrizLsa, MIN_COSSENO, carregar_indice_lsa
+    from .shards import (abrir_shards, carregar_estatisticas, pasta_shard, juntar_ranqueados, juntar_booleanos,
+                         juntar_facetas, motivo_shards)
+    from .publicacao import PONTEIRO, HashesArquivos, motivo_desatualizada, pasta_publicada
+except ImportError:
+    from preparacao import carregar_stopwords
+    import TF_IDF
+    from busca_booleana import (carregar_indice_booleano, _conjuntos_de_contagens, _tokenize_query, _normalize_term,
+                                _normalize_frase, _palavras_frase, _is_frase, _is_near, _is_curinga)
+    from indice_invertido import construir_indice_invertido
+    from motor_bitset import MotorBitset, _chave_consulta, _posicoes_para_bitset
+    from busca_vetorial_esparsa import (MatrizTfIdf, MatrizSobreposta, carregar_matriz_tfidf, carregar_indice_binario,
+                                        matriz_de_vetores)
+    from busca_bm25 import IndiceBM25, IndiceBM25Binario, carregar_indice_bm25, K1_PADRAO, B_PADRAO
+    from formato_binario import IndiceBinario, abrir_indice_binario
+    from indexacao_incremental import EstadoIncremental, CorpusVivo
+    from indice_posicional import IndicePosicional, PosicionalBinario
+    from dicionario_termos import DicionarioTermos
+    from correcao_termos import CorretorTermos, formas_de_superficie
+    from busca_espaco_vetorial import _build_query_vector
+    from cache_resultados import CacheResultados, CAPACIDADE_PADRAO, TTL_PADRAO
+    from paginacao import ResultadoBooleano, ResultadoDocIds, ResultadoRanqueado, prefixo_para
+    from trechos import Trecho, gerar_trecho, TAMANHO_TRECHO
+    from analise import obter_analisador
+    from facetas import IndiceFacetas, Filtros, CAMPOS_FACETA, MAX_VALORES_FACETA, posicoes_de_bits
+    from vizinhos import Vizinhos, N_VIZINHOS, carregar_vizinhos, vizinhos_de_linha
+    from busca_lsa import MatrizLsa, MIN_COSSENO, carregar_indice_lsa
+    from shards import (abrir_shards, carregar_estatisticas, pasta_shard, juntar_ranqueados, juntar_booleanos,
+                        juntar_facetas, motivo_shards)
+    from publicacao import PONTEIRO, HashesArquivos, motivo_desatualizada, pasta_publicada
+
+# Modelos de busca; qualquer outro nome cai no vetorial, como na rota /resultados
+MODELOS = ("booleano", "vetorial", "bm25", "lsa", "hibrido")
+# No booleano o resultado é o bitset (paginado por iterador), ou a lista de DocIds quando vem dos shards; nos outros,
+# os top_k (DocId, score)
+Resultados = Union[ResultadoBooleano, ResultadoDocIds, ResultadoRanqueado]
+# Um pedido do lote: (consulta, modelo, top_k, filtros de faceta)
+Pedido = Tuple[str, str, Optional[int], Filtros]
+# No lote, as consultas do vetorial são pontuadas juntas em pedaços desse tamanho (uma matriz densa
+# pedaço x documentos por vez); nos outros modelos cada tarefa do pool leva esse tanto de consultas
+LOTE_VETORIAL = 32
+LOTE_TAREFA = 16
+# Estruturas que cada processo de shard monta antes de receber buscas
+AQUECER_SHARD = ("motor_booleano", "bm25")
+# Segundos que os processos dos shards de uma geração substituída ainda esperam (buscas em andamento) antes de fechar
+ESPERA_FECHAR_SHARDS = 30.0
+
+
+# O que o gerenciador observa (mtime/tamanho) pra saber se há geração nova: o ponteiro da publicação, trocado só
+# depois que o build inteiro terminou (publicacao.py), e o log dos segmentos incrementais. Os artefatos em si nunca
+# são observados, então um build pela metade não dispara recarga
+ARTEFATOS = (
+    PONTEIRO,
+    "segmentos/registro.ndjson",
+)
+
+
+# Sem esses o Indice não abre; os outros artefatos têm fallback (indice.bin -> JSONs, indice_tfidf ->
+# termos_significativos.json, sem shards -> busca local) ou só desligam um recurso (vizinhos, LSA)
+ARTEFATOS_OBRIGATORIOS = (
+    "metadados.json",
+    "dadospreparados.json",
+    "dados_tokenizados.json",
+)
+
+
+#Só confere se os artefatos publicados existem: o build (construcao.py, pelo manifesto de hashes) roda pela linha de
+#comando ou no deploy, nunca dentro de uma requisição. Versões de formato (indice.bin, shards) são conferidas quando
+#cada arquivo é aberto; se a geração publicada ficou pra trás das fontes, o gerenciador só avisa (desatualizado)
+def verificar_artefatos(jsons_dir: Path):
+    faltando = [nome for nome in ARTEFATOS_OBRIGATORIOS if not (Path(jsons_dir) / nome).exists()]
+    if faltando:
+        raise FileNotFoundError(f"Índice incompleto em {jsons_dir} (faltam: {', '.join(faltando)}). "
+                                f"Gere com: python Logica/construcao.py")
+
+
+#Aqui fica tudo o que a busca precisa de um corpus já indexado. Os arquivos mapeados (indice.bin, indice_tfidf)
+#são abertos na hora; o resto (bitsets, BM25, mapas de metadados) só é montado na primeira vez que alguém usa.
+#Se houver segmentos incrementais (JSONs/segmentos), eles são sobrepostos ao corpus base.
+#Com shards > 0 e os shards gravados em JSONs/shards, as buscas vão pro CoordenadorShards (um processo por shard) e
+#aqui ficam só os metadados, trechos e correções pra montar as páginas; com segmentos, ou se os shards gravados
+#não são do corpus desta pasta (nº de documentos ou hash), a busca continua local (os shards são do corpus base). estatisticas é o que um Indice de shard recebe pra pontuar como o corpus inteiro.
+#Os segmentos são lidos da pasta segmentos (padrão: a própria jsons_dir; numa geração publicada, a pasta JSONs)
+class Indice:
+    def __init__(self, jsons_dir: Path, k1: float = K1_PADRAO, b: float = B_PADRAO, geracao: int = 0,
+                 stopwords: Optional[Path] = None, shards: int = 0, estatisticas: Optional[Dict] = None,
+                 segmentos: Optional[Path] = None):
+        self.jsons_dir = Path(jsons_dir)
+        self.geracao = geracao
+        self.stopwords_path = Path(stopwords) if stopwords else self.jsons_dir.parent / "stopwords.txt"
+        self.k1 = k1
+        self.b = b
+        self.estatisticas = estatisticas
+        # reentrante: uma estrutura preguiçosa pode depender de outra (bm25 -> contagens_base)
+        self._lock = threading.RLock()
+        self._estruturas: Dict[str, object] = {}
+        path_bin = self.jsons_dir / "indice.bin"
+        self.binario: Optional[IndiceBinario] = None
+        if path_bin.exists():
+            try:
+                self.binario = abrir_indice_binario(str(path_bin))
+            except ValueError as e:
+                # indice.bin de outra versão: segue pelos JSONs até o formato_binario.py gerar um novo
+                print("Ignorando índice binário:", e)
+        self.incremental = EstadoIncremental(Path(segmentos) if segmentos else self.jsons_dir)
+        self.usar_shards = False
+        if shards > 0 and self.incremental.vazio and (self.jsons_dir / "shards").exists():
+            n_docs = len(self.binario) if self.binario is not None else len(self.contagens_base)
+            motivo = motivo_shards(self.jsons_dir, n_docs)
+            if motivo is None:
+                self.usar_shards = True
+            else:
+                # shards de outro corpus (um build sem --shards depois de mudar o corpus, por exemplo): busca local
+                print("Ignorando shards:", motivo)
+        self._numeros_termos = lru_cache(maxsize=256)(self._numeros_termos_sem_cache)
+        self._trechos_calculados = lru_cache(maxsize=1024)(self._calcular_trechos)
+
+    def _preguicoso(self, nome: str, construir: Callable[[], object]):
+        valor = self._estruturas.get(nome)
+        if valor is None:
+            with self._lock:
+                valor = self._estruturas.get(nome)
+                if valor is None:
+                    valor = construir()
+                    self._estruturas[nome] = valor
+        return valor
+
+    def estruturas_montadas(self) -> Tuple[str, ...]:
+        return tuple(self._estruturas)
+
+    #Monta de uma vez as estruturas pedidas (usado pra aquecer uma geração nova antes da troca)
+    def aquecer(self, nomes: Tuple[str, ...]):
+        for nome in nomes:
+            getattr(self, nome)
+
+    def _carregar_json(self, nome: str):
+        with (self.jsons_dir / nome).open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    #Segmentos sobrepostos ao indice.bin: espaço denso, df, N e tamanhos do corpus vivo sem ler o corpus base
+    @property
+    def corpus_vivo(self) -> CorpusVivo:
+        return self._preguicoso("corpus_vivo", lambda: CorpusVivo(self.binario, self.incremental))
+
+    #Leitura das listas pro booleano e pro BM25: o indice.bin, com os segmentos por cima se houver (None sem binário)
+    @property
+    def _fonte_listas(self) -> Optional[Union[IndiceBinario, CorpusVivo]]:
+        if self.binario is None:
+            return None
+        return self.binario if self.incremental.vazio else self.corpus_vivo
+
+    #Contagens de termos dos documentos da base (dados_tokenizados.json, sem os segmentos; só sem o indice.bin)
+    @property
+    def contagens_base(self) -> Dict[int, Dict[str, int]]:
+        return self._preguicoso("contagens_base",
+                                lambda: TF_IDF.load_tokenized(self.jsons_dir / "dados_tokenizados.json"))
+
+    #N, tamanho médio e df do corpus vivo com os segmentos: os da base corrigidos pelos deltas e pelas lápides
+    @property
+    def estatisticas_vivas(self) -> Dict:
+        return self._preguicoso("estatisticas_vivas", lambda: self.incremental.estatisticas(self.contagens_base))
+
+    #Documentos da base escondidos pelos segmentos (removidos ou substituídos)
+    @property
+    def _ocultos_base(self) -> Dict[int, Dict[str, int]]:
+        def _construir():
+            base = self.contagens_base
+            return {d: base[d] for d in sorted(self.incremental.removidos_base) if d in base}
+        return self._preguicoso("_ocultos_base", _construir)
+
+    @property
+    def stopwords(self) -> Set[str]:
+        def _construir():
+            return carregar_stopwords(self.stopwords_path) if self.stopwords_path.exists() else set()
+        return self._preguicoso("stopwords", _construir)
+
+    @property
+    def motor_booleano(self) -> MotorBitset:
+        def _construir():
+            if self._fonte_listas is not None:
+                # bitsets montados termo a termo a partir das listas do indice.bin mapeado
+                invertido = self._fonte_listas
+            elif self.incremental.vazio:
+                invertido = carregar_indice_booleano(str(self.jsons_dir / "dados_tokenizados.json"))
+            else:
+                # sem o indice.bin: listas da base, tirando os documentos escondidos e pondo os dos segmentos
+                novos = {d: reg["Tokens"] for d, reg in self.incremental.docs.items()}
+                invertido = construir_indice_invertido(_conjuntos_de_contagens(self.contagens_base)).com_documentos(
+                    _conjuntos_de_contagens(novos), _conjuntos_de_contagens(self._ocultos_base))
+            # o posicional só é aberto quando a primeira frase/NEAR aparecer
+            return MotorBitset(invertido, posicional=lambda: self.posicional, stopwords=self.stopwords,
+                               corretor=lambda: self.corretor)
+        return self._preguicoso("motor_booleano", _construir)
+
+    #Vocabulário ordenado do motor booleano (curingas e autocompletar)
+    @property
+    def dicionario(self) -> DicionarioTermos:
+        return self._preguicoso("dicionario", lambda: self.motor_booleano.dicionario)
+
+    #Índice de trigramas do vocabulário pra corrigir termos digitados errado (os três modelos usam o mesmo). Num shard
+    #o vocabulário é o do corpus inteiro: termo que só existe em outro shard não é "corrigido" aqui
+    @property
+    def corretor(self) -> CorretorTermos:
+        def _construir():
+            if self.estatisticas is not None:
+                return CorretorTermos(self.estatisticas["df"], stopwords=self.stopwords)
+            d = self.dicionario
+            return CorretorTermos(dict(zip(d.termos, d.dfs)), stopwords=self.stopwords, formas=lambda: self.formas)
+        return self._preguicoso("corretor", _construir)
+
+    #Forma escrita de cada termo no título e no resumo originais dos documentos vivos (a sugestão "você quis dizer")
+    @property
+    def formas(self) -> Dict[str, str]:
+        def _construir():
+            textos = []
+            for doc_id in self.motor_booleano.doc_ids:
+                m = self.meta(doc_id)
+                textos.append(f"{m.get('Titulo') or m.get('Título') or ''} {m.get('Resumo') or ''}")
+            return formas_de_superficie(textos, obter_analisador(self.stopwords))
+        return self._preguicoso("formas", _construir)
+
+    #Posições dos termos no resumo preparado de cada documento (frases e NEAR/k): as do indice.bin, gravadas na
+    #construção, com as dos segmentos por cima. Sem o indice.bin são montadas aqui a partir dos preparados
+    @property
+    def posicional(self) -> Union[PosicionalBinario, IndicePosicional]:
+        def _construir():
+            if self.binario is not None:
+                if self.incremental.vazio:
+                    return PosicionalBinario(self.binario)
+                segmentos = IndicePosicional({d: reg.get("ResumoPreparado", "")
+                                              for d, reg in self.incremental.docs.items()})
+                return PosicionalBinario(self.binario, segmentos, self.incremental.removidos_base)
+            textos = {d: self.prep(d).get("Resumo", "") for d in self.motor_booleano.doc_ids}
+            return IndicePosicional(textos)
+        return self._preguicoso("posicional", _construir)
+
+    #Com segmentos, o TF-IDF é pontuado direto das listas do corpus vivo, com o idf dele (MatrizSobreposta)
+    @property
+    def matriz_tfidf(self) -> Union[MatrizTfIdf, MatrizSobreposta]:
+        def _construir():
+            if not self.incremental.vazio:
+                if self.binario is not None:
+                    return MatrizSobreposta(self.corpus_vivo)
+                # sem o indice.bin os pesos dos documentos vivos são recalculados em memória
+                pesos, _ = TF_IDF.compute_tfidf(self.incremental.contagens_vivas(self.contagens_base))
+                return matriz_de_vetores(pesos)
+            # prefere o índice completo (todos os termos, mmap); termos_significativos.json fica de fallback
+            indice_dir = self.jsons_dir / "indice_tfidf"
+            if (indice_dir / "vocabulario.json").exists():
+                return carregar_indice_binario(str(indice_dir))
+            return carregar_matriz_tfidf(str(self.jsons_dir / "termos_significativos.json"))
+
+        def _com_corretor():
+            matriz = _construir()
+            matriz.corretor = lambda: self.corretor
+            return matriz
+        return self._preguicoso("matriz_tfidf", _com_corretor)
+
+    #Embeddings do LSA (JSONs/indice_lsa, mmap). Com segmentos, os documentos novos são dobrados no espaço latente
+    #e os removidos saem, numa cópia em memória
+    @property
+    def lsa(self) -> MatrizLsa:
+        def _construir():
+            lsa = carregar_indice_lsa(self.jsons_dir / "indice_lsa")
+            if not self.incremental.vazio:
+                lsa = lsa.com_documentos({d: reg["Tokens"] for d, reg in self.incremental.docs.items()},
+                                         self.incremental.removidos_base)
+            lsa.corretor = lambda: self.corretor
+            return lsa
+        return self._preguicoso("lsa", _construir)
+
+    @property
+    def bm25(self) -> IndiceBM25:
+        def _construir():
+            if self._fonte_listas is not None:
+                bm25 = IndiceBM25Binario(self._fonte_listas, k1=self.k1, b=self.b, estatisticas=self.estatisticas)
+            elif self.incremental.vazio:
+                bm25 = carregar_indice_bm25(str(self.jsons_dir / "dados_tokenizados.json"), k1=self.k1, b=self.b,
+                                            estatisticas=self.estatisticas)
+            else:
+                # sem o indice.bin: N, tamanho médio e df vêm das estatísticas vivas (base corrigida pelos deltas e
+                # lápides) e as listas são remontadas em memória
+                bm25 = IndiceBM25(self.incremental.contagens_vivas(self.contagens_base), k1=self.k1, b=self.b,
+                                  estatisticas=self.estatisticas_vivas)
+            bm25.corretor = lambda: self.corretor
+            return bm25
+        return self._preguicoso("bm25", _construir)
+
+    @property
+    def coordenador(self) -> "CoordenadorShards":
+        return self._preguicoso("coordenador", lambda: CoordenadorShards(self.jsons_dir / "shards", self.k1, self.b,
+                                                                         self.stopwords_path))
+
+    #Fecha os processos dos shards (se esta geração chegou a abrir)
+    def fechar(self):
+        coordenador = self._estruturas.get("coordenador")
+        if coordenador is not None:
+            coordenador.fechar()
+
+    @property
+    def _meta_map(self) -> Dict[int, Dict]:
+        return self._preguicoso("_meta_map", lambda: {int(m.get("DocId")): m for m in self._carregar_json("metadados.json")})
+
+    @property
+    def _prep_map(self) -> Dict[int, Dict]:
+        return self._preguicoso("_prep_map", lambda: {int(d.get("DocId")): d for d in self._carregar_json("dadospreparados.json")})
+
+    def meta(self, doc_id: int) -> Dict:
+        reg = self.incremental.docs.get(doc_id)
+        if reg is not None:
+            return {k: v for k, v in reg.items() if k not in ("Tokens", "ResumoPreparado", "Tamanho", "Trechos")}
+        if doc_id in self.incremental.removidos_base:
+            return {}
+        if self.binario is not None:
+            return self.binario.documento(doc_id)
+        return self._meta_map.get(doc_id, {})
+
+    def prep(self, doc_id: int) -> Dict:
+        reg = self.incremental.docs.get(doc_id)
+        if reg is not None:
+            return {"DocId": doc_id, "Resumo": reg.get("ResumoPreparado", "")}
+        if doc_id in self.incremental.removidos_base:
+            return {}
+        if self.binario is not None:
+            resumo = self.binario.campo(doc_id, "ResumoPreparado")
+            return {"DocId": doc_id, "Resumo": resumo} if resumo else {}
+        return self._prep_map.get(doc_id, {})
+
+    def __len__(self) -> int:
+        if not self.incremental.vazio:
+            if self.binario is not None:
+                return len(self.corpus_vivo)
+            return self.estatisticas_vivas["n_docs"]
+        if self.binario is not None:
+            return len(self.binario)
+        return len(self._meta_map)
+
+    #Chave da consulta pro cache: o que a análise deixa igual ("Torcidas" e "torcida") cai na mesma entrada
+    def chave_consulta(self, modelo: str, consulta: str) -> Hashable:
+        if modelo in ("booleano", "hibrido"):
+            return _chave_consulta(consulta)
+        return tuple(sorted(_build_query_vector(consulta).items()))
+
+    #Termos (já analisados) que a consulta faz aparecer no documento: palavras e frases, curingas expandidos e
+    #as correções dos termos fora do vocabulário; operadores e parênteses ficam de fora. Com positivos=True, os
+    #termos debaixo de um NOT (direto ou por um grupo entre parênteses) também ficam de fora
+    def termos_consulta(self, consulta: str, positivos: bool = False) -> FrozenSet[str]:
+        termos: Set[str] = set()
+        # negação de cada nível de parênteses e a de um NOT que ainda espera o operando
+        negados = [False]
+        pendente = False
+        for tok in _tokenize_query(consulta):
+            up = tok.upper()
+            if up == 'NOT':
+                pendente = not pendente
+                continue
+            if tok == '(':
+                negados.append(negados[-1] != pendente)
+                pendente = False
+                continue
+            if tok == ')':
+                if len(negados) > 1:
+                    negados.pop()
+                continue
+            if up in ('AND', 'OR') or _is_near(up):
+                continue
+            negado = negados[-1] != pendente
+            pendente = False
+            if positivos and negado:
+                continue
+            if _is_frase(tok):
+                termos.update(_palavras_frase(_normalize_frase(tok)))
+                continue
+            termo = _normalize_term(tok)
+            if not termo:
+                continue
+            if _is_curinga(termo):
+                termos.update(self.dicionario.expandir(termo))
+            else:
+                termos.add(termo)
+                termos.update(self.corretor.corrigir(termo))
+        return frozenset(termos)
+
+    def _numeros_termos_sem_cache(self, termos: FrozenSet[str]) -> FrozenSet[int]:
+        numeros = (self.binario.buscar_termo(t) for t in termos)
+        return frozenset(n for n in numeros if n is not None)
+
+    #Documento sem tokens gravados (índice sem indice.bin ou segmento antigo): calcula uma vez e guarda
+    def _calcular_trechos(self, doc_id: int) -> Tuple[Tuple[int, int, str], ...]:
+        texto = self.meta(doc_id).get("Resumo") or ""
+        return tuple(obter_analisador(self.stopwords).trechos(texto))
+
+    #Trecho do Resumo com os termos da consulta destacados, a partir das posições dos tokens gravadas na indexação
+    def trecho(self, doc_id: int, termos: FrozenSet[str], max_chars: int = TAMANHO_TRECHO) -> Trecho:
+        texto = self.meta(doc_id).get("Resumo") or ""
+        reg = self.incremental.docs.get(doc_id)
+        if reg is None and self.binario is not None:
+            spans, numeros = self.binario.tokens(doc_id)
+            return gerar_trecho(texto, spans, numeros, self._numeros_termos(termos), max_chars)
+        tokens = reg.get("Trechos") if reg is not None else None
+        if tokens is None:
+            tokens = self._trechos_calculados(doc_id)
+        spans = [p for ini, fim, _ in tokens for p in (ini, fim)]
+        return gerar_trecho(texto, spans, [t for _, _, t in tokens], termos, max_chars)
+
+    #Vizinhos calculados offline pelo construcao.py (JSONs/vizinhos, mmap); None se ainda não foram gravados
+    @property
+    def vizinhos(self) -> Optional[Vizinhos]:
+        def _construir():
+            try:
+                return carregar_vizinhos(self.jsons_dir / "vizinhos")
+            except (FileNotFoundError, ValueError):
+                return None
+        return self._preguicoso("vizinhos", _construir)
+
+    #Linha do documento na matriz TF-IDF (as linhas estão em ordem de DocId)
+    def _linha_matriz(self, doc_id: int) -> Optional[int]:
+        doc_ids = self.matriz_tfidf.doc_ids
+        linha = int(np.searchsorted(doc_ids, doc_id))
+        return linha if linha < len(doc_ids) and int(doc_ids[linha]) == doc_id else None
+
+    #Documentos parecidos ("mais como este"): uma busca nos vizinhos gravados. Com segmentos incrementais, os vizinhos
+    #gravados não conhecem os documentos novos nem o idf atual: são calculados na hora contra o corpus vivo (o custo
+    #é o de uma consulta com os termos do documento)
+    def relacionados(self, doc_id: int, n: int = N_VIZINHOS) -> List[Tuple[int, float]]:
+        if self.incremental.vazio and self.vizinhos is not None:
+            lista = self.vizinhos.de(doc_id)
+            if lista is not None:
+                return lista[:n]
+        linha = self._linha_matriz(doc_id)
+        if linha is None:
+            return []
+        matriz = self.matriz_tfidf
+        if isinstance(matriz, MatrizSobreposta):
+            return matriz.vizinhos(linha, n)
+        lista = vizinhos_de_linha(matriz, linha, n)
+        docs, removidos = self.incremental.docs, self.incremental.removidos_base
+        return [(d, s) for d, s in lista if d in docs or d not in removidos][:n]
+
+    #Campos de faceta de um documento sem decodificar o resto (o Resumo fica no indice.bin)
+    def _campos_faceta(self, doc_id: int) -> Dict:
+        reg = self.incremental.docs.get(doc_id)
+        if reg is None and self.binario is not None and self.binario.linha(doc_id) is not None:
+            return {c: self.binario.campo(doc_id, c) for c in CAMPOS_FACETA}
+        return self.meta(doc_id)
+
+    #Valor -> bitset de documentos de cada campo de faceta, no espaço do motor booleano
+    @property
+    def facetas(self) -> IndiceFacetas:
+        def _construir():
+            doc_ids = self.motor_booleano.doc_ids
+            return IndiceFacetas(doc_ids, (self._campos_faceta(d) for d in doc_ids))
+        return self._preguicoso("facetas", _construir)
+
+    #Linha de cada documento do motor booleano no outro motor (-1 se não estiver nele), pra levar o filtro pra lá
+    def _permutacao(self, nome: str, doc_ids_motor) -> np.ndarray:
+        def _construir():
+            ids = np.asarray(doc_ids_motor, dtype=np.int64)
+            procurados = np.asarray(self.motor_booleano.doc_ids, dtype=np.int64)
+            if not len(ids):
+                return np.full(len(procurados), -1, dtype=np.int64)
+            ordem = np.argsort(ids, kind='stable')
+            k = np.minimum(np.searchsorted(ids[ordem], procurados), len(ids) - 1)
+            return np.where(ids[ordem][k] == procurados, ordem[k], -1)
+        return self._preguicoso("permutacao_" + nome, _construir)
+
+    def _linhas_filtro(self, nome: str, doc_ids_motor, bits: int) -> np.ndarray:
+        linhas = self._permutacao(nome, doc_ids_motor)[posicoes_de_bits(bits, len(self.motor_booleano.doc_ids))]
+        return np.sort(linhas[linhas >= 0])
+
+    #Roda a busca no modelo pedido, sem cache (no booleano o top_k não se aplica: o total vem do bitset).
+    #Com filtros de faceta, o conjunto permitido é resolvido por bitset antes: o booleano faz um AND, o BM25 e o
+    #vetorial só pontuam os documentos que passaram
+    def buscar(self, modelo: str, consulta: str, top_k: Optional[int] = None, filtros: Filtros = ()) -> Resultados:
+        if self.usar_shards:
+            return self.coordenador.buscar(modelo, consulta, top_k, filtros)
+        permitido = self.facetas.filtro(filtros) if filtros else None
+        if modelo == "booleano":
+            motor = self.motor_booleano
+            bits = motor.avaliar(consulta)
+            return ResultadoBooleano(motor, bits if permitido is None else bits & permitido)
+        if modelo == "hibrido":
+            return self._buscar_hibrido(consulta, top_k, permitido)
+        if modelo == "bm25":
+            filtro = None if permitido is None else self._linhas_filtro("bm25", self.bm25.doc_ids, permitido)
+            ranking = self.bm25.buscar(consulta, top_k=top_k, filtro=filtro)
+        elif modelo == "lsa":
+            lsa = self.lsa
+            linhas = None if permitido is None else self._linhas_filtro("lsa", lsa.doc_ids, permitido)
+            ranking = lsa.buscar(consulta, top_k=top_k, linhas=linhas)
+        else:
+            matriz = self.matriz_tfidf
+            linhas = None if permitido is None else self._linhas_filtro("matriz", matriz.doc_ids, permitido)
+            ranking = matriz.buscar(consulta, top_k=top_k, linhas=linhas)
+        return ResultadoRanqueado(tuple((int(r["DocId"]), float(r["score"])) for r in ranking), top_k)
+
+    #Híbrido: a expressão booleana define os candidatos (bitset, já com os filtros) e só eles são pontuados pelo BM25
+    #com os termos positivos da consulta; o BM25 percorre as listas desses termos restritas aos candidatos (ou, com
+    #poucos candidatos, pontua cada um por busca binária). Candidato sem nenhum termo positivo (em "NOT x", por
+    #exemplo) vem depois, com score 0, em ordem de DocId. O total é a contagem do bitset
+    def _buscar_hibrido(self, consulta: str, top_k: Optional[int], permitido: Optional[int]) -> ResultadoRanqueado:
+        motor = self.motor_booleano
+        bits = motor.avaliar(consulta)
+        if permitido is not None:
+            bits &= permitido
+        total = bits.bit_count()
+        if not total:
+            return ResultadoRanqueado((), top_k, 0)
+        bm25 = self.bm25
+        pesos = {t: 1.0 for t in self.termos_consulta(consulta, positivos=True)}
+        ranking = bm25.buscar_vetor(pesos, top_k, self._linhas_filtro("bm25", bm25.doc_ids, bits)) if pesos else []
+        itens = [(int(r["DocId"]), float(r["score"])) for r in ranking]
+        limite = total if top_k is None else min(top_k, total)
+        if len(itens) < limite:
+            vistos = {d for d, _ in itens}
+            for doc_id in motor.iterar(bits):
+                if doc_id not in vistos:
+                    itens.append((doc_id, 0.0))
+                    if len(itens) >= limite:
+                        break
+        return ResultadoRanqueado(tuple(itens), top_k, total)
+
+    #Documentos que a consulta alcança (no booleano e no híbrido, o resultado da expressão; no LSA, os que entram no ranking; nos outros
+    #ranqueados, os que têm algum termo dela, com as correções), já com os filtros: é sobre eles que as facetas são contadas
+    def bits_resultado(self, modelo: str, consulta: str, filtros: Filtros = ()) -> int:
+        motor = self.motor_booleano
+        if modelo in ("booleano", "hibrido"):
+            bits = motor.avaliar(consulta)
+        elif modelo == "lsa":
+            lsa = self.lsa
+            linhas = self._permutacao("lsa", lsa.doc_ids)
+            # o 0 a mais no fim é o score das posições -1 (documento fora do LSA)
+            scores = np.append(lsa.pontuar(consulta), 0.0)
+            bits = _posicoes_para_bitset(np.flatnonzero(scores[linhas] > MIN_COSSENO).tolist(), len(motor.doc_ids))
+        else:
+            bits = 0
+            for termo in _build_query_vector(consulta):
+                bits |= motor._termo(termo)
+        permitido = self.facetas.filtro(filtros) if filtros else None
+        return bits if permitido is None else bits & permitido
+
+    def contar_facetas(self, modelo: str, consulta: str, filtros: Filtros = (),
+                       n: int = MAX_VALORES_FACETA) -> Dict[str, List[Dict]]:
+        if self.usar_shards:
+            return self.coordenador.contar_facetas(modelo, consulta, filtros, n)
+        return self.facetas.contar(self.bits_resultado(modelo, consulta, filtros), n=n)
+
+    #Várias consultas do mesmo modelo de uma vez: no vetorial é um produto esparso só pro lote inteiro (a coluna
+    #de cada termo é lida uma vez) e no LSA um produto denso; no booleano, no BM25 e no híbrido os planos
+    #compilados e as listas já ficam compartilhados
+    def buscar_lote(self, modelo: str, consultas: Sequence[str], top_k: Optional[int] = None,
+                    filtros: Filtros = ()) -> List[Resultados]:
+        if self.usar_shards:
+            return self.coordenador.buscar_lote(modelo, consultas, top_k, filtros)
+        if modelo in ("booleano", "bm25", "hibrido") or filtros:
+            return [self.buscar(modelo, c, top_k, filtros) for c in consultas]
+        matriz = self.lsa if modelo == "lsa" else self.matriz_tfidf
+        rankings = matriz.buscar_lote(list(consultas), top_k=top_k)
+        return [ResultadoRanqueado(tuple((int(r["DocId"]), float(r["score"])) for r in ranking), top_k)
+                for ranking in rankings]
+
+
+# Índice do shard deste processo (montado pelo inicializador do pool do shard)
+_indice_shard: Optional[Indice] = None
+
+
+def _iniciar_shard(pasta: str, k1: float, b: float, stopwords: str):
+    global _indice_shard
+    pasta = Path(pasta)
+    _indice_shard = Indice(pasta, k1=k1, b=b, stopwords=Path(stopwords),
+                           estatisticas=carregar_estatisticas(pasta.parent))
+    _indice_shard.aquecer(AQUECER_SHARD)
+
+
+def _shard_pronto() -> int:
+    return len(_indice_shard)
+
+
+#O bitset do booleano só vale dentro do shard (posições densas dele): volta como a contagem e os primeiros top_k
+#DocIds em ordem, e só isso atravessa o processo
+def _buscar_no_shard(modelo: str, consultas: List[str], top_k: Optional[int], filtros: Filtros) -> List:
+    out = []
+    for r in _indice_shard.buscar_lote(modelo, consultas, top_k, filtros):
+        if isinstance(r, ResultadoBooleano):
+            r = (r.total, np.fromiter(islice(r.motor.iterar(r.bits), top_k), dtype=np.int64))
+        out.append(r)
+    return out
+
+
+def _contar_no_shard(modelo: str, consulta: str, filtros: Filtros) -> Dict[str, List[Dict]]:
+    return _indice_shard.contar_facetas(modelo, consulta, filtros, n=sys.maxsize)
+
+
+#Aqui ele coordena os shards: cada shard tem um processo só dele (um ProcessPoolExecutor de 1 trabalhador), com o
+#Indice da pasta do shard montado e os arquivos mapeados, então as buscas de shards diferentes rodam em núcleos
+#diferentes. Cada busca (ou lote) vai pra todos os shards de uma vez e as respostas são juntadas: os top_k por merge
+#com heap, o booleano pelos DocIds e as facetas somadas. Como o BM25 dos shards usa o N, o tamanho médio e o df do
+#corpus inteiro e os pesos do TF-IDF e do LSA já vêm do corpus inteiro, os scores são os do índice sem shards
+class CoordenadorShards:
+    def __init__(self, pasta: Path, k1: float = K1_PADRAO, b: float = B_PADRAO, stopwords: Optional[Path] = None):
+        self.pasta = Path(pasta)
+        self.info = abrir_shards(self.pasta)
+        stopwords = Path(stopwords) if stopwords else self.pasta.parent.parent / "stopwords.txt"
+        # spawn em vez de fork: o servidor já tem threads (Flask, observador, pool do lote) quando os shards sobem
+        contexto = multiprocessing.get_context("spawn")
+        self.pools = [
+            ProcessPoolExecutor(max_workers=1, mp_context=contexto, initializer=_iniciar_shard,
+                                initargs=(str(pasta_shard(self.pasta, i)), k1, b, str(stopwords)))
+            for i in range(self.info["n"])
+        ]
+        # sobe os processos (e monta o índice de cada shard) já aqui, todos em paralelo
+        try:
+            self._todos(_shard_pronto)
+        except Exception:
+            self.fechar()
+            raise
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    def _todos(self, funcao: Callable, *args) -> List:
+        futuros = [pool.submit(funcao, *args) for pool in self.pools]
+        return [f.result() for f in futuros]
+
+    def buscar_lote(self, modelo: str, consultas: Sequence[str], top_k: Optional[int] = None,
+                    filtros: Filtros = ()) -> List[Resultados]:
+        partes = self._todos(_buscar_no_shard, modelo, list(consultas), top_k, filtros)
+        if modelo == "booleano":
+            return [juntar_booleanos([p[i] for p in partes], top_k) for i in range(len(consultas))]
+        return [juntar_ranqueados([p[i] for p in partes], top_k) for i in range(len(consultas))]
+
+    def buscar(self, modelo: str, consulta: str, top_k: Optional[int] = None, filtros: Filtros = ()) -> Resultados:
+        return self.buscar_lote(modelo, [consulta], top_k, filtros)[0]
+
+    def contar_facetas(self, modelo: str, consulta: str, filtros: Filtros = (),
+                       n: int = MAX_VALORES_FACETA) -> Dict[str, List[Dict]]:
+        return juntar_facetas(self._todos(_contar_no_shard, modelo, consulta, filtros), n)
+
+    def fechar(self):
+        for pool in self.pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+#Carrega o índice já construído no primeiro uso e mantém a "geração" atual.
+#Quando os artefatos publicados mudam (ou alguém pede pela rota de admin) uma geração nova é montada e aquecida
+#em segundo plano e só então trocada por uma única atribuição; requisições em andamento continuam na antiga
+class GerenciadorIndice:
+    def __init__(self, jsons_dir: Path, stopwords: Optional[Path] = None, k1: float = K1_PADRAO, b: float = B_PADRAO,
+                 intervalo_observacao: float = 0.0, cache_capacidade: int = CAPACIDADE_PADRAO,
+                 cache_ttl: float = TTL_PADRAO, trabalhadores: Optional[int] = None, shards: int = 0):
+        self.jsons_dir = Path(jsons_dir)
+        self.stopwords = Path(stopwords) if stopwords else self.jsons_dir.parent / "stopwords.txt"
+        self.k1 = k1
+        self.b = b
+        self.intervalo_observacao = intervalo_observacao
+        self._indice: Optional[Indice] = None
+        self._lock = threading.Lock()
+        self._lock_recarga = threading.Lock()
+        self._assinatura: Optional[Tuple] = None
+        self._observador: Optional[threading.Thread] = None
+        self._geracao = 0
+        self.erro: Optional[str] = None
+        self.desatualizado: Optional[str] = None
+        self._hashes_fontes = HashesArquivos()
+        self.tempo_carga_ms: Optional[float] = None
+        self.recargas = 0
+        self.cache = CacheResultados(cache_capacidade, cache_ttl)
+        self.trabalhadores = trabalhadores or min(32, (os.cpu_count() or 1) + 4)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.shards = shards
+
+    @property
+    def pronto(self) -> bool:
+        return self._indice is not None
+
+    @property
+    def geracao(self) -> int:
+        indice = self._indice
+        return indice.geracao if indice is not None else 0
+
+    #mtime e tamanho do ponteiro da publicação e do log dos segmentos; se mudar, há uma geração nova pra carregar
+    def _ler_assinatura(self) -> Tuple:
+        out = []
+        for nome in ARTEFATOS:
+            try:
+                st = (self.jsons_dir / nome).stat()
+                out.append((nome, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                out.append((nome, None, None))
+        return tuple(out)
+
+    #Abre a geração publicada (a pasta JSONs se nada foi publicado ainda), com os segmentos da pasta JSONs por cima
+    def _montar(self, aquecer: Tuple[str, ...] = ()) -> Indice:
+        pasta = pasta_publicada(self.jsons_dir)
+        verificar_artefatos(pasta)
+        self._geracao += 1
+        indice = Indice(pasta, k1=self.k1, b=self.b, geracao=self._geracao, stopwords=self.stopwords,
+                        shards=self.shards, segmentos=self.jsons_dir)
+        # os processos dos shards sobem junto com a geração, antes de ela atender alguma busca
+        aquecer = tuple(nome for nome in aquecer if nome != "coordenador")
+        indice.aquecer(aquecer + (("coordenador",) if indice.usar_shards else ()))
+        return indice
+
+    def obter(self) -> Indice:
+        indice = self._indice
+        if indice is not None:
+            return indice
+        with self._lock:
+            if self._indice is None:
+                inicio = time.perf_counter()
+                try:
+                    assinatura = self._ler_assinatura()
+                    self._indice = self._montar()
+                    self._assinatura = assinatura
+                    self.erro = None
+                except Exception as e:
+                    self.erro = str(e)
+                    raise
+                finally:
+                    self.tempo_carga_ms = (time.perf_counter() - inicio) * 1000.0
+                if self.intervalo_observacao > 0:
+                    self.iniciar_observador()
+            return self._indice
+
+    #Monta a geração nova fora do caminho das buscas, já com as mesmas estruturas que a atual tinha montado
+    #(assim a primeira busca depois da troca não paga a construção), e troca a referência de uma vez.
+    #Se a carga falhar (arquivo pela metade, por exemplo) a geração atual continua valendo
+    def recarregar(self) -> int:
+        if self._indice is None:
+            return self.obter().geracao
+        with self._lock_recarga:
+            atual = self._indice
+            inicio = time.perf_counter()
+            try:
+                assinatura = self._ler_assinatura()
+                novo = self._montar(atual.estruturas_montadas() if atual is not None else ())
+            except Exception as e:
+                self.erro = f"recarga falhou, mantendo geração {self.geracao}: {e}"
+                print("Erro ao recarregar índice:", e)
+                return self.geracao
+            self._indice = novo
+            self._assinatura = assinatura
+            self.erro = None
+            self.recargas += 1
+            self.tempo_carga_ms = (time.perf_counter() - inicio) * 1000.0
+            if atual is not None:
+                # buscas que pegaram a geração antiga ainda podem estar nos shards dela
+                fechamento = threading.Timer(ESPERA_FECHAR_SHARDS, atual.fechar)
+                fechamento.daemon = True
+                fechamento.start()
+            return novo.geracao
+
+    def recarregar_em_segundo_plano(self) -> threading.Thread:
+        t = threading.Thread(target=self.recarregar, name="recarga-indice", daemon=True)
+        t.start()
+        return t
+
+    def verificar_atualizacao(self) -> bool:
+        if self._indice is None or self._ler_assinatura() == self._assinatura:
+            return False
+        self.recarregar()
+        return True
+
+    #Compara o metadados.json e as stopwords atuais com os de onde a geração publicada saiu (hashes guardados por
+    #mtime, nada é reconstruído). Avisa no log uma vez a cada motivo novo
+    def verificar_fontes(self) -> Optional[str]:
+        motivo = motivo_desatualizada(self.jsons_dir, self.stopwords, self._hashes_fontes)
+        if motivo is not None and motivo != self.desatualizado:
+            print(f"Índice publicado desatualizado ({motivo}); rode python Logica/construcao.py")
+        self.desatualizado = motivo
+        return motivo
+
+    #Thread que de tempos em tempos confere se uma geração nova foi publicada (ou um segmento foi gravado)
+    def iniciar_observador(self) -> threading.Thread:
+        if self._observador is not None and self._observador.is_alive():
+            return self._observador
+
+        def _observar():
+            while True:
+                time.sleep(self.intervalo_observacao)
+                try:
+                    self.verificar_atualizacao()
+                    self.verificar_fontes()
+                except Exception as e:
+                    print("Erro ao verificar índice publicado:", e)
+
+        self._observador = threading.Thread(target=_observar, name="observador-indice", daemon=True)
+        self._observador.start()
+        return self._observador
+
+    #No booleano sem shards o bitset inteiro já é o resultado (top_k não muda nada e não entra na chave do cache);
+    #com shards o top_k é o começo que cada shard manda, arredondado em blocos pra páginas vizinhas dividirem a entrada
+    @staticmethod
+    def _top_k(indice: Indice, modelo: str, top_k: Optional[int]) -> Optional[int]:
+        if modelo != "booleano":
+            return top_k
+        return prefixo_para(top_k) if top_k and indice.usar_shards else None
+
+    #Busca na geração atual passando pelo cache; devolve também o índice usado, pra quem monta a página
+    #ler os metadados da mesma geração que deu os resultados
+    def buscar(self, consulta: str, modelo: str, top_k: Optional[int] = None,
+               filtros: Filtros = ()) -> Tuple[Indice, Resultados]:
+        if modelo not in MODELOS:
+            modelo = "vetorial"
+        indice = self.obter()
+        top_k = self._top_k(indice, modelo, top_k)
+        chave = (modelo, indice.chave_consulta(modelo, consulta), top_k, filtros)
+        resultados = self.cache.obter_ou_calcular(indice.geracao, chave,
+                                                  lambda: indice.buscar(modelo, consulta, top_k, filtros))
+        return indice, resultados
+
+    #Contagens de faceta do resultado da consulta (também pelo cache, na mesma geração)
+    def facetas(self, consulta: str, modelo: str, filtros: Filtros = ()) -> Dict[str, List[Dict]]:
+        if modelo not in MODELOS:
+            modelo = "vetorial"
+        indice = self.obter()
+        chave = ("facetas", modelo, indice.chave_consulta(modelo, consulta), filtros)
+        return self.cache.obter_ou_calcular(indice.geracao, chave,
+                                            lambda: indice.contar_facetas(modelo, consulta, filtros))
+
+    def _obter_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix="busca-lote")
+        return self._pool
+
+    #Busca um lote de consultas numa mesma geração: o que já está no cache sai dele, consultas repetidas (mesma chave)
+    #rodam uma vez só e o resto é agrupado por modelo e top_k e dividido em tarefas pro pool de threads.
+    #Os resultados voltam na ordem dos pedidos
+    def buscar_lote(self, pedidos: Sequence[Pedido]) -> Tuple[Indice, List[Resultados]]:
+        indice = self.obter()
+        resultados: List[Optional[Resultados]] = [None] * len(pedidos)
+        pendentes: Dict[Hashable, List[int]] = {}
+        grupos: Dict[Tuple[str, Optional[int], Filtros], List[Hashable]] = {}
+        consulta_de: Dict[Hashable, str] = {}
+        for pos, (consulta, modelo, top_k, filtros) in enumerate(pedidos):
+            if modelo not in MODELOS:
+                modelo = "vetorial"
+            top_k = self._top_k(indice, modelo, top_k)
+            chave = (modelo, indice.chave_consulta(modelo, consulta), top_k, filtros)
+            if chave in pendentes:
+                pendentes[chave].append(pos)
+                continue
+            valor = self.cache.obter(indice.geracao, chave)
+            if valor is not None:
+                resultados[pos] = valor
+                continue
+            pendentes[chave] = [pos]
+            consulta_de[chave] = consulta
+            grupos.setdefault((modelo, top_k, filtros), []).append(chave)
+
+        tarefas = []
+        pool = self._obter_pool()
+        for (modelo, top_k, filtros), chaves in grupos.items():
+            tamanho = LOTE_VETORIAL if modelo in ("vetorial", "lsa") else LOTE_TAREFA
+            for i in range(0, len(chaves), tamanho):
+                parte = chaves[i:i + tamanho]
+                consultas = [consulta_de[c] for c in parte]
+                tarefas.append((parte, pool.submit(indice.buscar_lote, modelo, consultas, top_k, filtros)))
+        for parte, futuro in tarefas:
+            for chave, valor in zip(parte, futuro.result()):
+                self.cache.guardar(indice.geracao, chave, valor)
+                for pos in pendentes[chave]:
+                    resultados[pos] = valor
+        return indice, resultados
+
+    #Dispara o carregamento numa thread, pra quem sobe o servidor não precisar esperar a primeira busca
+    def carregar_em_segundo_plano(self) -> threading.Thread:
+        def _carregar():
+            try:
+                self.obter()
+            except Exception as e:
+                print("Erro ao carregar índice:", e)
+        t = threading.Thread(target=_carregar, name="carga-indice", daemon=True)
+        t.start()
+        return t
+
+    def estado(self) -> Dict:
+        indice = self._indice
+        return {
+            "pronto": indice is not None,
+            "geracao": indice.geracao if indice is not None else 0,
+            "publicacao": (indice.jsons_dir.relative_to(self.jsons_dir).as_posix()
+                           if indice is not None and indice.jsons_dir != self.jsons_dir else None),
+            "recargas": self.recargas,
+            "erro": self.erro,
+            "desatualizado": self.verificar_fontes(),
+            "tempo_carga_ms": self.tempo_carga_ms,
+            "documentos": len(indice) if indice is not None else None,
+            "cache": self.cache.estado(),
+            "trabalhadores": self.trabalhadores,
+            "shards": (len(indice.coordenador)
+                       if indice is not None and "coordenador" in indice.estruturas_montadas() else 0),
+        }
@@ -0,0 +1,390 @@
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from .preparacao import preparar_documentos, carregar_stopwords
+    from .tokenizacao import tokenizar_documentos
+    from .TF_IDF import find_file
+    from .analise import obter_analisador
+except ImportError:
+    from preparacao import preparar_documentos, carregar_stopwords
+    from tokenizacao import tokenizar_documentos
+    from TF_IDF import find_file
+    from analise import obter_analisador
+
+# Tudo o que foi indexado depois do corpus base fica em JSONs/segmentos:
+#   seg_000001.json  -> {"Documentos": [registro, ...]}; cada registro tem os metadados, o ResumoPreparado,
+#                       os Tokens ({termo: tf}) e o Tamanho do documento
+#   registro.ndjson  -> log só de append, uma operação por linha:
+#                       {"op": "segmento", "arquivo": "seg_000001.json"} ou {"op": "remover", "DocId": 5}
+# Um DocId que aparece num segmento esconde a versão anterior (da base ou de um segmento mais antigo),
+# e um "remover" funciona como lápide. O corpus base (os JSONs) nunca é reescrito aqui.
+DIR_SEGMENTOS = "segmentos"
+REGISTRO = "registro.ndjson"
+LIMITE_SEGMENTOS = 16
+CAMPOS_META = ('Titulo', 'Autor', 'Filiacao', 'Arquivo', 'Resumo')
+
+
+def _tokens_de_lista(tokens_list: List[str]) -> Dict[str, int]:
+    counts = {}
+    for t in tokens_list:
+        left, right = t.rsplit(',', 1)
+        counts[left.strip()] = int(right.strip())
+    return counts
+
+
+#Aqui ele prepara e tokeniza um único documento com as mesmas funções do pipeline, sem tocar no resto do corpus
+def montar_registro(meta: Dict, stops: Set[str]) -> Dict:
+    doc_id = int(meta['DocId'])
+    preparado = preparar_documentos([meta], stops)[0]
+    tokens = _tokens_de_lista(tokenizar_documentos([preparado])[0]['Tokens'])
+    registro = {'DocId': doc_id}
+    for campo in CAMPOS_META:
+        valor = meta.get(campo)
+        if campo == 'Titulo':
+            valor = valor or meta.get('Título')
+        registro[campo] = valor or ''
+    registro['ResumoPreparado'] = preparado['Resumo']
+    registro['Tokens'] = tokens
+    registro['Tamanho'] = sum(tokens.values())
+    # posição (início, fim, termo) de cada token indexado no Resumo original, pros trechos da página de resultados
+    registro['Trechos'] = [list(t) for t in obter_analisador(stops).trechos(registro['Resumo'])]
+    return registro
+
+
+#Estado dos segmentos: reconstruído relendo só o log e os segmentos (o custo é o tamanho do que foi incrementado,
+#não do corpus). Mantém df e tamanho total dos documentos vivos dos segmentos sempre atualizados
+class EstadoIncremental:
+    def __init__(self, jsons_dir: Path):
+        self.dir = Path(jsons_dir) / DIR_SEGMENTOS
+        self.docs: Dict[int, Dict] = {}
+        self.removidos_base: Set[int] = set()
+        self.df_delta: Dict[str, int] = {}
+        self.tamanho_delta = 0
+        self.segmentos: List[str] = []
+        self._lock = threading.Lock()
+        self._mesclando: Optional[threading.Thread] = None
+        self._carregar()
+
+    @property
+    def vazio(self) -> bool:
+        return not self.docs and not self.removidos_base
+
+    def _carregar(self):
+        registro = self.dir / REGISTRO
+        if not registro.exists():
+            return
+        with registro.open('r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                op = json.loads(line)
+                if op.get('op') == 'segmento':
+                    with (self.dir / op['arquivo']).open('r', encoding='utf-8') as sf:
+                        docs = json.load(sf).get('Documentos', [])
+                    self.segmentos.append(op['arquivo'])
+                    for reg in docs:
+                        self._aplicar_documento(reg)
+                elif op.get('op') == 'remover':
+                    self._aplicar_remocao(int(op['DocId']))
+
+    def _aplicar_documento(self, reg: Dict):
+        doc_id = int(reg['DocId'])
+        self._aplicar_remocao(doc_id)
+        self.docs[doc_id] = reg
+        for termo in reg['Tokens']:
+            self.df_delta[termo] = self.df_delta.get(termo, 0) + 1
+        self.tamanho_delta += reg.get('Tamanho', 0)
+
+    def _aplicar_remocao(self, doc_id: int):
+        antigo = self.docs.pop(doc_id, None)
+        if antigo is not None:
+            for termo in antigo['Tokens']:
+                restante = self.df_delta.get(termo, 0) - 1
+                if restante > 0:
+                    self.df_delta[termo] = restante
+                else:
+                    self.df_delta.pop(termo, None)
+            self.tamanho_delta -= antigo.get('Tamanho', 0)
+        # pode ser um documento da base (ou não existir); a lápide esconde a versão da base de qualquer jeito
+        self.removidos_base.add(doc_id)
+
+    def _anexar(self, op: Dict):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with (self.dir / REGISTRO).open('a', encoding='utf-8') as f:
+            f.write(json.dumps(op, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _proximo_segmento(self) -> str:
+        numeros = [int(n[4:10]) for n in self.segmentos if n.startswith('seg_')]
+        existentes = [int(p.name[4:10]) for p in self.dir.glob('seg_*.json')] if self.dir.exists() else []
+        return f"seg_{max(numeros + existentes + [0]) + 1:06d}.json"
+
+    def _gravar_segmento(self, nome: str, docs: List[Dict]):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / (nome + '.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump({'Documentos': docs}, f, ensure_ascii=False)
+        os.replace(tmp, self.dir / nome)
+
+    #Adiciona (ou substitui, se o DocId já existir) um documento: grava um segmento com só ele e uma linha no log
+    def adicionar(self, meta: Dict, stops: Set[str]) -> Dict:
+        reg = montar_registro(meta, stops)
+        with self._lock:
+            nome = self._proximo_segmento()
+            self._gravar_segmento(nome, [reg])
+            self._anexar({'op': 'segmento', 'arquivo': nome})
+            self.segmentos.append(nome)
+            self._aplicar_documento(reg)
+            muitos = len(self.segmentos) >= LIMITE_SEGMENTOS
+        if muitos:
+            self.mesclar_em_segundo_plano()
+        return reg
+
+    def atualizar(self, meta: Dict, stops: Set[str]) -> Dict:
+        return self.adicionar(meta, stops)
+
+    def remover(self, doc_id: int):
+        with self._lock:
+            self._anexar({'op': 'remover', 'DocId': int(doc_id)})
+            self._aplicar_remocao(int(doc_id))
+
+    #Junta todos os segmentos num só, descartando versões antigas e documentos removidos, e reescreve o log
+    #(novo arquivo + os.replace, então quem ler o log vê o antigo ou o novo, nunca um pela metade)
+    def mesclar(self) -> Optional[str]:
+        with self._lock:
+            if len(self.segmentos) <= 1:
+                return None
+            antigos = list(self.segmentos)
+            nome = self._proximo_segmento()
+            vivos = [self.docs[d] for d in sorted(self.docs)]
+            self._gravar_segmento(nome, vivos)
+            base_removidos = sorted(self.removidos_base - set(self.docs))
+            tmp = self.dir / (REGISTRO + '.tmp')
+            with tmp.open('w', encoding='utf-8') as f:
+                for doc_id in base_removidos:
+                    f.write(json.dumps({'op': 'remover', 'DocId': doc_id}) + '\n')
+                f.write(json.dumps({'op': 'segmento', 'arquivo': nome}) + '\n')
+            os.replace(tmp, self.dir / REGISTRO)
+            self.segmentos = [nome]
+            for antigo in antigos:
+                try:
+                    (self.dir / antigo).unlink()
+                except FileNotFoundError:
+                    pass
+            return nome
+
+    def mesclar_em_segundo_plano(self) -> threading.Thread:
+        if self._mesclando is not None and self._mesclando.is_alive():
+            return self._mesclando
+        self._mesclando = threading.Thread(target=self.mesclar, name="mescla-segmentos", daemon=True)
+        self._mesclando.start()
+        return self._mesclando
+
+    #Junta as contagens da base com as dos segmentos (sem os removidos/substituídos)
+    def contagens_vivas(self, base: Dict[int, Dict[str, int]]) -> Dict[int, Dict[str, int]]:
+        out = {d: c for d, c in base.items() if d not in self.removidos_base}
+        for doc_id, reg in self.docs.items():
+            out[doc_id] = reg['Tokens']
+        return dict(sorted(out.items()))
+
+    #Estatísticas do corpus vivo ({"n_docs", "media_tamanho", "df"}, o formato do shards.estatisticas_globais) pro
+    #BM25 e pro idf do TF-IDF: as da base, menos os documentos da base escondidos (lápide ou versão mais nova num
+    #segmento), mais os deltas dos segmentos
+    def estatisticas(self, base: Dict[int, Dict[str, int]]) -> Dict:
+        n = len(base)
+        tamanho = 0
+        df: Dict[str, int] = {}
+        for counts in base.values():
+            tamanho += sum(counts.values())
+            for termo in counts:
+                df[termo] = df.get(termo, 0) + 1
+        for doc_id in self.removidos_base:
+            counts = base.get(doc_id)
+            if counts is None:
+                continue
+            n -= 1
+            tamanho -= sum(counts.values())
+            for termo in counts:
+                restante = df[termo] - 1
+                if restante > 0:
+                    df[termo] = restante
+                else:
+                    del df[termo]
+        for termo, delta in self.df_delta.items():
+            df[termo] = df.get(termo, 0) + delta
+        n += len(self.docs)
+        tamanho += self.tamanho_delta
+        return {"n_docs": n, "media_tamanho": (tamanho / n) if n else 0.0, "df": df}
+
+    def estado(self) -> Dict:
+        return {
+            'segmentos': len(self.segmentos),
+            'documentos_segmentos': len(self.docs),
+            'removidos_base': len(self.removidos_base - set(self.docs)),
+            'termos_segmentos': len(self.df_delta),
+            'tamanho_segmentos': self.tamanho_delta,
+        }
+
+
+#Aqui ele sobrepõe o estado dos segmentos ao indice.bin sem ler o corpus base. O espaço denso dos documentos vivos
+#(DocIds em ordem) sai de uma passada vetorizada pelos DocIds mapeados; N, nº de tokens e df são os gravados no
+#binário, menos os das linhas escondidas (só elas são lidas, pelos termos de cada linha) e mais os deltas dos
+#segmentos; a lista de um termo é a da base remapeada (sem as escondidas) junto com a dos segmentos, decodificada
+#só quando o termo é consultado. Tem a mesma leitura do IndiceBinario (doc_ids, linhas_tfs, df, dfs, tamanhos_np,
+#n_tokens), então o MotorBitset, o BM25 e a matriz TF-IDF sobreposta usam um ou outro do mesmo jeito
+class CorpusVivo:
+    def __init__(self, binario, estado: EstadoIncremental):
+        self.binario = binario
+        self.estado = estado
+        base_ids = binario.doc_ids_np
+        nb = len(base_ids)
+        ocultos = np.asarray(sorted(estado.removidos_base), dtype=np.int64)
+        linhas = np.minimum(np.searchsorted(base_ids, ocultos), max(nb - 1, 0))
+        self.linhas_ocultas = linhas[base_ids[linhas] == ocultos] if nb else linhas[:0]
+        self._manter = np.ones(nb, dtype=bool)
+        self._manter[self.linhas_ocultas] = False
+        ids_base = base_ids[self._manter]
+        self.novos = sorted(estado.docs)
+        ids_novos = np.asarray(self.novos, dtype=np.int64)
+        self._antes = np.searchsorted(ids_base, ids_novos)
+        # posição densa de cada documento dos segmentos e de cada linha da base (-1 nas escondidas)
+        self.posicoes_novos = self._antes + np.arange(len(ids_novos))
+        self.mapa = np.full(nb, -1, dtype=np.int64)
+        self.mapa[self._manter] = np.arange(len(ids_base)) + np.searchsorted(ids_novos, ids_base)
+        self.doc_ids_np = np.insert(ids_base, self._antes, ids_novos)
+        self.doc_ids: List[int] = self.doc_ids_np.tolist()
+
+        self.n_tokens = (binario.n_tokens - int(binario.tamanhos_np[self.linhas_ocultas].sum(dtype=np.int64))
+                         + estado.tamanho_delta)
+        termos_ocultos = [binario.termos_da_linha(int(r))[0] for r in self.linhas_ocultas]
+        numeros, contagem = np.unique(np.concatenate(termos_ocultos) if termos_ocultos else np.zeros(0, np.uint32),
+                                      return_counts=True)
+        self._df_ocultos: Dict[int, int] = dict(zip(numeros.tolist(), contagem.tolist()))
+        self._listas_novos: Dict[str, Tuple[List[int], List[int]]] = {}
+        for pos, doc_id in zip(self.posicoes_novos.tolist(), self.novos):
+            for termo, tf in estado.docs[doc_id]['Tokens'].items():
+                linhas_tfs = self._listas_novos.setdefault(termo, ([], []))
+                linhas_tfs[0].append(pos)
+                linhas_tfs[1].append(tf)
+        self._tamanhos: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    #Termos cujo df mudou em relação à base (estão num documento escondido ou num segmento)
+    def termos_tocados(self) -> Set[str]:
+        return {self.binario.termo(i) for i in self._df_ocultos} | set(self.estado.df_delta)
+
+    def df(self, termo: str) -> int:
+        i = self.binario.buscar_termo(termo)
+        df = self.estado.df_delta.get(termo, 0)
+        if i is not None:
+            df += self.binario.df(termo) - self._df_ocultos.get(i, 0)
+        return df
+
+    def dfs(self) -> Dict[str, int]:
+        dfs = self.binario.dfs()
+        for i, n in self._df_ocultos.items():
+            termo = self.binario.termo(i)
+            dfs[termo] -= n
+        for termo, delta in self.estado.df_delta.items():
+            dfs[termo] = dfs.get(termo, 0) + delta
+        return {t: df for t, df in dfs.items() if df > 0}
+
+    def linhas_tfs(self, termo: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        linhas = [np.zeros(0, dtype=np.int64)]
+        tfs = [np.zeros(0, dtype=np.int64)]
+        base = self.binario.linhas_tfs(termo)
+        if base is not None:
+            vivas = self.mapa[base[0]]
+            manter = vivas >= 0
+            linhas.append(vivas[manter])
+            tfs.append(base[1][manter])
+        novos = self._listas_novos.get(termo)
+        if novos is not None:
+            linhas.append(np.asarray(novos[0], dtype=np.int64))
+            tfs.append(np.asarray(novos[1], dtype=np.int64))
+        linhas = np.concatenate(linhas)
+        if not len(linhas):
+            return None
+        tfs = np.concatenate(tfs)
+        if novos is not None and base is not None:
+            ordem = np.argsort(linhas, kind='stable')
+            linhas, tfs = linhas[ordem], tfs[ordem]
+        return linhas, tfs
+
+    #Um valor por posição densa: os das linhas da base (sem as escondidas) com os dos segmentos nos lugares deles
+    def juntar(self, da_base: np.ndarray, dos_novos: np.ndarray) -> np.ndarray:
+        return np.insert(da_base[self._manter], self._antes, dos_novos)
+
+    #Tamanho de cada documento vivo (montado na primeira vez que o BM25 pede)
+    @property
+    def tamanhos_np(self) -> np.ndarray:
+        if self._tamanhos is None:
+            novos = np.asarray([self.estado.docs[d].get('Tamanho', 0) for d in self.novos], dtype=np.int64)
+            self._tamanhos = self.juntar(self.binario.tamanhos_np.astype(np.int64), novos)
+        return self._tamanhos
+
+    #Termos e tf de uma posição densa (da linha da base ou do registro do segmento)
+    def contagens(self, pos: int) -> Dict[str, int]:
+        k = int(np.searchsorted(self.posicoes_novos, pos))
+        if k < len(self.novos) and self.posicoes_novos[k] == pos:
+            return self.estado.docs[self.novos[k]]['Tokens']
+        linha = int(np.searchsorted(self.binario.doc_ids_np, self.doc_ids_np[pos]))
+        termos, tfs = self.binario.termos_da_linha(linha)
+        return {self.binario.termo(int(i)): int(tf) for i, tf in zip(termos, tfs)}
+
+
+#Linha de comando: adicionar/atualizar um artigo (JSON no formato do metadados.json), remover um DocId, mesclar ou ver o estado
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description='Indexação incremental de artigos.')
+    parser.add_argument('--dados', '-d', help='Pasta JSONs (padrão: procurada a partir do script).')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    for nome in ('adicionar', 'atualizar'):
+        p = sub.add_parser(nome)
+        p.add_argument('arquivo', help='JSON com um artigo (ou lista de artigos) no formato do metadados.json.')
+    p = sub.add_parser('remover')
+    p.add_argument('doc_id', type=int)
+    sub.add_parser('mesclar')
+    sub.add_parser('estado')
+    args = parser.parse_args(argv)
+
+    try:
+        jsons_dir = Path(args.dados) if args.dados else find_file('metadados.json').parent
+    except FileNotFoundError as e:
+        print(str(e))
+        return 2
+    estado = EstadoIncremental(jsons_dir)
+    if args.comando in ('adicionar', 'atualizar'):
+        stops = carregar_stopwords(jsons_dir.parent / 'stopwords.txt')
+        with open(args.arquivo, 'r', encoding='utf-8') as f:
+            artigos = json.load(f)
+        if isinstance(artigos, dict):
+            artigos = [artigos]
+        for meta in artigos:
+            reg = estado.adicionar(meta, stops)
+            print(f"DocId {reg['DocId']} indexado ({len(reg['Tokens'])} termos).")
+    elif args.comando == 'remover':
+        estado.remover(args.doc_id)
+        print(f"DocId {args.doc_id} removido.")
+    elif args.comando == 'mesclar':
+        nome = estado.mesclar()
+        print(f"Segmentos mesclados em {nome}." if nome else "Nada para mesclar.")
+    if estado._mesclando is not None:
+        estado._mesclando.join()
+    print(json.dumps(estado.estado(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main(sys.argv[1:]))
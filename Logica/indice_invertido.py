@@ -0,0 +1,117 @@
+from bisect import bisect_left
+from typing import Dict, List, Set, Iterable
+
+#Aqui ele guarda o índice invertido (termo -> lista ordenada de DocIds), montado uma vez só e compartilhado entre as buscas
+class IndiceInvertido:
+    def __init__(self, postings: Dict[str, List[int]], doc_ids: List[int]):
+        self.postings = postings
+        self.doc_ids = doc_ids
+
+    def lista(self, termo: str) -> List[int]:
+        return self.postings.get(termo, [])
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    #Cópia com documentos trocados (segmentos incrementais): os ocultos ({DocId: termos}, removidos ou substituídos)
+    #saem só das listas dos termos deles e os novos entram nas dos seus; as outras listas são as mesmas desta
+    def com_documentos(self, novos: Dict[int, Set[str]], ocultos: Dict[int, Set[str]]) -> "IndiceInvertido":
+        saem: Dict[str, List[int]] = {}
+        for doc_id in sorted(ocultos):
+            for termo in ocultos[doc_id]:
+                saem.setdefault(termo, []).append(doc_id)
+        entram: Dict[str, List[int]] = {}
+        for doc_id in sorted(novos):
+            for termo in novos[doc_id]:
+                entram.setdefault(termo, []).append(doc_id)
+        postings = dict(self.postings)
+        for termo in saem.keys() | entram.keys():
+            lista = _uniao(_diferenca(postings.get(termo, []), saem.get(termo, [])), entram.get(termo, []))
+            if lista:
+                postings[termo] = lista
+            else:
+                postings.pop(termo, None)
+        doc_ids = _uniao(_diferenca(self.doc_ids, sorted(ocultos)), sorted(novos))
+        return IndiceInvertido(postings, doc_ids)
+
+
+#Monta o índice a partir do mapa {DocId: conjunto de tokens}
+def construir_indice_invertido(docs: Dict[int, Set[str]]) -> IndiceInvertido:
+    postings: Dict[str, List[int]] = {}
+    doc_ids = sorted(docs.keys())
+    for doc_id in doc_ids:
+        for termo in docs[doc_id]:
+            postings.setdefault(termo, []).append(doc_id)
+    return IndiceInvertido(postings, doc_ids)
+
+
+#Interseção de duas listas ordenadas; quando uma é bem menor que a outra ele usa busca binária na maior
+def _intersecao(a: List[int], b: List[int]) -> List[int]:
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return []
+    out = []
+    if len(a) * 8 < len(b):
+        lo = 0
+        for x in a:
+            lo = bisect_left(b, x, lo)
+            if lo == len(b):
+                break
+            if b[lo] == x:
+                out.append(x)
+        return out
+    i = j = 0
+    while i < len(a) and j < len(b):
+        x, y = a[i], b[j]
+        if x == y:
+            out.append(x)
+            i += 1
+            j += 1
+        elif x < y:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+def _uniao(a: List[int], b: List[int]) -> List[int]:
+    if not a:
+        return list(b)
+    if not b:
+        return list(a)
+    out = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        x, y = a[i], b[j]
+        if x == y:
+            out.append(x)
+            i += 1
+            j += 1
+        elif x < y:
+            out.append(x)
+            i += 1
+        else:
+            out.append(y)
+            j += 1
+    out.extend(a[i:])
+    out.extend(b[j:])
+    return out
+
+
+#Diferença a - b (usada no "a AND NOT b" sem precisar materializar o complemento)
+def _diferenca(a: List[int], b: List[int]) -> List[int]:
+    if not a or not b:
+        return list(a)
+    out = []
+    j = 0
+    for x in a:
+        j = bisect_left(b, x, j)
+        if j == len(b) or b[j] != x:
+            out.append(x)
+    return out
+
+
+#Complemento em relação a todos os documentos do índice (só é usado quando sobra um NOT "solto" no final)
+def _complemento(a: List[int], universo: Iterable[int]) -> List[int]:
+    return _diferenca(list(universo), a)
@@ -0,0 +1,112 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from .tokenizacao import posicoes_termos
+    from .formato_binario import IndiceBinario
+except ImportError:
+    from tokenizacao import posicoes_termos
+    from formato_binario import IndiceBinario
+
+
+def _codificar(posicoes: List[int]) -> bytes:
+    out = bytearray()
+    anterior = 0
+    for p in posicoes:
+        n = p - anterior
+        anterior = p
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+    return bytes(out)
+
+
+def _decodificar(buf: bytes) -> List[int]:
+    out = []
+    atual = 0
+    n = 0
+    shift = 0
+    for b in buf:
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            atual += n
+            out.append(atual)
+            n = 0
+            shift = 0
+        else:
+            shift += 7
+    return out
+
+
+#Aqui ele guarda, pra cada termo e cada documento, a lista de posições do termo no resumo preparado,
+#comprimida (delta + varint). Só é decodificada para os documentos que já passaram pela interseção dos bitsets
+class IndicePosicional:
+    def __init__(self, textos: Dict[int, str]):
+        self.posicoes: Dict[str, Dict[int, bytes]] = {}
+        self.doc_ids = {int(d) for d in textos}
+        for doc_id, texto in textos.items():
+            for termo, lista in posicoes_termos(texto).items():
+                self.posicoes.setdefault(termo, {})[int(doc_id)] = _codificar(lista)
+
+    def posicoes_de(self, termo: str, doc_id: int) -> List[int]:
+        buf = self.posicoes.get(termo, {}).get(doc_id)
+        return _decodificar(buf) if buf else []
+
+    #Trechos (início, fim) onde a frase aparece inteira e em sequência no documento
+    def trechos_frase(self, palavras: List[str], doc_id: int) -> List[Tuple[int, int]]:
+        return _trechos_frase(self.posicoes_de, palavras, doc_id)
+
+
+#Posições gravadas no indice.bin pela construção (nada é montado no servidor). Com segmentos, os documentos deles
+#têm as posições num IndicePosicional só deles (o tamanho do que foi incrementado) e os escondidos da base somem
+class PosicionalBinario:
+    def __init__(self, binario: IndiceBinario, segmentos: Optional[IndicePosicional] = None,
+                 ocultos: Optional[Set[int]] = None):
+        self.binario = binario
+        self.segmentos = segmentos
+        self.ocultos = ocultos or set()
+
+    def posicoes_de(self, termo: str, doc_id: int) -> List[int]:
+        if self.segmentos is not None and doc_id in self.segmentos.doc_ids:
+            return self.segmentos.posicoes_de(termo, doc_id)
+        if doc_id in self.ocultos:
+            return []
+        linha = self.binario.linha(doc_id)
+        return [] if linha is None else self.binario.posicoes(termo, linha)
+
+    def trechos_frase(self, palavras: List[str], doc_id: int) -> List[Tuple[int, int]]:
+        return _trechos_frase(self.posicoes_de, palavras, doc_id)
+
+
+def _trechos_frase(posicoes_de: Callable[[str, int], List[int]], palavras: List[str],
+                   doc_id: int) -> List[Tuple[int, int]]:
+    if not palavras:
+        return []
+    inicios = set(posicoes_de(palavras[0], doc_id))
+    for j, w in enumerate(palavras[1:], 1):
+        if not inicios:
+            return []
+        inicios &= {p - j for p in posicoes_de(w, doc_id)}
+    fim = len(palavras) - 1
+    return [(p, p + fim) for p in sorted(inicios)]
+
+
+#Confere se algum trecho de "a" está a no máximo k posições de algum trecho de "b" (em qualquer ordem).
+#As duas listas vêm ordenadas pelo início, então cada trecho de "a" só olha os vizinhos em "b" via busca binária
+def trechos_proximos(a: List[Tuple[int, int]], b: List[Tuple[int, int]], k: int) -> bool:
+    if not a or not b:
+        return False
+    inicios_b = [ini for ini, _ in b]
+    maior_b = max(f - i for i, f in b)
+    for ini_a, fim_a in a:
+        j = bisect_left(inicios_b, ini_a - k - maior_b)
+        while j < len(b):
+            ini_b, fim_b = b[j]
+            if ini_b > fim_a + k:
+                break
+            distancia = ini_b - fim_a if ini_b > fim_a else (ini_a - fim_b if ini_a > fim_b else 0)
+            if distancia <= k:
+                return True
+            j += 1
+    return False
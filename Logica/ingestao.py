@@ -0,0 +1,287 @@
+import json
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    from .analise import carregar_stopwords
+    from .indexacao_incremental import montar_registro, CAMPOS_META
+    from .TF_IDF import find_file
+    from .construcao import construir, registrar_etapas_prontas, TOPK_PADRAO
+except ImportError:
+    from analise import carregar_stopwords
+    from indexacao_incremental import montar_registro, CAMPOS_META
+    from TF_IDF import find_file
+    from construcao import construir, registrar_etapas_prontas, TOPK_PADRAO
+
+# pypdf é opcional: só quem ingere PDFs precisa dele (pip install pypdf). Arquivos .txt entram sem ele
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+# Saídas da ingestão (uma linha JSON por documento, gravadas conforme os documentos ficam prontos):
+#   metadados.ndjson           -> DocId + CAMPOS_META (Titulo, Autor, Filiacao, Arquivo, Resumo)
+#   dadospreparados.ndjson     -> {"DocId", "Resumo"} com o resumo já analisado
+#   dados_tokenizados.ndjson   -> {"DocId", "Tokens": ["termo , tf", ...]}, igual ao dados_tokenizados.json
+#   erros.ndjson               -> arquivos que não deu pra ler
+SAIDAS = ("metadados", "dadospreparados", "dados_tokenizados")
+EXTENSOES = (".pdf", ".txt")
+# Documentos em andamento no pool por trabalhador: limita a memória sem deixar trabalhador parado
+JANELA_POR_TRABALHADOR = 4
+MAX_RESUMO = 4000
+MAX_TITULO = 300
+
+_numero_re = re.compile(r"(\d+)")
+_resumo_re = re.compile(r"\bresumo\b[\s:.\-–—]*(.+?)(?=\bpalavras?[\s-]*chaves?\b|\babstract\b|\bkeywords\b|$)",
+                        flags=re.IGNORECASE | re.DOTALL)
+_hifen_re = re.compile(r"(\w)-\n(\w)")
+_espacos_re = re.compile(r"\s+")
+
+
+#Ordem natural dos arquivos (doc2 antes de doc10)
+def _chave_natural(nome: str):
+    return [int(p) if p.isdigit() else p.lower() for p in _numero_re.split(nome)]
+
+
+def listar_artigos(raw_dir: Path) -> List[str]:
+    with os.scandir(raw_dir) as it:
+        nomes = [e.name for e in it if e.is_file() and e.name.lower().endswith(EXTENSOES)]
+    return sorted(nomes, key=_chave_natural)
+
+
+def extrair_texto(path: Path) -> str:
+    if path.suffix.lower() == ".txt":
+        return path.read_text(encoding="utf-8", errors="replace")
+    if pypdf is None:
+        raise RuntimeError("pypdf não está instalado (pip install pypdf)")
+    leitor = pypdf.PdfReader(str(path))
+    return "\n".join(pagina.extract_text() or "" for pagina in leitor.pages)
+
+
+def _limpar(texto: str) -> str:
+    return _espacos_re.sub(" ", _hifen_re.sub(r"\1\2", texto)).strip()
+
+
+#Aqui ele tira título e resumo do texto do artigo: título = primeira linha não vazia; resumo = o que vem depois de
+#"Resumo" até "Palavras-chave"/"Abstract" (sem essa seção, o começo do texto). Autor e filiação não dá pra saber
+#com segurança pelo texto, então ficam vazios, a não ser que o metadados.json já tenha o artigo
+def metadados_do_texto(texto: str, arquivo: str, doc_id: int) -> Dict:
+    titulo = next((linha.strip() for linha in texto.splitlines() if linha.strip()), "")
+    m = _resumo_re.search(texto)
+    resumo = _limpar(m.group(1) if m else texto)
+    if len(resumo) > MAX_RESUMO:
+        resumo = resumo[:MAX_RESUMO].rsplit(" ", 1)[0]
+    return {"DocId": doc_id, "Titulo": _limpar(titulo)[:MAX_TITULO], "Autor": "", "Filiacao": "",
+            "Arquivo": arquivo, "Resumo": resumo}
+
+
+# Cada processo do pool recebe as stopwords uma vez só, no início
+_stops_trabalhador: Set[str] = set()
+
+
+def _iniciar_trabalhador(stops: Set[str]):
+    global _stops_trabalhador
+    _stops_trabalhador = stops
+
+
+#Trabalho de um documento (roda num processo do pool): extrai o texto, completa com os metadados manuais e passa pelas
+#mesmas etapas de preparação e tokenização da indexação incremental
+def processar_artigo(tarefa: Tuple[str, int, Optional[Dict]]) -> Dict:
+    caminho, doc_id, manual = tarefa
+    path = Path(caminho) if caminho else None
+    try:
+        if path is None:
+            # artigo que só existe no metadados.json
+            meta = {"DocId": doc_id}
+        else:
+            meta = metadados_do_texto(extrair_texto(path), path.name, doc_id)
+    except Exception as e:
+        if not manual:
+            return {"DocId": doc_id, "Arquivo": path.name, "erro": f"{type(e).__name__}: {e}"}
+        # o PDF não abriu, mas o metadados.json já tem o artigo
+        meta = {"DocId": doc_id, "Arquivo": path.name}
+    if manual:
+        meta.update({campo: valor for campo, valor in manual.items() if valor})
+        meta["DocId"] = doc_id
+    return montar_registro(meta, _stops_trabalhador)
+
+
+#map em ordem com no máximo janela tarefas em andamento (o Executor.map submete tudo de uma vez e guarda todos os
+#resultados que ainda não foram lidos)
+def _mapa_limitado(pool: ProcessPoolExecutor, funcao: Callable, itens: Iterable, janela: int) -> Iterator:
+    pendentes: deque = deque()
+    for item in itens:
+        if len(pendentes) >= janela:
+            yield pendentes.popleft().result()
+        pendentes.append(pool.submit(funcao, item))
+    while pendentes:
+        yield pendentes.popleft().result()
+
+
+#DocId de cada arquivo: o do metadados.json (pelo campo Arquivo), senão o número do nome (doc12.pdf -> 12), senão o
+#próximo livre. Os artigos do metadados.json sem arquivo na pasta vêm no final, só com os metadados manuais.
+#Só nomes e números ficam na memória
+def _tarefas(raw_dir: Path, nomes: List[str], manuais: Dict[str, Dict]) -> Iterator[Tuple[str, int, Optional[Dict]]]:
+    usados: Set[int] = {int(m["DocId"]) for m in manuais.values() if m.get("DocId") is not None}
+    escolhidos: List[Optional[int]] = []
+    for nome in nomes:
+        manual = manuais.get(nome)
+        if manual and manual.get("DocId") is not None:
+            escolhidos.append(int(manual["DocId"]))
+            continue
+        m = _numero_re.search(nome)
+        doc_id = int(m.group(1)) if m else None
+        if doc_id is None or doc_id in usados:
+            escolhidos.append(None)
+            continue
+        usados.add(doc_id)
+        escolhidos.append(doc_id)
+    proximo = max(usados, default=0) + 1
+    for nome, doc_id in zip(nomes, escolhidos):
+        if doc_id is None:
+            doc_id = proximo
+            proximo += 1
+        yield str(raw_dir / nome), doc_id, manuais.get(nome)
+    presentes = set(nomes)
+    for arquivo, manual in manuais.items():
+        if arquivo not in presentes and manual.get("DocId") is not None:
+            yield "", int(manual["DocId"]), manual
+
+
+def _carregar_manuais(metadados: Optional[Path]) -> Dict[str, Dict]:
+    if metadados is None or not metadados.exists():
+        return {}
+    with metadados.open(encoding="utf-8") as f:
+        return {m["Arquivo"]: m for m in json.load(f) if m.get("Arquivo")}
+
+
+def _linha(f, obj: Dict):
+    f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+
+#Aqui ele roda a ingestão inteira em streaming: os arquivos passam por extração -> preparação -> tokenização num pool
+#de processos e cada documento pronto é escrito na hora nos .ndjson; na memória fica só a janela do pool. Os pesos
+#TF-IDF (que precisam do df do corpus inteiro) ficam pro build, na etapa tfidf do construir()
+def ingerir(raw_dir: Path, saida: Path, stopwords: Path, metadados: Optional[Path] = None,
+            trabalhadores: Optional[int] = None) -> Dict:
+    saida.mkdir(parents=True, exist_ok=True)
+    stops = carregar_stopwords(stopwords)
+    manuais = _carregar_manuais(metadados)
+    nomes = listar_artigos(raw_dir)
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    tarefas = _tarefas(raw_dir, nomes, manuais)
+
+    n_docs = 0
+    erros = 0
+    tmps = {nome: saida / f"{nome}.ndjson.tmp" for nome in SAIDAS + ("erros",)}
+    arquivos = {nome: tmp.open("w", encoding="utf-8") for nome, tmp in tmps.items()}
+    try:
+        if trabalhadores <= 1:
+            _iniciar_trabalhador(stops)
+            registros = map(processar_artigo, tarefas)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=trabalhadores, initializer=_iniciar_trabalhador, initargs=(stops,))
+            registros = _mapa_limitado(pool, processar_artigo, tarefas, trabalhadores * JANELA_POR_TRABALHADOR)
+        try:
+            for reg in registros:
+                if "erro" in reg:
+                    erros += 1
+                    _linha(arquivos["erros"], reg)
+                    print(f"Erro em {reg['Arquivo']}: {reg['erro']}")
+                    continue
+                n_docs += 1
+                _linha(arquivos["metadados"], {"DocId": reg["DocId"], **{c: reg[c] for c in CAMPOS_META}})
+                _linha(arquivos["dadospreparados"], {"DocId": reg["DocId"], "Resumo": reg["ResumoPreparado"]})
+                itens = sorted(reg["Tokens"].items(), key=lambda kv: (-kv[1], kv[0]))
+                _linha(arquivos["dados_tokenizados"], {"DocId": reg["DocId"], "Tokens": [f"{t} , {c}" for t, c in itens]})
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    finally:
+        for f in arquivos.values():
+            f.close()
+    for nome, tmp in tmps.items():
+        os.replace(tmp, saida / f"{nome}.ndjson")
+
+    return {"documentos": n_docs, "erros": erros, "saida": str(saida)}
+
+
+#Converte um .ndjson no .json (lista) que o resto do pipeline lê, uma linha por vez (um documento por linha)
+def ndjson_para_json(origem: Path, destino: Path):
+    tmp = destino.with_name(destino.name + ".tmp")
+    with origem.open(encoding="utf-8") as entrada, tmp.open("w", encoding="utf-8") as f:
+        f.write("[")
+        primeiro = True
+        for linha in entrada:
+            linha = linha.strip()
+            if not linha:
+                continue
+            f.write("\n" if primeiro else ",\n")
+            f.write(linha)
+            primeiro = False
+        f.write("\n]\n")
+    os.replace(tmp, destino)
+
+
+#Publica a ingestão na pasta JSONs: grava os JSONs do pipeline (convertidos linha a linha), registra a preparação e a
+#tokenização que a ingestão já fez no manifesto do build e roda o construir() pro resto (termos significativos,
+#indice_tfidf, vizinhos, LSA, indice.bin, shards), que fica com o manifesto em dia. Só no fim do construir() a
+#geração nova é publicada (publicado.json); o servidor não vê os JSONs reescritos antes disso
+def publicar(saida: Path, jsons_dir: Path, stopwords: Path, topk: int = TOPK_PADRAO,
+             shards: Optional[int] = None) -> Dict[str, str]:
+    for nome in SAIDAS:
+        ndjson_para_json(saida / f"{nome}.ndjson", jsons_dir / f"{nome}.json")
+    registrar_etapas_prontas(jsons_dir, stopwords)
+    return construir(jsons_dir, stopwords, topk=topk, binario=True, shards=shards)
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description='Ingestão dos artigos (PDF/TXT) em paralelo, gravando NDJSON em streaming.')
+    parser.add_argument('--artigos', '-a', help='Pasta com os PDFs (padrão: raw_artigos na raiz do projeto).')
+    parser.add_argument('--dados', '-d', help='Pasta JSONs (padrão: procurada a partir do script).')
+    parser.add_argument('--saida', '-o', help='Pasta dos .ndjson (padrão: JSONs/ingestao).')
+    parser.add_argument('--trabalhadores', '-j', type=int, help='Processos do pool (padrão: nº de CPUs; 1 roda sem pool).')
+    parser.add_argument('--topk', '-k', type=int, default=TOPK_PADRAO,
+                        help='Com --publicar, termos significativos por documento no build (padrão 10).')
+    parser.add_argument('--sem-metadados', action='store_true',
+                        help='Ignora o metadados.json existente (tudo sai do texto dos arquivos).')
+    parser.add_argument('--publicar', action='store_true',
+                        help='Grava os JSONs do pipeline na pasta JSONs ao final e roda o build (construcao.py) pro resto do índice.')
+    parser.add_argument('--shards', type=int,
+                        help='Com --publicar, grava o índice em N shards (0 = apaga os shards; padrão: mantém os que existem).')
+    args = parser.parse_args(argv)
+
+    try:
+        jsons_dir = Path(args.dados) if args.dados else find_file('metadados.json').parent
+    except FileNotFoundError:
+        jsons_dir = Path(__file__).resolve().parent.parent / 'JSONs'
+    raw_dir = Path(args.artigos) if args.artigos else jsons_dir.parent / 'raw_artigos'
+    if not raw_dir.is_dir():
+        print(f"Pasta de artigos não encontrada: {raw_dir}")
+        return 2
+    if pypdf is None and any(n.lower().endswith('.pdf') for n in listar_artigos(raw_dir)):
+        print("Aviso: pypdf não está instalado; os PDFs só entram se já estiverem no metadados.json (pip install pypdf).")
+    saida = Path(args.saida) if args.saida else jsons_dir / 'ingestao'
+    metadados = None if args.sem_metadados else jsons_dir / 'metadados.json'
+    estado = ingerir(raw_dir, saida, jsons_dir.parent / 'stopwords.txt', metadados, args.trabalhadores)
+    print(json.dumps(estado, ensure_ascii=False))
+    if args.publicar:
+        if not estado['documentos']:
+            print("Nenhum documento ingerido; nada publicado.")
+            return 1
+        relatorio = publicar(saida, jsons_dir, jsons_dir.parent / 'stopwords.txt', args.topk, args.shards)
+        for etapa, situacao in relatorio.items():
+            print(f"{etapa}: {situacao}")
+        print(f"Índice publicado em: {jsons_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,245 @@
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+try:
+    from .busca_booleana import _tokenize_query, _infix_to_postfix, _normalize_term, _is_frase, _is_near, _normalize_frase, _palavras_frase, _is_curinga
+    from .indice_invertido import IndiceInvertido
+    from .indice_posicional import IndicePosicional, PosicionalBinario, trechos_proximos
+    from .dicionario_termos import DicionarioTermos
+    from .correcao_termos import CorretorTermos
+    from .formato_binario import IndiceBinario
+except ImportError:
+    from busca_booleana import _tokenize_query, _infix_to_postfix, _normalize_term, _is_frase, _is_near, _normalize_frase, _palavras_frase, _is_curinga
+    from indice_invertido import IndiceInvertido
+    from indice_posicional import IndicePosicional, PosicionalBinario, trechos_proximos
+    from dicionario_termos import DicionarioTermos
+    from correcao_termos import CorretorTermos
+    from formato_binario import IndiceBinario
+
+# Um plano compilado recebe o motor (bitsets, posições) e devolve o bitset do resultado
+Plano = Callable[['MotorBitset'], int]
+# Operando de frase/proximidade: a lista de palavras (um termo sozinho é uma frase de uma palavra)
+Operando = Tuple[str, ...]
+
+TAMANHO_CACHE_PLANOS = 1024
+
+
+#Aqui ele transforma uma lista de posições densas (0..N-1) em um inteiro onde o bit i indica o documento i
+def _posicoes_para_bitset(posicoes: List[int], n_docs: int) -> int:
+    buf = bytearray((n_docs + 7) // 8)
+    for p in posicoes:
+        buf[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(buf, 'little')
+
+
+#Mesmo bitset a partir de um array de posições (as linhas decodificadas do indice.bin), sem laço Python
+def _linhas_para_bitset(linhas: np.ndarray, n_docs: int) -> int:
+    mascara = np.zeros(n_docs, dtype=bool)
+    mascara[linhas] = True
+    return int.from_bytes(np.packbits(mascara, bitorder='little').tobytes(), 'little')
+
+
+#Bitsets lidos do indice.bin (ou do CorpusVivo, com os segmentos por cima): o de cada termo é montado na primeira
+#consulta que o usa (as linhas já são as posições densas, em ordem de DocId) e fica guardado. Responde o get/[] de
+#um dict
+class BitsetsBinario:
+    def __init__(self, binario: IndiceBinario):
+        self.binario = binario
+        self._bits: Dict[str, int] = {}
+
+    def get(self, termo: str, padrao: Optional[int] = None) -> Optional[int]:
+        bits = self._bits.get(termo)
+        if bits is None:
+            linhas_tfs = self.binario.linhas_tfs(termo)
+            if linhas_tfs is None:
+                return padrao
+            bits = _linhas_para_bitset(linhas_tfs[0], len(self.binario))
+            self._bits[termo] = bits
+        return bits
+
+    def __getitem__(self, termo: str) -> int:
+        bits = self.get(termo)
+        if bits is None:
+            raise KeyError(termo)
+        return bits
+
+    #df de cada termo, direto do ponteiro de postings (sem montar bitset nenhum)
+    def dfs(self) -> Dict[str, int]:
+        return self.binario.dfs()
+
+
+#Posições dos bits ligados, em ordem e sob demanda; o bin() e o find rodam em C, então não há laço Python por bit zerado
+def _iterar_bits(bits: int) -> Iterator[int]:
+    s = bin(bits)[:1:-1]
+    i = s.find('1')
+    while i != -1:
+        yield i
+        i = s.find('1', i + 1)
+
+
+def _bits_ligados(bits: int) -> List[int]:
+    return list(_iterar_bits(bits))
+
+
+#Normaliza a consulta (operadores em maiúsculo, termos normalizados) pra consultas quase iguais caírem na mesma chave do cache
+def _chave_consulta(query: str) -> str:
+    partes = []
+    for tok in _tokenize_query(query):
+        up = tok.upper()
+        if tok in ('(', ')') or up in ('AND', 'OR', 'NOT') or _is_near(up):
+            partes.append(up)
+        elif _is_frase(tok):
+            partes.append(_normalize_frase(tok))
+        else:
+            # termo que some na normalização vira frase vazia (não casa com nada), pra não sumir da chave
+            partes.append(_normalize_term(tok) or '""')
+    return ' '.join(partes)
+
+
+#Compila o postfix em funções aninhadas: cada AND/OR/NOT vira uma única operação bit a bit sobre o bitset inteiro.
+#O NOT é o ~ do Python (complemento infinito); a máscara com o universo é aplicada só uma vez, no final da busca.
+#Frases e NEAR/k primeiro fazem o AND dos bitsets e só depois conferem as posições, nos documentos que sobraram.
+#Termo com curinga (futeb*, estádio?) vira o OR dos bitsets dos termos do dicionário que casam com ele, e um termo
+#fora do vocabulário vira o OR das correções mais próximas (se o motor tiver corretor)
+@lru_cache(maxsize=TAMANHO_CACHE_PLANOS)
+def _compilar(chave: str) -> Optional[Plano]:
+    if not chave:
+        return None
+    postfix = _infix_to_postfix(_tokenize_query(chave), normalizar=False)
+    st: List[Tuple[Plano, Optional[Operando]]] = []
+    for tok in postfix:
+        if tok in ('AND', 'OR') or _is_near(tok):
+            if len(st) < 2:
+                return None
+            fb, ob = st.pop()
+            fa, oa = st.pop()
+            if tok == 'OR':
+                st.append((lambda m, fa=fa, fb=fb: fa(m) | fb(m), None))
+            elif _is_near(tok) and oa and ob:
+                k = int(tok.split('/', 1)[1])
+                st.append((lambda m, oa=oa, ob=ob, k=k: m._perto(oa, ob, k), None))
+            else:
+                # NEAR entre expressões que não são termo/frase fica como AND no nível do documento
+                st.append((lambda m, fa=fa, fb=fb: fa(m) & fb(m), None))
+        elif tok == 'NOT':
+            if len(st) < 1:
+                return None
+            fa, _ = st.pop()
+            st.append((lambda m, fa=fa: ~fa(m), None))
+        elif _is_frase(tok):
+            palavras = tuple(_palavras_frase(tok))
+            st.append((lambda m, p=palavras: m._frase(p), palavras or None))
+        elif _is_curinga(tok):
+            st.append((lambda m, t=tok: m._curinga(t), None))
+        elif tok:
+            st.append((lambda m, t=tok: m._termo(t), (tok,)))
+        else:
+            st.append((lambda m: 0, None))
+    return st[-1][0] if st else None
+
+
+#Motor booleano com um bitset (int do Python) por termo sobre o espaço denso de documentos. Com um IndiceBinario (ou
+#um CorpusVivo) os bitsets saem das listas do arquivo mapeado, termo a termo; com um IndiceInvertido são todos
+#montados na hora.
+#O índice posicional é opcional e só é aberto/consultado quando aparece uma frase ou um NEAR
+class MotorBitset:
+    def __init__(self, indice: Union[IndiceInvertido, IndiceBinario],
+                 posicional: Optional[Callable[[], Union[IndicePosicional, PosicionalBinario]]] = None,
+                 stopwords: Optional[Set[str]] = None, corretor: Optional[Callable[[], CorretorTermos]] = None):
+        self.doc_ids = list(indice.doc_ids)
+        n = len(self.doc_ids)
+        self.bits: Union[Dict[str, int], BitsetsBinario]
+        if not isinstance(indice, IndiceInvertido):
+            self.bits = BitsetsBinario(indice)
+        else:
+            posicao = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+            self.bits = {
+                termo: _posicoes_para_bitset([posicao[d] for d in lista], n)
+                for termo, lista in indice.postings.items()
+            }
+        self.universo = (1 << n) - 1
+        self._posicional = posicional
+        self.stopwords = stopwords or set()
+        self._dicionario: Optional[DicionarioTermos] = None
+        self._corretor = corretor
+
+    #Vocabulário ordenado com o df (bits ligados) de cada termo; só é montado na primeira consulta com curinga/autocompletar
+    @property
+    def dicionario(self) -> DicionarioTermos:
+        if self._dicionario is None:
+            if isinstance(self.bits, BitsetsBinario):
+                self._dicionario = DicionarioTermos(self.bits.dfs())
+            else:
+                self._dicionario = DicionarioTermos({t: b.bit_count() for t, b in self.bits.items()})
+        return self._dicionario
+
+    def avaliar(self, query: str) -> int:
+        plano = _compilar(_chave_consulta(query))
+        if plano is None:
+            return 0
+        return plano(self) & self.universo
+
+    #Tira as stopwords da frase (elas não estão no texto preparado, então "violência nos estádios" vira "violência estádios")
+    def _palavras(self, palavras: Operando) -> Operando:
+        return tuple(w for w in palavras if w not in self.stopwords)
+
+    def _termo(self, termo: str) -> int:
+        bits = self.bits.get(termo)
+        if bits is not None:
+            return bits
+        bits = 0
+        if self._corretor is not None:
+            for t in self._corretor().corrigir(termo):
+                bits |= self.bits.get(t, 0)
+        return bits
+
+    def _curinga(self, padrao: str) -> int:
+        bits = 0
+        for termo in self.dicionario.expandir(padrao):
+            bits |= self.bits[termo]
+        return bits
+
+    def _candidatos(self, palavras: Operando) -> int:
+        if not palavras:
+            return 0
+        bits = self.bits.get(palavras[0], 0)
+        for w in palavras[1:]:
+            if not bits:
+                break
+            bits &= self.bits.get(w, 0)
+        return bits
+
+    def _filtrar(self, candidatos: int, aceita: Callable[[int], bool]) -> int:
+        ok = [p for p in _bits_ligados(candidatos) if aceita(self.doc_ids[p])]
+        return _posicoes_para_bitset(ok, len(self.doc_ids))
+
+    def _frase(self, palavras: Operando) -> int:
+        palavras = self._palavras(palavras)
+        candidatos = self._candidatos(palavras)
+        if len(palavras) < 2 or not candidatos or self._posicional is None:
+            return candidatos
+        posicional = self._posicional()
+        return self._filtrar(candidatos, lambda d: bool(posicional.trechos_frase(list(palavras), d)))
+
+    def _perto(self, a: Operando, b: Operando, k: int) -> int:
+        a = self._palavras(a)
+        b = self._palavras(b)
+        candidatos = self._candidatos(a) & self._candidatos(b)
+        if not candidatos or self._posicional is None:
+            return candidatos
+        posicional = self._posicional()
+        return self._filtrar(candidatos, lambda d: trechos_proximos(
+            posicional.trechos_frase(list(a), d), posicional.trechos_frase(list(b), d), k))
+
+    def doc_ids_de(self, bits: int) -> List[int]:
+        return [self.doc_ids[i] for i in _bits_ligados(bits)]
+
+    #Os DocIds do resultado um a um, em ordem de DocId (quem só quer uma página não monta a lista inteira)
+    def iterar(self, bits: int) -> Iterator[int]:
+        doc_ids = self.doc_ids
+        return (doc_ids[i] for i in _iterar_bits(bits))
+
+    def buscar(self, query: str) -> List[int]:
+        return self.doc_ids_de(self.avaliar(query))
@@ -0,0 +1,111 @@
+from itertools import islice
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .motor_bitset import MotorBitset
+except ImportError:
+    from motor_bitset import MotorBitset
+
+TAMANHO_PAGINA_PADRAO = 10
+TAMANHO_PAGINA_MAXIMO = 100
+# Os modelos ranqueados pedem o top_k em blocos desse tamanho (páginas vizinhas reaproveitam a mesma entrada do cache)
+BLOCO_RANKING = 50
+MAX_RANKING = 1000
+
+# Um item de resultado: (DocId, score); no booleano o score é None
+Item = Tuple[int, Optional[float]]
+
+
+#Resultado do booleano: guarda só o bitset; o total é a contagem de bits e uma página é tirada de um iterador
+#em ordem de DocId, sem montar a lista de todos os documentos que casaram
+class ResultadoBooleano:
+    def __init__(self, motor: MotorBitset, bits: int):
+        self.motor = motor
+        self.bits = bits
+        self.total: Optional[int] = bits.bit_count()
+
+    def __len__(self) -> int:
+        return self.total
+
+    def pagina(self, inicio: int, fim: int) -> List[Item]:
+        return [(doc_id, None) for doc_id in islice(self.motor.iterar(self.bits), inicio, fim)]
+
+    def tem_mais(self, fim: int) -> bool:
+        return fim < self.total
+
+    def vazio(self) -> bool:
+        return self.total == 0
+
+
+#Resultado booleano vindo dos shards: cada shard devolve quantos documentos casaram e só os primeiros DocIds (em
+#ordem) do seu bitset; o coordenador junta esses começos. O total é o de todos os shards, mas só as páginas dentro
+#do começo juntado têm itens (quem busca pede o começo até o fim da página, ver prefixo_para)
+class ResultadoDocIds:
+    def __init__(self, doc_ids: np.ndarray, total: Optional[int] = None):
+        self.doc_ids = doc_ids
+        self.total: Optional[int] = len(doc_ids) if total is None else total
+
+    def __len__(self) -> int:
+        return self.total
+
+    def pagina(self, inicio: int, fim: int) -> List[Item]:
+        return [(int(doc_id), None) for doc_id in self.doc_ids[inicio:fim]]
+
+    def tem_mais(self, fim: int) -> bool:
+        return fim < self.total
+
+    def vazio(self) -> bool:
+        return self.total == 0
+
+
+#Resultado ranqueado: os k melhores (DocId, score) já em ordem. Se vieram menos de k, esses são todos os documentos
+#que o modelo devolve e o total é conhecido; senão pode haver mais depois do k-ésimo (a não ser que quem ranqueou
+#saiba o total, como o híbrido, que conta o bitset da expressão booleana)
+class ResultadoRanqueado:
+    def __init__(self, itens: Tuple[Item, ...], top_k: Optional[int], total: Optional[int] = None):
+        self.itens = itens
+        self.completo = top_k is None or len(itens) < top_k
+        self.total: Optional[int] = total if total is not None else (len(itens) if self.completo else None)
+        self.total_exato = total is not None
+
+    def __len__(self) -> int:
+        return len(self.itens)
+
+    def pagina(self, inicio: int, fim: int) -> List[Item]:
+        return list(self.itens[inicio:fim])
+
+    def tem_mais(self, fim: int) -> bool:
+        return fim < len(self.itens)
+
+    #Sem nenhum score positivo (o vetorial devolve os documentos com score zero também); com o total exato (híbrido)
+    #o score zero é de um candidato de verdade, então só conta o total
+    def vazio(self) -> bool:
+        if self.total_exato:
+            return self.total == 0
+        return not self.itens or self.itens[0][1] <= 0
+
+
+#Lê page/page_size (começando em 1) e devolve a página e o tamanho já limitados
+def ler_pagina(page, page_size) -> Tuple[int, int]:
+    try:
+        pagina = max(int(page), 1)
+    except (TypeError, ValueError):
+        pagina = 1
+    try:
+        tamanho = min(max(int(page_size), 1), TAMANHO_PAGINA_MAXIMO)
+    except (TypeError, ValueError):
+        tamanho = TAMANHO_PAGINA_PADRAO
+    return pagina, tamanho
+
+
+#Quantos resultados ranqueados buscar pra cobrir até a posição fim (+1 pra saber se existe a próxima página)
+def top_k_para(fim: int) -> int:
+    return min(-(-(fim + 1) // BLOCO_RANKING) * BLOCO_RANKING, MAX_RANKING)
+
+
+#Quantos DocIds do booleano cada shard manda pra cobrir até a posição fim, nos mesmos blocos do ranking; sem o teto
+#do MAX_RANKING, porque o booleano pagina até o último documento (e o total vem da contagem, não desse começo)
+def prefixo_para(fim: int) -> int:
+    return -(-fim // BLOCO_RANKING) * BLOCO_RANKING
@@ -1,75 +1,91 @@
 import json
-import re
+import os
 import sys
 from pathlib import Path
+from typing import Dict, List, Optional, Set
 
-# Busca os arquivos do backend
-script_dir = Path(__file__).parent.resolve()
-if len(sys.argv) > 1:
-    data_dir = Path(sys.argv[1]).expanduser().resolve()
-else:
-    data_dir = script_dir
+try:
+    from .analise import carregar_stopwords, obter_analisador
+except ImportError:
+    from analise import carregar_stopwords, obter_analisador
 
-METADATA = None
-candidate = data_dir / "metadados.json"
-if candidate.exists():
-    METADATA = candidate
-else:
-    search_root = script_dir.parent
-    found = list(search_root.rglob("metadados.json"))
-    if found:
-        METADATA = found[0]
 
-if METADATA is None:
+# Busca os arquivos do backend (só é usado pela linha de comando; quem importa o módulo passa os caminhos)
+def localizar_metadados(data_dir: Path) -> Path:
+    script_dir = Path(__file__).parent.resolve()
+    candidate = data_dir / "metadados.json"
+    if candidate.exists():
+        return candidate
+    found = list(script_dir.parent.rglob("metadados.json"))
+    if found:
+        return found[0]
     raise FileNotFoundError(
         f"metadados.json não encontrado em {data_dir} nem nas pastas acima.\n"
         "Passe a pasta de dados como primeiro argumento, por exemplo:\n"
         "python preparacao.py C:\\caminho\\para\\Search-SRI-Football\\JSONs"
     )
 
-#Define o nome do json que vai retornar os dados após a preparação do mesmo
-data_dir = METADATA.parent
-OUT = data_dir / "dadospreparados.json"
 
 #Força a busca do arquivo stopwords.txt NÃO ALTERAR O NOME E NEM A POSIÇÃO DELE !
-STOPWORDS = None
-candidates = [script_dir, script_dir.parent, data_dir, data_dir.parent]
-for p in candidates:
-    try:
-        if p and (p / "stopwords.txt").exists():
-            STOPWORDS = p / "stopwords.txt"
-            break
-    except Exception:
-        continue
-if STOPWORDS is None:
+def localizar_stopwords(data_dir: Path) -> Path:
+    script_dir = Path(__file__).parent.resolve()
+    candidates = [script_dir, script_dir.parent, data_dir, data_dir.parent]
+    for p in candidates:
+        try:
+            if p and (p / "stopwords.txt").exists():
+                return p / "stopwords.txt"
+        except Exception:
+            continue
     found_sw = list(script_dir.parent.rglob("stopwords.txt"))
     if found_sw:
-        STOPWORDS = found_sw[0]
-#Trataiva de erro se caso não achou o arquivo
-if STOPWORDS is None:
+        return found_sw[0]
+    #Trataiva de erro se caso não achou o arquivo
     raise FileNotFoundError(
         f"stopwords.txt não encontrado próximo ao script ({script_dir}) nem em pastas prováveis."
     )
-print(f"Usando metadados: {METADATA}")
-print(f"Usando stopwords: {STOPWORDS}")
-print(f"Gravando saída em: {OUT}")
 
-#Aqui ele vai remover as stopwords e transformam todas em letra minúscula para facilitar a busca posteriormente
-with STOPWORDS.open(encoding='utf-8') as f:
-    stops = {line.strip().lower() for line in f if line.strip()}
-with METADATA.open(encoding='utf-8') as f:
-    data = json.load(f)
-processed = []
-word_re = re.compile(r"\b\w+\b", flags=re.UNICODE)
-for item in data:
-    docid = item.get('DocId')
-    resumo = item.get('Resumo','')
-    texto = resumo.lower()
-    tokens = word_re.findall(texto)
-    filtered = [t for t in tokens if t not in stops]
-    new_text = ' '.join(filtered)
-    processed.append({"DocId": docid, "Resumo": new_text})
-with OUT.open('w', encoding='utf-8') as f:
-    json.dump(processed, f, ensure_ascii=False, indent=2)
 
-print(f"{len(processed)} resumos foram preparados e enviados para: {OUT}")
+#Aqui ele passa o resumo pela cadeia de análise (Logica/analise.py): minúsculo, sem acento, sem stopwords e com
+#o radical de cada palavra. As consultas passam pela mesma cadeia, então os termos sempre batem
+def preparar_documentos(data: List[Dict], stops: Set[str]) -> List[Dict]:
+    analisador = obter_analisador(stops)
+    processed = []
+    for item in data:
+        docid = item.get('DocId')
+        resumo = item.get('Resumo', '')
+        new_text = ' '.join(analisador.termos(resumo))
+        processed.append({"DocId": docid, "Resumo": new_text})
+    return processed
+
+
+#Lê o metadados.json, prepara e grava o dadospreparados.json ao lado dele
+def preparar_arquivo(metadata: Path, stopwords: Path, out: Optional[Path] = None) -> List[Dict]:
+    out = out or (metadata.parent / "dadospreparados.json")
+    stops = carregar_stopwords(stopwords)
+    with metadata.open(encoding='utf-8') as f:
+        data = json.load(f)
+    processed = preparar_documentos(data, stops)
+    # grava num .tmp e troca no final: quem estiver lendo (o servidor recarregando, por exemplo) nunca vê o arquivo pela metade
+    tmp = out.with_name(out.name + '.tmp')
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(processed, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out)
+    return processed
+
+
+def main(argv: List[str]) -> int:
+    script_dir = Path(__file__).parent.resolve()
+    data_dir = Path(argv[0]).expanduser().resolve() if argv else script_dir
+    metadata = localizar_metadados(data_dir)
+    stopwords = localizar_stopwords(metadata.parent)
+    out = metadata.parent / "dadospreparados.json"
+    print(f"Usando metadados: {metadata}")
+    print(f"Usando stopwords: {stopwords}")
+    print(f"Gravando saída em: {out}")
+    processed = preparar_arquivo(metadata, stopwords, out)
+    print(f"{len(processed)} resumos foram preparados e enviados para: {out}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main(sys.argv[1:]))
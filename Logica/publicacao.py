@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# O build grava os artefatos na pasta JSONs, um de cada vez; o servidor não lê dali. No fim de um build completo os
+# artefatos são publicados numa geração imutável e só então o ponteiro é trocado:
+#   publicacoes/g000007/ -> cópia dos artefatos. As saídas do build entram por hard link (todas são gravadas num .tmp
+#                           e trocadas com os.replace, então o arquivo da geração nunca muda depois de publicado); o
+#                           metadados.json, que também é editado à mão (às vezes no lugar), é copiado
+#   publicado.json       -> {"geracao", "pasta", "publicado_em", "arquivos": {caminho: hash}, "fontes": {...}},
+#                           gravado por último (.tmp + os.replace). fontes são os hashes do metadados.json e das
+#                           stopwords de onde a geração saiu (o servidor compara com os atuais pra saber se ela está
+#                           desatualizada). É o único arquivo que o servidor observa: quem o lê vê a geração
+#                           anterior inteira ou a nova inteira, nunca um build pela metade
+# Os segmentos incrementais (JSONs/segmentos) ficam fora: têm o próprio log e são sobrepostos a qualquer geração
+PONTEIRO = "publicado.json"
+DIR_PUBLICACOES = "publicacoes"
+# Gerações mantidas no disco (a publicada e as anteriores, pra quem ainda estiver lendo uma delas)
+MANTER_PUBLICACOES = 3
+ARTEFATOS_PUBLICADOS = (
+    "metadados.json",
+    "dadospreparados.json",
+    "dados_tokenizados.json",
+    "termos_significativos.json",
+    "indice.bin",
+    "indice_tfidf",
+    "vizinhos",
+    "indice_lsa",
+    "shards",
+)
+COPIADOS = ("metadados.json",)
+_BLOCO = 1 << 20
+
+
+def hash_conteudo(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with Path(path).open('rb') as f:
+        for bloco in iter(lambda: f.read(_BLOCO), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+#Hash de arquivos que só é recalculado quando o mtime ou o tamanho mudam (o servidor confere as fontes a cada
+#volta do observador e a cada /health sem reler nada enquanto elas não mudam)
+class HashesArquivos:
+    def __init__(self):
+        self._cache: Dict[Path, Tuple[int, int, str]] = {}
+
+    def __call__(self, path: Path) -> Optional[str]:
+        path = Path(path)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        guardado = self._cache.get(path)
+        if guardado is not None and guardado[:2] == (st.st_mtime_ns, st.st_size):
+            return guardado[2]
+        h = hash_conteudo(path)
+        self._cache[path] = (st.st_mtime_ns, st.st_size, h)
+        return h
+
+
+def ler_ponteiro(jsons_dir: Path) -> Optional[Dict]:
+    try:
+        with (Path(jsons_dir) / PONTEIRO).open(encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+#Pasta que o servidor deve abrir: a geração publicada, ou a própria JSONs se nada foi publicado ainda
+def pasta_publicada(jsons_dir: Path) -> Path:
+    ponteiro = ler_ponteiro(jsons_dir)
+    if ponteiro is None:
+        return Path(jsons_dir)
+    return Path(jsons_dir) / ponteiro["pasta"]
+
+
+def _arquivos(jsons_dir: Path) -> List[Path]:
+    out = []
+    for nome in ARTEFATOS_PUBLICADOS:
+        path = jsons_dir / nome
+        if path.is_file():
+            out.append(path)
+        elif path.is_dir():
+            out += sorted(p for p in path.rglob("*") if p.is_file() and not p.name.endswith(".tmp"))
+    return out
+
+
+#Hashes das fontes de um build: o que, mudando, deixa a geração publicada desatualizada
+def hashes_fontes(jsons_dir: Path, stopwords: Path, hash_arquivo: Callable[[Path], Optional[str]]) -> Dict[str, Optional[str]]:
+    return {"metadados.json": hash_arquivo(Path(jsons_dir) / "metadados.json"), "stopwords": hash_arquivo(stopwords)}
+
+
+#Motivo de a geração publicada não ser a das fontes atuais (metadados.json ou stopwords editados e o build ainda não
+#rodou, ou está rodando), ou None se ela está em dia. Só compara hashes guardados por mtime: cabe no /health
+def motivo_desatualizada(jsons_dir: Path, stopwords: Path, hash_arquivo: Callable[[Path], Optional[str]]) -> Optional[str]:
+    ponteiro = ler_ponteiro(jsons_dir)
+    if ponteiro is None:
+        return "nenhuma geração publicada"
+    publicadas = ponteiro.get("fontes", {})
+    for nome, h in hashes_fontes(jsons_dir, stopwords, hash_arquivo).items():
+        if publicadas.get(nome) != h:
+            return f"{nome} mudou depois da geração {ponteiro['geracao']}"
+    return None
+
+
+def _hashes(jsons_dir: Path, hash_arquivo: Callable[[Path], Optional[str]]) -> Dict[str, Optional[str]]:
+    return {p.relative_to(jsons_dir).as_posix(): hash_arquivo(p) for p in _arquivos(jsons_dir)}
+
+
+#Motivo de a geração publicada não ser a dos artefatos atuais da pasta JSONs, ou None se é
+def motivo_publicacao(jsons_dir: Path, hash_arquivo: Callable[[Path], Optional[str]],
+                      fontes: Dict[str, Optional[str]]) -> Optional[str]:
+    jsons_dir = Path(jsons_dir)
+    atual = ler_ponteiro(jsons_dir)
+    if atual is None:
+        return f"{PONTEIRO} não existe"
+    if not (jsons_dir / atual["pasta"]).is_dir():
+        return f"{atual['pasta']} não existe"
+    publicados = atual.get("arquivos", {})
+    hashes = _hashes(jsons_dir, hash_arquivo)
+    for rel, h in hashes.items():
+        if publicados.get(rel) != h:
+            return f"{rel} mudou"
+    removidos = sorted(set(publicados) - set(hashes))
+    if removidos:
+        return f"{removidos[0]} foi removido"
+    if atual.get("fontes") != fontes:
+        return "fontes mudaram"
+    return None
+
+
+def _ligar(origem: Path, destino: Path):
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    if origem.name in COPIADOS:
+        shutil.copy2(origem, destino)
+        return
+    try:
+        os.link(origem, destino)
+    except OSError:
+        # sistema de arquivos sem hard link (ou outro volume): copia
+        shutil.copy2(origem, destino)
+
+
+#Publica os artefatos atuais da pasta JSONs como uma geração nova e troca o ponteiro. Se os hashes são os mesmos da
+#geração publicada, não publica nada (um build "em dia" não faz o servidor recarregar). Devolve a pasta publicada
+def publicar_geracao(jsons_dir: Path, hash_arquivo: Callable[[Path], Optional[str]],
+                     fontes: Dict[str, Optional[str]]) -> Path:
+    jsons_dir = Path(jsons_dir)
+    if motivo_publicacao(jsons_dir, hash_arquivo, fontes) is None:
+        return pasta_publicada(jsons_dir)
+    arquivos = _arquivos(jsons_dir)
+    hashes = _hashes(jsons_dir, hash_arquivo)
+
+    raiz = jsons_dir / DIR_PUBLICACOES
+    existentes = sorted(p.name for p in raiz.glob("g*") if p.is_dir() and p.name[1:].isdigit())
+    numero = max([int(n[1:]) for n in existentes] + [0]) + 1
+    nome = f"g{numero:06d}"
+    tmp = raiz / (nome + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    for p in arquivos:
+        _ligar(p, tmp / p.relative_to(jsons_dir))
+    os.replace(tmp, raiz / nome)
+
+    ponteiro = {"geracao": numero, "pasta": f"{DIR_PUBLICACOES}/{nome}", "publicado_em": time.time(),
+                "arquivos": hashes, "fontes": fontes}
+    tmp_ponteiro = jsons_dir / (PONTEIRO + ".tmp")
+    with tmp_ponteiro.open("w", encoding="utf-8") as f:
+        json.dump(ponteiro, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_ponteiro, jsons_dir / PONTEIRO)
+
+    # as gerações mais antigas saem (num Windows, uma que ainda esteja mapeada fica pra próxima publicação)
+    for antiga in existentes[:max(0, len(existentes) + 1 - MANTER_PUBLICACOES)]:
+        shutil.rmtree(raiz / antiga, ignore_errors=True)
+    return raiz / nome
@@ -0,0 +1,209 @@
+import heapq
+import json
+import os
+import shutil
+import zlib
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .TF_IDF import load_tokenized, compute_tfidf, gravar_indice_completo
+    from .formato_binario import gravar_indice_binario
+    from .busca_lsa import gravar_fatia_lsa
+    from .paginacao import ResultadoDocIds, ResultadoRanqueado
+    from .facetas import CAMPOS_FACETA, MAX_VALORES_FACETA, chave_valor
+    from .publicacao import hash_conteudo
+except ImportError:
+    from TF_IDF import load_tokenized, compute_tfidf, gravar_indice_completo
+    from formato_binario import gravar_indice_binario
+    from busca_lsa import gravar_fatia_lsa
+    from paginacao import ResultadoDocIds, ResultadoRanqueado
+    from facetas import CAMPOS_FACETA, MAX_VALORES_FACETA, chave_valor
+    from publicacao import hash_conteudo
+
+# Índice particionado em shards, na pasta JSONs/shards:
+#   info.json          -> versão, nº de shards, partição ("faixa" de DocIds ou "hash"), documentos de cada shard e o
+#                         corpus de onde saíram (nº de documentos e hash do metadados.json e do dados_tokenizados.json)
+#   estatisticas.json  -> N, tamanho médio e df de cada termo do corpus inteiro (o BM25 de cada shard pontua com eles)
+#   shard_000/ ...     -> uma pasta no formato da JSONs só com os documentos do shard: metadados, preparados e
+#                         tokenizados, o indice_tfidf (pesos com o idf do corpus inteiro), a fatia do indice_lsa e o
+#                         indice.bin (esses dois só se o corpus tiver)
+# O info.json é gravado por último: quem o lê sabe que as pastas dos shards já estão completas
+VERSAO_SHARDS = 2
+# Arquivos do corpus cujo hash vai no info.json: shards de outro corpus não são usados
+ARQUIVOS_CORPUS = ("metadados.json", "dados_tokenizados.json")
+PARTICOES = ("faixa", "hash")
+
+
+#Divide os DocIds em n grupos ordenados: "faixa" dá intervalos contíguos de DocId do mesmo tamanho; "hash" espalha
+#pelo crc32 do DocId (documentos novos no fim do corpus não caem todos no último shard)
+def particionar(doc_ids: Sequence[int], n: int, particao: str = "faixa") -> List[List[int]]:
+    if particao not in PARTICOES:
+        raise ValueError(f"partição desconhecida: {particao}")
+    doc_ids = sorted(doc_ids)
+    n = max(1, min(n, len(doc_ids)))
+    if particao == "hash":
+        grupos: List[List[int]] = [[] for _ in range(n)]
+        for doc_id in doc_ids:
+            grupos[zlib.crc32(str(doc_id).encode()) % n].append(doc_id)
+        return grupos
+    base, resto = divmod(len(doc_ids), n)
+    grupos = []
+    ini = 0
+    for i in range(n):
+        fim = ini + base + (1 if i < resto else 0)
+        grupos.append(doc_ids[ini:fim])
+        ini = fim
+    return grupos
+
+
+def _ler_lista(path: Path) -> List[Dict]:
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_json(path: Path, dados):
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _hashes_corpus(jsons_dir: Path) -> Dict[str, Optional[str]]:
+    return {nome: hash_conteudo(jsons_dir / nome) if (jsons_dir / nome).exists() else None
+            for nome in ARQUIVOS_CORPUS}
+
+
+def pasta_shard(pasta: Path, i: int) -> Path:
+    return Path(pasta) / f"shard_{i:03d}"
+
+
+#Estatísticas globais que o BM25 precisa: N, tamanho médio (em tokens) e df (documentos com tf > 0) de cada termo
+def estatisticas_globais(contagens: Dict[int, Dict[str, int]]) -> Dict:
+    df: Dict[str, int] = {}
+    tokens = 0
+    for counts in contagens.values():
+        tokens += sum(counts.values())
+        for termo, tf in counts.items():
+            if tf > 0:
+                df[termo] = df.get(termo, 0) + 1
+    n = len(contagens)
+    return {"n_docs": n, "media_tamanho": (tokens / n) if n else 0.0, "df": df}
+
+
+#Aqui ele grava os shards a partir dos artefatos já gerados na pasta JSONs. Os pesos TF-IDF são calculados uma vez
+#com o df do corpus inteiro e cada shard recebe só as linhas dele; o LSA é fatiado das linhas do indice_lsa global.
+#Pastas de shards que sobraram de uma gravação com mais shards são apagadas. Devolve o info.json gravado
+def gravar_shards(jsons_dir: Path, n: int, particao: str = "faixa") -> Dict:
+    jsons_dir = Path(jsons_dir)
+    pasta = jsons_dir / "shards"
+    contagens = load_tokenized(jsons_dir / "dados_tokenizados.json")
+    pesos, idf = compute_tfidf(contagens)
+    grupos = particionar(contagens.keys(), n, particao)
+    metadados = {int(m.get("DocId")): m for m in _ler_lista(jsons_dir / "metadados.json")}
+    preparados = {int(d.get("DocId")): d for d in _ler_lista(jsons_dir / "dadospreparados.json")}
+    tokenizados = {int(d.get("DocId")): d for d in _ler_lista(jsons_dir / "dados_tokenizados.json")}
+    pasta_lsa = jsons_dir / "indice_lsa"
+    com_binario = (jsons_dir / "indice.bin").exists()
+
+    pasta.mkdir(parents=True, exist_ok=True)
+    for i, grupo in enumerate(grupos):
+        destino = pasta_shard(pasta, i)
+        destino.mkdir(exist_ok=True)
+        metas = [metadados[d] for d in grupo if d in metadados]
+        _gravar_json(destino / "metadados.json", metas)
+        _gravar_json(destino / "dadospreparados.json", [preparados[d] for d in grupo if d in preparados])
+        _gravar_json(destino / "dados_tokenizados.json", [tokenizados[d] for d in grupo])
+        pesos_shard = {d: pesos[d] for d in grupo}
+        gravar_indice_completo(pesos_shard, idf, destino / "indice_tfidf")
+        if (pasta_lsa / "info.json").exists():
+            gravar_fatia_lsa(pasta_lsa, destino / "indice_lsa", grupo)
+        if com_binario:
+            gravar_indice_binario(destino / "indice.bin", metas, {d: contagens[d] for d in grupo},
+                                  {d: preparados[d].get("Resumo", "") for d in grupo if d in preparados})
+    for sobra in pasta.glob("shard_*"):
+        if sobra.is_dir() and sobra.name[6:].isdigit() and int(sobra.name[6:]) >= len(grupos):
+            shutil.rmtree(sobra)
+
+    _gravar_json(pasta / "estatisticas.json", estatisticas_globais(contagens))
+    info = {"versao": VERSAO_SHARDS, "n": len(grupos), "particao": particao, "docs": [len(g) for g in grupos],
+            "n_docs": len(contagens), "corpus": _hashes_corpus(jsons_dir)}
+    _gravar_json(pasta / "info.json", info)
+    return info
+
+
+#info.json dos shards gravados (ValueError se for de outra versão ou se faltar a pasta de algum shard)
+def abrir_shards(pasta: Path) -> Dict:
+    pasta = Path(pasta)
+    with (pasta / "info.json").open(encoding="utf-8") as f:
+        info = json.load(f)
+    if info.get("versao") != VERSAO_SHARDS:
+        raise ValueError(f"Versão dos shards em {pasta} não suportada: {info.get('versao')}")
+    for i in range(info["n"]):
+        if not (pasta_shard(pasta, i) / "dados_tokenizados.json").exists():
+            raise ValueError(f"Shard {i} ausente em {pasta}")
+    return info
+
+
+#Motivo de os shards gravados em jsons_dir/shards não servirem pro corpus de jsons_dir (outra versão, shard faltando,
+#outro número de documentos ou outro hash do corpus), ou None se servem
+def motivo_shards(jsons_dir: Path, n_docs: int) -> Optional[str]:
+    jsons_dir = Path(jsons_dir)
+    try:
+        info = abrir_shards(jsons_dir / "shards")
+    except FileNotFoundError:
+        return "shards/info.json não existe"
+    except ValueError as e:
+        return str(e)
+    if info.get("n_docs") != n_docs:
+        return f"shards com {info.get('n_docs')} documentos, corpus com {n_docs}"
+    if info.get("corpus") != _hashes_corpus(jsons_dir):
+        return "shards gravados de outro corpus"
+    return None
+
+
+def carregar_estatisticas(pasta: Path) -> Dict:
+    with (Path(pasta) / "estatisticas.json").open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+#Junta os top_k de cada shard (cada lista já vem ordenada) com um merge por heap: score decrescente e, no empate,
+#o menor DocId, que é a mesma ordem do índice sem shards. O total só é exato se todos os shards souberem o seu
+def juntar_ranqueados(partes: Sequence[ResultadoRanqueado], top_k: Optional[int]) -> ResultadoRanqueado:
+    itens = heapq.merge(*(p.itens for p in partes), key=lambda it: (-it[1], it[0]))
+    if top_k:
+        itens = islice(itens, top_k)
+    total = sum(p.total for p in partes) if partes and all(p.total_exato for p in partes) else None
+    return ResultadoRanqueado(tuple(itens), top_k, total)
+
+
+#Booleano: cada shard manda (quantos casaram, primeiros DocIds em ordem); os começos são juntados por merge (na
+#partição por hash os DocIds dos shards se intercalam) até limite itens, e o total é a soma das contagens
+def juntar_booleanos(partes: Sequence[Tuple[int, np.ndarray]], limite: Optional[int] = None) -> ResultadoDocIds:
+    total = sum(n for n, _ in partes)
+    doc_ids = heapq.merge(*(ids.tolist() for _, ids in partes))
+    if limite:
+        doc_ids = islice(doc_ids, limite)
+    return ResultadoDocIds(np.fromiter(doc_ids, dtype=np.int64), total)
+
+
+#Facetas: cada shard manda a contagem de todos os valores (não só os n maiores, senão um valor que é médio em todos
+#os shards sumiria) e aqui elas são somadas; o rótulo mostrado é o do primeiro shard que tem o valor
+def juntar_facetas(partes: Sequence[Dict[str, List[Dict]]], n: int = MAX_VALORES_FACETA) -> Dict[str, List[Dict]]:
+    out = {}
+    for campo in CAMPOS_FACETA:
+        contagem: Dict[str, int] = {}
+        rotulos: Dict[str, str] = {}
+        for parte in partes:
+            for item in parte.get(campo, ()):
+                chave = chave_valor(item["valor"])
+                contagem[chave] = contagem.get(chave, 0) + item["contagem"]
+                rotulos.setdefault(chave, item["valor"])
+        melhores = heapq.nsmallest(n, contagem.items(), key=lambda kv: (-kv[1], rotulos[kv[0]]))
+        out[campo] = [{"valor": rotulos[chave], "contagem": c} for chave, c in melhores]
+    return out
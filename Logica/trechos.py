@@ -0,0 +1,91 @@
+from collections import Counter
+from typing import Container, List, Sequence, Tuple
+
+TAMANHO_TRECHO = 250
+
+# Pedaços do trecho: (texto, destacado)
+Trecho = List[Tuple[str, bool]]
+
+
+#Corte antigo (começo do texto, respeitando palavra), usado quando nenhum termo da consulta aparece no documento
+def _inicio(texto: str, max_chars: int) -> Trecho:
+    if len(texto) <= max_chars:
+        return [(texto, False)]
+    return [(texto[:max_chars].rsplit(" ", 1)[0] + " ...", False)]
+
+
+#Aqui ele escolhe a janela de até max_chars caracteres com mais termos diferentes da consulta (e, no empate, mais
+#ocorrências) e marca esses termos. spans e termos são os tokens indexados do documento, calculados na indexação
+#(spans = [ini0, fim0, ini1, fim1, ...] no texto original; termos = o termo de cada token); alvo = termos da consulta
+def gerar_trecho(texto: str, spans: Sequence[int], termos: Sequence, alvo: Container,
+                 max_chars: int = TAMANHO_TRECHO) -> Trecho:
+    if not texto:
+        return []
+    acertos = [i for i in range(len(termos)) if termos[i] in alvo]
+    if not acertos:
+        return _inicio(texto, max_chars)
+    if len(texto) <= max_chars:
+        return _marcar(texto, spans, acertos, 0, len(texto))
+
+    # duas pontas sobre as ocorrências: a janela [a, b] cabe em max_chars
+    melhor = (0, 0, 0, 0)
+    janela: Counter = Counter()
+    b = 0
+    for a in range(len(acertos)):
+        inicio = spans[2 * acertos[a]]
+        while b < len(acertos) and spans[2 * acertos[b] + 1] - inicio <= max_chars:
+            janela[termos[acertos[b]]] += 1
+            b += 1
+        if b == a:
+            # uma palavra maior que o trecho inteiro: ela sozinha
+            janela[termos[acertos[a]]] += 1
+            b = a + 1
+        nota = (len(janela), b - a)
+        if nota > melhor[:2]:
+            melhor = (nota[0], nota[1], a, b)
+        janela[termos[acertos[a]]] -= 1
+        if not janela[termos[acertos[a]]]:
+            del janela[termos[acertos[a]]]
+    _, _, a, b = melhor
+    primeiro = spans[2 * acertos[a]]
+    ultimo = spans[2 * acertos[b - 1] + 1]
+
+    # sobra da janela: um terço vai pra contexto antes do primeiro termo, cortando em espaço
+    folga = max(max_chars - (ultimo - primeiro), 0)
+    ini = max(primeiro - folga // 3, 0)
+    if ini > 0:
+        espaco = texto.find(" ", ini, primeiro)
+        ini = espaco + 1 if espaco != -1 else primeiro
+    fim = min(ini + max_chars, len(texto))
+    if fim < len(texto):
+        espaco = texto.rfind(" ", ultimo, fim + 1)
+        fim = espaco if espaco != -1 else max(fim, ultimo)
+    fim = max(fim, ultimo)
+    return _marcar(texto, spans, acertos[a:], ini, fim)
+
+
+#Recorta texto[ini:fim] marcando as ocorrências (acertos) que caem dentro dele
+def _marcar(texto: str, spans: Sequence[int], acertos: List[int], ini: int, fim: int) -> Trecho:
+    out: Trecho = []
+    if ini > 0:
+        out.append(("... ", False))
+    pos = ini
+    for i in acertos:
+        s, e = spans[2 * i], spans[2 * i + 1]
+        if e > fim:
+            break
+        if s < pos:
+            continue
+        if s > pos:
+            out.append((texto[pos:s], False))
+        out.append((texto[s:e], True))
+        pos = e
+    if pos < fim:
+        out.append((texto[pos:fim], False))
+    if fim < len(texto):
+        out.append((" ...", False))
+    return out
+
+
+def texto_do_trecho(trecho: Trecho) -> str:
+    return "".join(t for t, _ in trecho)
@@ -0,0 +1,323 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from .busca_vetorial_esparsa import MatrizTfIdf
+except ImportError:
+    from busca_vetorial_esparsa import MatrizTfIdf
+
+# Vizinhos mais próximos ("mais como este") de cada documento pelo cosseno TF-IDF, calculados offline e gravados na
+# pasta JSONs/vizinhos como .npy (mapeados com mmap na leitura):
+#   doc_ids.npy -> DocIds em ordem crescente; ids.npy -> DocIds dos vizinhos (linha i = doc_ids[i], -1 = vazio);
+#   scores.npy  -> cosseno de cada vizinho; info.json -> versão, n, método e o número de documentos
+# Até LIMITE_EXATO documentos o cálculo é exato (produto esparso em blocos); acima disso os candidatos vêm de
+# MinHash/LSH sobre os termos mais pesados de cada documento e só eles têm o cosseno calculado
+VERSAO_VIZINHOS = 1
+N_VIZINHOS = 10
+LIMITE_EXATO = 20000
+# células (linhas do bloco x documentos) da matriz densa de cada bloco no cálculo exato
+CELULAS_BLOCO = 1 << 22
+# com uma linha por banda, dois documentos são candidatos quando algum dos BANDAS MinHash coincide, o que acha bem
+# mais vizinhos de cosseno baixo; cada documento tem no máximo BANDAS x MAX_BALDE candidatos, então o custo é
+# linear no número de documentos
+TERMOS_ASSINATURA = 32
+BANDAS = 48
+LINHAS_BANDA = 1
+# balde com mais documentos que isso é de um termo comum demais pra indicar semelhança: é ignorado
+MAX_BALDE = 100
+LINHAS_LOTE_LSH = 4096
+# acima dessa fração de documentos mudados, refazer tudo sai mais barato (e corrige o idf de todos os pares)
+FRACAO_REFAZER = 0.2
+_PRIMO = (1 << 31) - 1
+
+
+def resolver_metodo(metodo: str, n_docs: int) -> str:
+    if metodo == "auto":
+        return "exato" if n_docs <= LIMITE_EXATO else "lsh"
+    if metodo not in ("exato", "lsh"):
+        raise ValueError(f"método de vizinhos desconhecido: {metodo}")
+    return metodo
+
+
+#Posições das entradas das linhas pedidas no CSR, e a qual delas (0..len(linhas)-1) cada entrada pertence
+def _entradas(indptr: np.ndarray, linhas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    ini = np.asarray(indptr[linhas], dtype=np.int64)
+    tam = np.asarray(indptr[linhas + 1], dtype=np.int64) - ini
+    total = int(tam.sum())
+    pos = np.repeat(ini - (np.cumsum(tam) - tam), tam) + np.arange(total)
+    return pos, np.repeat(np.arange(len(linhas)), tam)
+
+
+#Cossenos de um bloco de linhas contra todos os documentos (len(linhas) x N). As entradas do bloco são agrupadas
+#por termo e cada coluna (CSC) é lida uma vez pro bloco inteiro
+def _cossenos_bloco(matriz: MatrizTfIdf, linhas: np.ndarray) -> np.ndarray:
+    n = len(matriz)
+    dots = np.zeros((len(linhas), n))
+    pos, dono = _entradas(matriz.indptr, linhas)
+    if len(pos):
+        termos = np.asarray(matriz.indices[pos], dtype=np.int64)
+        pesos = np.asarray(matriz.data[pos], dtype=np.float64)
+        ordem = np.argsort(termos, kind='stable')
+        termos, dono, pesos = termos[ordem], dono[ordem], pesos[ordem]
+        cortes = np.flatnonzero(np.diff(termos)) + 1
+        for t, d, p in zip(termos[np.r_[0, cortes]], np.split(dono, cortes), np.split(pesos, cortes)):
+            a, b = matriz.col_ptr[t], matriz.col_ptr[t + 1]
+            col = np.asarray(matriz.col_linhas[a:b], dtype=np.int64)
+            dots[d[:, None], col[None, :]] += p[:, None] * np.asarray(matriz.col_valores[a:b], dtype=np.float64)
+    normas = np.asarray(matriz.normas, dtype=np.float64)
+    denom = normas[linhas][:, None] * normas[None, :]
+    return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+
+#Aqui ele monta as assinaturas MinHash (com os TERMOS_ASSINATURA termos de maior peso de cada documento) e, pra
+#cada banda, em que balde cada documento caiu. Dois documentos são candidatos se dividem um balde em alguma banda
+class _Lsh:
+    def __init__(self, matriz: MatrizTfIdf, semente: int = 0):
+        n = len(matriz)
+        self.n = n
+        indptr = np.asarray(matriz.indptr, dtype=np.int64)
+        tam = np.diff(indptr)
+        dono = np.repeat(np.arange(n), tam)
+        ordem = np.lexsort((-np.asarray(matriz.data, dtype=np.float64), dono))
+        posto = np.arange(len(ordem)) - np.repeat(indptr[:-1], tam)
+        manter = ordem[posto < TERMOS_ASSINATURA]
+        termos = np.asarray(matriz.indices, dtype=np.int64)[manter]
+        cheias = np.flatnonzero(tam > 0)
+        inicios = np.cumsum(np.minimum(tam, TERMOS_ASSINATURA))[:-1]
+        inicios = np.concatenate([[0], inicios])[cheias]
+        rng = np.random.default_rng(semente)
+        k = BANDAS * LINHAS_BANDA
+        a = rng.integers(1, _PRIMO, size=k)
+        b = rng.integers(0, _PRIMO, size=k)
+        assinaturas = np.full((n, k), _PRIMO, dtype=np.int64)
+        if len(termos):
+            for j in range(k):
+                assinaturas[cheias, j] = np.minimum.reduceat((a[j] * termos + b[j]) % _PRIMO, inicios)
+        self.vazias = tam == 0
+        # por banda: balde de cada documento, documentos ordenados por balde e onde cada balde começa/termina
+        self.baldes: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        for banda in range(BANDAS):
+            parte = np.ascontiguousarray(assinaturas[:, banda * LINHAS_BANDA:(banda + 1) * LINHAS_BANDA])
+            chaves = parte.view(np.dtype((np.void, parte.dtype.itemsize * LINHAS_BANDA))).ravel()
+            _, balde = np.unique(chaves, return_inverse=True)
+            balde = balde.ravel()
+            membros = np.argsort(balde, kind='stable')
+            tamanhos = np.bincount(balde)
+            inicio = np.cumsum(tamanhos) - tamanhos
+            self.baldes.append((balde, membros, inicio, tamanhos))
+
+    #Pares (linha, candidato) das linhas pedidas, sem repetição e sem o próprio documento, ordenados por linha
+    def candidatos(self, linhas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        origens, destinos = [], []
+        linhas = linhas[~self.vazias[linhas]]
+        for balde, membros, inicio, tamanhos in self.baldes:
+            b = balde[linhas]
+            tam = tamanhos[b]
+            ok = (tam >= 2) & (tam <= MAX_BALDE)
+            b, tam = b[ok], tam[ok]
+            total = int(tam.sum())
+            salto = np.repeat(inicio[b] - (np.cumsum(tam) - tam), tam) + np.arange(total)
+            origens.append(np.repeat(linhas[ok], tam))
+            destinos.append(membros[salto])
+        if not origens:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        chave = np.unique(np.concatenate(origens) * self.n + np.concatenate(destinos))
+        origem, destino = chave // self.n, chave % self.n
+        fora = (origem != destino) & ~self.vazias[destino]
+        return origem[fora], destino[fora]
+
+
+#Cossenos de uma linha contra os candidatos (pelas linhas deles no CSR, com o vetor da linha espalhado num vetor denso)
+def _cossenos_candidatos(matriz: MatrizTfIdf, linha: int, candidatos: np.ndarray, denso: np.ndarray) -> np.ndarray:
+    a, b = matriz.indptr[linha], matriz.indptr[linha + 1]
+    termos = np.asarray(matriz.indices[a:b], dtype=np.int64)
+    denso[termos] = matriz.data[a:b]
+    pos, dono = _entradas(matriz.indptr, candidatos)
+    dots = np.bincount(dono, weights=np.asarray(matriz.data[pos], dtype=np.float64) * denso[matriz.indices[pos]],
+                       minlength=len(candidatos)).astype(np.float64)
+    denso[termos] = 0.0
+    normas = np.asarray(matriz.normas, dtype=np.float64)
+    denom = normas[linha] * normas[candidatos]
+    return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+
+#Pra cada linha pedida: (linha, candidatos, cossenos), só com cosseno > 0 e sem o próprio documento
+def _pontuacoes(matriz: MatrizTfIdf, linhas: np.ndarray, lsh: Optional[_Lsh]) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    n = len(matriz)
+    if lsh is None:
+        bloco = max(1, CELULAS_BLOCO // max(n, 1))
+        for ini in range(0, len(linhas), bloco):
+            parte = linhas[ini:ini + bloco]
+            cossenos = _cossenos_bloco(matriz, parte)
+            cossenos[np.arange(len(parte)), parte] = 0.0
+            for linha, scores in zip(parte, cossenos):
+                cand = np.flatnonzero(scores > 0)
+                yield int(linha), cand, scores[cand]
+        return
+    denso = np.zeros(len(matriz.vocab))
+    for ini in range(0, len(linhas), LINHAS_LOTE_LSH):
+        origem, destino = lsh.candidatos(linhas[ini:ini + LINHAS_LOTE_LSH])
+        cortes = np.flatnonzero(np.diff(origem)) + 1
+        for o, cand in zip(origem[np.r_[0, cortes]] if len(origem) else (), np.split(destino, cortes)):
+            scores = _cossenos_candidatos(matriz, int(o), cand, denso)
+            ok = scores > 0
+            yield int(o), cand[ok], scores[ok]
+
+
+#Os n maiores (maior cosseno primeiro; empate fica com o menor DocId)
+def _melhores(ids: np.ndarray, scores: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(ids) > n:
+        parcial = np.argpartition(-scores, n - 1)[:n]
+        limite = scores[parcial].min()
+        maiores = np.flatnonzero(scores > limite)
+        empates = np.flatnonzero(scores == limite)
+        empates = empates[np.argsort(ids[empates], kind='stable')][:n - len(maiores)]
+        sel = np.concatenate([maiores, empates])
+        ids, scores = ids[sel], scores[sel]
+    ordem = np.lexsort((ids, -scores))
+    return ids[ordem], scores[ordem]
+
+
+def _preencher(ids_out: np.ndarray, scores_out: np.ndarray, i: int, ids: np.ndarray, scores: np.ndarray, n: int):
+    ids, scores = _melhores(ids, scores, n)
+    ids_out[i, :len(ids)] = ids
+    scores_out[i, :len(ids)] = scores
+
+
+#Aqui ele calcula os n vizinhos de todos os documentos da matriz. Devolve (ids, scores) alinhados com
+#matriz.doc_ids (que o TF_IDF.py grava em ordem crescente)
+def calcular_vizinhos(matriz: MatrizTfIdf, n: int = N_VIZINHOS, metodo: str = "auto") -> Tuple[np.ndarray, np.ndarray]:
+    total = len(matriz)
+    lsh = _Lsh(matriz) if resolver_metodo(metodo, total) == "lsh" else None
+    doc_ids = np.asarray(matriz.doc_ids, dtype=np.int64)
+    ids = np.full((total, n), -1, dtype=np.int64)
+    scores = np.zeros((total, n), dtype=np.float32)
+    for linha, cand, sc in _pontuacoes(matriz, np.arange(total), lsh):
+        _preencher(ids, scores, linha, doc_ids[cand], sc, n)
+    return ids, scores
+
+
+#Atualiza os vizinhos depois que alguns documentos mudaram (ou entraram/saíram), sem refazer o corpus inteiro:
+#  - os documentos mudados são recalculados por inteiro, e os cossenos deles com os outros (o cosseno é simétrico)
+#    entram nas listas dos que não mudaram;
+#  - quem tinha um vizinho mudado ou removido na lista também é recalculado (o próximo da fila pode estar fora dela);
+#  - o resto mantém a lista anterior mais os cossenos com os mudados.
+#Os pares entre documentos que não mudaram ficam com o idf da última vez que foram calculados (por isso, acima de
+#FRACAO_REFAZER mudados, o construcao.py refaz tudo). Devolve (ids, scores, documentos recalculados)
+def atualizar_vizinhos(matriz: MatrizTfIdf, anterior: "Vizinhos", mudados: Set[int], n: int = N_VIZINHOS,
+                       metodo: str = "auto") -> Tuple[np.ndarray, np.ndarray, int]:
+    total = len(matriz)
+    lsh = _Lsh(matriz) if resolver_metodo(metodo, total) == "lsh" else None
+    doc_ids = np.asarray(matriz.doc_ids, dtype=np.int64)
+    antigos = set(int(d) for d in anterior.doc_ids)
+    novos = set(int(d) for d in doc_ids)
+    invalidos = {int(d) for d in mudados} | (novos - antigos) | (antigos - novos)
+    invalidos_arr = np.fromiter(sorted(invalidos), dtype=np.int64, count=len(invalidos))
+    mudadas = np.flatnonzero(np.isin(doc_ids, invalidos_arr))
+
+    ids = np.full((total, n), -1, dtype=np.int64)
+    scores = np.zeros((total, n), dtype=np.float32)
+    # cossenos dos mudados com os outros, agrupados pela linha do outro documento
+    destinos, origens, valores = [], [], []
+    for linha, cand, sc in _pontuacoes(matriz, mudadas, lsh):
+        _preencher(ids, scores, linha, doc_ids[cand], sc, n)
+        destinos.append(cand)
+        origens.append(np.full(len(cand), doc_ids[linha], dtype=np.int64))
+        valores.append(sc)
+    if destinos:
+        destinos, origens, valores = np.concatenate(destinos), np.concatenate(origens), np.concatenate(valores)
+    else:
+        destinos = origens = np.zeros(0, dtype=np.int64)
+        valores = np.zeros(0)
+    ordem = np.argsort(destinos, kind='stable')
+    destinos, origens, valores = destinos[ordem], origens[ordem], valores[ordem]
+
+    refazer = []
+    for linha in np.flatnonzero(~np.isin(doc_ids, invalidos_arr)):
+        lista = anterior.linha(int(doc_ids[linha]))
+        if lista is None or np.isin(lista[0], invalidos_arr).any():
+            refazer.append(linha)
+            continue
+        a, b = np.searchsorted(destinos, linha), np.searchsorted(destinos, linha, side='right')
+        _preencher(ids, scores, linha, np.concatenate([lista[0], origens[a:b]]),
+                   np.concatenate([lista[1].astype(np.float64), valores[a:b]]), n)
+    for linha, cand, sc in _pontuacoes(matriz, np.asarray(refazer, dtype=np.int64), lsh):
+        _preencher(ids, scores, linha, doc_ids[cand], sc, n)
+    return ids, scores, len(mudadas) + len(refazer)
+
+
+#Vizinhos gravados, lidos por mmap: uma busca binária no doc_ids e a linha inteira sai de uma vez
+class Vizinhos:
+    def __init__(self, doc_ids: np.ndarray, ids: np.ndarray, scores: np.ndarray, info: Optional[Dict] = None):
+        self.doc_ids = doc_ids
+        self.ids = ids
+        self.scores = scores
+        self.info = info or {}
+        self.n = ids.shape[1] if ids.ndim == 2 else 0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    #(DocIds, cossenos) dos vizinhos do documento, ou None se ele não estava no corpus quando os vizinhos foram gravados
+    def linha(self, doc_id: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = int(np.searchsorted(self.doc_ids, doc_id))
+        if i >= len(self.doc_ids) or int(self.doc_ids[i]) != doc_id:
+            return None
+        ids = np.asarray(self.ids[i])
+        ok = ids >= 0
+        return ids[ok], np.asarray(self.scores[i])[ok]
+
+    def de(self, doc_id: int) -> Optional[List[Tuple[int, float]]]:
+        linha = self.linha(doc_id)
+        if linha is None:
+            return None
+        return [(int(d), float(s)) for d, s in zip(*linha)]
+
+
+def _salvar(path: Path, arr: np.ndarray):
+    tmp = path.with_name(path.stem + '.tmp.npy')
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+#Grava os vizinhos na pasta (cada .npy por um temporário + os.replace; o info.json vai por último e é ele que diz
+#quantos documentos os arrays têm, então quem lê no meio da gravação percebe a inconsistência)
+def gravar_vizinhos(pasta: Path, doc_ids: np.ndarray, ids: np.ndarray, scores: np.ndarray, metodo: str) -> List[Path]:
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    saidas = [pasta / 'doc_ids.npy', pasta / 'ids.npy', pasta / 'scores.npy']
+    for path, arr in zip(saidas, (np.asarray(doc_ids, dtype=np.int64), ids, scores)):
+        _salvar(path, arr)
+    info = {"versao": VERSAO_VIZINHOS, "n": int(ids.shape[1]), "metodo": metodo, "n_docs": int(len(doc_ids))}
+    tmp = pasta / 'info.json.tmp'
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(info, f)
+    os.replace(tmp, pasta / 'info.json')
+    return saidas + [pasta / 'info.json']
+
+
+def carregar_vizinhos(pasta: Path) -> Vizinhos:
+    pasta = Path(pasta)
+    with (pasta / 'info.json').open(encoding='utf-8') as f:
+        info = json.load(f)
+    if info.get('versao') != VERSAO_VIZINHOS:
+        raise ValueError(f"Versão dos vizinhos em {pasta} não suportada: {info.get('versao')}")
+    doc_ids = np.load(pasta / 'doc_ids.npy', mmap_mode='r')
+    ids = np.load(pasta / 'ids.npy', mmap_mode='r')
+    scores = np.load(pasta / 'scores.npy', mmap_mode='r')
+    n_docs = info.get('n_docs')
+    if len(doc_ids) != n_docs or ids.shape != (n_docs, info.get('n')) or scores.shape != ids.shape:
+        raise ValueError(f"Vizinhos em {pasta} inconsistentes (gravação em andamento?).")
+    return Vizinhos(doc_ids, ids, scores, info)
+
+
+#Vizinhos de um documento calculados na hora (documento que entrou por segmento incremental depois da gravação)
+def vizinhos_de_linha(matriz: MatrizTfIdf, linha: int, n: int = N_VIZINHOS) -> List[Tuple[int, float]]:
+    for _, cand, scores in _pontuacoes(matriz, np.asarray([linha], dtype=np.int64), None):
+        ids, scores = _melhores(np.asarray(matriz.doc_ids, dtype=np.int64)[cand], scores, n)
+        return [(int(d), float(s)) for d, s in zip(ids, scores)]
+    return []
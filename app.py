@@ -1,117 +1,94 @@
-from flask import Flask, render_template, request, flash
+from flask import Flask, render_template, request, flash, jsonify, url_for
+from markupsafe import Markup, escape
 import sys
 import os
-import json
-import subprocess
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, FrozenSet, Mapping, Optional, Tuple
 
 # Adiciona a pasta Lógica ao path (garante que os módulos sejam encontrados)
 sys.path.append(os.path.join(os.path.dirname(__file__), "Logica"))
 
-# Importa os módulos de busca (esses são funções nos seus arquivos)
-from Logica.busca_booleana import busca_booleana
-from Logica.busca_espaco_vetorial import busca_espaco_vetorial
+# Importa o gerenciador do índice (ele carrega os módulos de busca)
+from Logica.gerenciador_indice import GerenciadorIndice, Indice, Resultados, MODELOS, K1_PADRAO, B_PADRAO
+from Logica.cache_resultados import CAPACIDADE_PADRAO, TTL_PADRAO
+from Logica.paginacao import ler_pagina, top_k_para, TAMANHO_PAGINA_PADRAO, MAX_RANKING
+from Logica.trechos import Trecho, texto_do_trecho
+from Logica.dicionario_termos import MAX_COMPLETACOES
+from Logica.analise import dobrar_acentos
+from Logica.facetas import CAMPOS_FACETA, Filtros, normalizar_filtros
 
 app = Flask(__name__)
 app.secret_key = "troque_essa_chave_em_producao"
 
 
-# Helpers de caminho / execução
+# Helpers de caminho
 BASE_DIR = Path(__file__).parent.resolve()
 JSONS_DIR = BASE_DIR / "JSONs"
 
-def localizar_json(nome_arquivo: str) -> str:
-    caminho = JSONS_DIR / nome_arquivo
-    if caminho.exists():
-        return str(caminho)
-    # fallback procurado por segurança (subpastas relativas)
-    alt = BASE_DIR / nome_arquivo
-    if alt.exists():
-        return str(alt)
-    raise FileNotFoundError(f"{nome_arquivo} não encontrado em {JSONS_DIR} nem em {BASE_DIR}")
-
-def executar_script(nome_script: str):
-    """Executa um script python dentro da pasta Logica (sem importar)."""
-    path_script = BASE_DIR / "Logica" / nome_script
-    if not path_script.exists():
-        raise FileNotFoundError(f"Script {nome_script} não encontrado em {path_script}")
-    print(f"Executando {nome_script} ...")
-    subprocess.run([sys.executable, str(path_script)], check=True)
-    print(f"{nome_script} finalizado.")
-
-
-# Carregamento/Preparação dos JSONs
-
-# caminhos esperados
-PATH_DADOS_PREPARADOS = JSONS_DIR / "dadospreparados.json"
-PATH_DADOS_TOKENIZADOS = JSONS_DIR / "dados_tokenizados.json"
-PATH_TERMS = JSONS_DIR / "termos_significativos.json"
-PATH_METADADOS = JSONS_DIR / "metadados.json"
-
-# Executa preparacao/tokenizacao se necessário
-if not PATH_DADOS_PREPARADOS.exists():
-    try:
-        executar_script("preparacao.py")
-    except Exception as e:
-        print("Erro ao executar preparacao.py:", e)
-
-if not PATH_DADOS_TOKENIZADOS.exists():
-    try:
-        executar_script("tokenizacao.py")
-    except Exception as e:
-        print("Erro ao executar tokenizacao.py:", e)
-
-# Carrega arrays JSON
-def carregar_json(path: Path):
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
-
-try:
-    documentos_preparados = carregar_json(PATH_DADOS_PREPARADOS)
-except Exception as e:
-    documentos_preparados = []
-    print("Erro ao ler dadospreparados.json:", e)
-
-try:
-    metadados = carregar_json(PATH_METADADOS)
-except Exception as e:
-    metadados = []
-    print("Erro ao ler metadados.json:", e)
-
-# Mapas para acesso rápido
-META_MAP = {int(m.get("DocId")): m for m in metadados} if metadados else {}
-PREP_MAP = {int(d.get("DocId")): d for d in documentos_preparados} if documentos_preparados else {}
+# Nada é lido nem gerado no import: o gerenciador carrega o índice no primeiro uso, dentro do próprio processo.
+# O índice é gerado antes, fora do servidor (python Logica/construcao.py, que o start_flask.ps1 roda antes do Flask).
+# k1 e b do BM25 podem vir de BM25_K1 / BM25_B.
+# A cada SRI_INTERVALO_RECARGA segundos ele confere se um índice novo foi publicado (JSONs/publicado.json, trocado
+# pelo construcao.py só no fim do build) ou um segmento foi gravado (0 desliga).
+# Os resultados ficam num cache (SRI_CACHE_TAMANHO entradas, SRI_CACHE_TTL segundos; tamanho 0 desliga).
+# O /api/search/batch roda as consultas num pool de SRI_TRABALHADORES threads (padrão: conforme as CPUs).
+# Com SRI_SHARDS > 0 as buscas vão pros shards gravados em JSONs/shards (construcao.py --shards N --particao ...),
+# cada um buscado num processo próprio
+gerenciador = GerenciadorIndice(
+    JSONS_DIR,
+    stopwords=BASE_DIR / "stopwords.txt",
+    k1=float(os.environ.get("BM25_K1", K1_PADRAO)),
+    b=float(os.environ.get("BM25_B", B_PADRAO)),
+    intervalo_observacao=float(os.environ.get("SRI_INTERVALO_RECARGA", 5)),
+    cache_capacidade=int(os.environ.get("SRI_CACHE_TAMANHO", CAPACIDADE_PADRAO)),
+    cache_ttl=float(os.environ.get("SRI_CACHE_TTL", TTL_PADRAO)),
+    trabalhadores=int(os.environ.get("SRI_TRABALHADORES", 0)) or None,
+    shards=int(os.environ.get("SRI_SHARDS", 0)),
+)
+# Se definido, a rota /admin/recarregar exige o cabeçalho X-Admin-Token com esse valor; sem ele, a rota só aceita
+# pedidos da própria máquina (loopback)
+ADMIN_TOKEN = os.environ.get("SRI_ADMIN_TOKEN")
+ENDERECOS_LOCAIS = ("127.0.0.1", "::1")
+# Limites da API JSON: consultas por lote e resultados por consulta
+MAX_LOTE = int(os.environ.get("SRI_MAX_LOTE", 5000))
+TOP_K_API_PADRAO = 10
 
 
 # Utilitários para resultado
-def snippet_from_doc(doc_id: int, max_chars: int = 250) -> str:
-    """Tenta extrair um trecho do resumo (prioriza metadados, senão dados preparados)."""
-    meta = META_MAP.get(doc_id, {})
-    full = meta.get("Resumo") or meta.get("ResumoCompleto") or ""
-    if not full:
-        prep = PREP_MAP.get(doc_id, {})
-        full = prep.get("Resumo", "")
+def snippet_from_doc(indice: Indice, doc_id: int, max_chars: int = 250, termos: FrozenSet[str] = frozenset()) -> Trecho:
+    """Trecho do resumo onde mais aparecem os termos da consulta, com eles marcados (senão, o começo do resumo).
+
+    As posições das palavras vêm do índice (gravadas na indexação), então o resumo não é re-tokenizado aqui.
+    """
+    trecho = indice.trecho(doc_id, termos, max_chars)
+    if trecho:
+        return trecho
+    full = indice.prep(doc_id).get("Resumo", "")
     if not full:
-        return ""
+        return []
     if len(full) <= max_chars:
-        return full
+        return [(full, False)]
     # corta respeitando palavra
     cut = full[:max_chars].rsplit(" ", 1)[0]
-    return cut + " ..."
+    return [(cut + " ...", False)]
 
-def make_result_entry(doc_id: int, score: Optional[float] = None) -> Dict:
-    meta = META_MAP.get(doc_id, {})
+def trecho_html(trecho: Trecho) -> Markup:
+    return Markup("").join(Markup("<mark>%s</mark>") % t if destaque else escape(t) for t, destaque in trecho)
+
+def make_result_entry(indice: Indice, doc_id: int, score: Optional[float] = None,
+                      termos: FrozenSet[str] = frozenset()) -> Dict:
+    meta = indice.meta(doc_id)
     title = meta.get("Titulo") or meta.get("Título") or meta.get("Título") or meta.get("Título")  # tenta variações
     if not title:
         title = meta.get("Título") or meta.get("Titulo") or meta.get("title") or f"Doc {doc_id}"
     author = meta.get("Autor") or meta.get("author") or "Autor desconhecido"
-    snippet = snippet_from_doc(doc_id)
+    snippet = snippet_from_doc(indice, doc_id, termos=termos)
     entry = {
         "DocId": int(doc_id),
         "Título": title,
         "Autor": author,
-        "Resumo": snippet
+        "Resumo": texto_do_trecho(snippet),
+        "ResumoHtml": trecho_html(snippet),
     }
     # Sempre inclua a chave 'score' como float (0.0 quando ausente) e uma flag
     # 'has_score' para distinguir resultados que realmente vieram com score.
@@ -124,41 +101,131 @@ def make_result_entry(doc_id: int, score: Optional[float] = None) -> Dict:
     return entry
 
 
+#top_k que a página pede ao gerenciador: no booleano até o fim da página, nos ranqueados em blocos (páginas vizinhas,
+#da API ou do site, reaproveitam a mesma entrada do cache)
+def top_k_pagina(modelo: str, pagina: int, tamanho: int) -> int:
+    fim = pagina * tamanho
+    return fim if modelo == "booleano" else top_k_para(fim)
+
+
+#Busca (pelo cache) só o necessário pra página pedida: no booleano o bitset inteiro é barato e a página sai de um
+#iterador (com shards, cada shard manda só os DocIds até o fim da página); nos ranqueados pede os top_k até o fim da
+#página. Só os itens da página viram entradas com metadados
+def buscar_pagina(consulta: str, modelo: str, pagina: int, tamanho: int, filtros: Filtros = ()):
+    inicio = (pagina - 1) * tamanho
+    fim = inicio + tamanho
+    indice, resultado = gerenciador.buscar(consulta, modelo, top_k=top_k_pagina(modelo, pagina, tamanho), filtros=filtros)
+    pagina_itens = resultado.pagina(inicio, fim)
+    termos = indice.termos_consulta(consulta) if pagina_itens else frozenset()
+    entradas = [make_result_entry(indice, doc_id, score=score, termos=termos) for doc_id, score in pagina_itens]
+    return indice, resultado, entradas, resultado.tem_mais(fim)
+
+
+#Filtros de faceta dos parâmetros da URL/formulário (?autor=...&autor=...&filiacao=...), um valor por repetição
+def filtros_da_url(valores) -> List[Tuple[str, str]]:
+    return [(campo, v) for campo in CAMPOS_FACETA for v in valores.getlist(campo.lower()) if v.strip()]
+
+def filtros_de(ativos: List[Tuple[str, str]]) -> Filtros:
+    agrupados: Dict[str, List[str]] = {}
+    for campo, valor in ativos:
+        agrupados.setdefault(campo, []).append(valor)
+    return normalizar_filtros(agrupados)
+
+#Filtros num JSON: {"Autor": ["..."], "filiacao": "UFSC"}; campo desconhecido é ValueError
+def filtros_do_json(dados) -> Filtros:
+    if not dados:
+        return ()
+    if not isinstance(dados, Mapping):
+        raise ValueError("filtros deve ser um objeto {campo: valores}")
+    campos = {c.lower(): c for c in CAMPOS_FACETA}
+    return normalizar_filtros({campos.get(str(k).lower(), k): v for k, v in dados.items()})
+
+@app.template_global()
+def url_resultados(consulta: str, modelo: str, page_size: int, ativos: List[Tuple[str, str]], page: int = 1,
+                   adicionar: Optional[Tuple[str, str]] = None, remover: Optional[Tuple[str, str]] = None) -> str:
+    # link da página de resultados mantendo os filtros ativos (e somando ou tirando um)
+    ativos = [tuple(a) for a in ativos if tuple(a) != (tuple(remover) if remover else None)]
+    if adicionar and tuple(adicionar) not in ativos:
+        ativos.append(tuple(adicionar))
+    params: Dict[str, List[str]] = {}
+    for campo, valor in ativos:
+        params.setdefault(campo.lower(), []).append(valor)
+    return url_for("resultados", consulta=consulta, modelo=modelo, page=page, page_size=page_size, **params)
+
+def ler_top_k(valor) -> int:
+    try:
+        return min(max(int(valor), 1), MAX_RANKING)
+    except (TypeError, ValueError):
+        return TOP_K_API_PADRAO
+
+def ler_flag(valor) -> bool:
+    if isinstance(valor, str):
+        return valor.strip().lower() in ("1", "true", "sim", "yes")
+    return bool(valor)
+
+#Uma consulta da API, lida do mesmo jeito na busca única e em cada item do lote: o texto em "consulta" ou "q", o
+#"modelo" e a página, por "page"/"page_size" ou só por "top_k" (a primeira página com top_k resultados). O que o
+#item não traz vem de padrao (no lote, os campos de fora). Devolve (consulta, modelo, página, tamanho)
+def ler_pedido(item: Mapping, padrao: Mapping = {}) -> Tuple[str, str, int, int]:
+    consulta = str(item.get("consulta") or item.get("q") or "").strip()
+    modelo = item.get("modelo", padrao.get("modelo", "booleano"))
+    modelo = modelo if modelo in MODELOS else "vetorial"
+    for origem in (item, padrao):
+        if "page" in origem or "page_size" in origem:
+            pagina, tamanho = ler_pagina(origem.get("page", 1), origem.get("page_size", TAMANHO_PAGINA_PADRAO))
+            return consulta, modelo, pagina, tamanho
+        if "top_k" in origem:
+            return consulta, modelo, 1, ler_top_k(origem["top_k"])
+    return consulta, modelo, 1, TOP_K_API_PADRAO
+
+#Resposta de uma consulta na API JSON: DocId e score da página pedida (no booleano, em ordem de DocId e sem score);
+#com metadados, cada item vira a mesma entrada da página de resultados (título, autor, trecho)
+def resposta_consulta(indice: Indice, consulta: str, modelo: str, resultado: Resultados, pagina: int, tamanho: int,
+                      metadados: bool = False, facetas: Optional[Dict] = None) -> Dict:
+    inicio = (pagina - 1) * tamanho
+    itens = resultado.pagina(inicio, inicio + tamanho)
+    if metadados:
+        termos = indice.termos_consulta(consulta) if itens else frozenset()
+        lista = [make_result_entry(indice, doc_id, score=score, termos=termos) for doc_id, score in itens]
+    else:
+        lista = [{"DocId": int(doc_id), "score": score} for doc_id, score in itens]
+    resposta = {
+        "consulta": consulta,
+        "modelo": modelo,
+        "page": pagina,
+        "page_size": tamanho,
+        "total": resultado.total,
+        "tem_mais": resultado.tem_mais(inicio + tamanho),
+        "resultados": lista,
+    }
+    if facetas is not None:
+        resposta["facetas"] = facetas
+    return resposta
+
+
 # Rotas Flask
 @app.route("/")
 def home():
     return render_template("index.html")
 
-@app.route("/resultados", methods=["POST"])
+@app.route("/resultados", methods=["GET", "POST"])
 def resultados():
-    consulta = request.form.get("consulta", "").strip()
-    modelo = request.form.get("modelo", "booleano")
+    # GET também, pros links de página (page começa em 1)
+    consulta = request.values.get("consulta", "").strip()
+    modelo = request.values.get("modelo", "booleano")
+    pagina, tamanho = ler_pagina(request.values.get("page", 1), request.values.get("page_size", TAMANHO_PAGINA_PADRAO))
+    # filtros de faceta: ?autor=...&filiacao=...&arquivo=... (repetir o parâmetro = qualquer um dos valores)
+    ativos = filtros_da_url(request.values)
 
     if not consulta:
         flash("Por favor, digite uma consulta.")
         return render_template("index.html")
 
-    resultados_list = []
-
     try:
-        if modelo == "booleano":
-            # busca_booleana espera uma string query e path (ou dict)
-            path_tokens = localizar_json("dados_tokenizados.json")
-            bool_map = busca_booleana(consulta, path_tokens)  # retorna dict {docid: bool}
-            matched_ids = [doc_id for doc_id, ok in bool_map.items() if ok]
-            # monta lista com metadados e snippets
-            resultados_list = [make_result_entry(doc_id) for doc_id in matched_ids]
-        else:
-            # busca vetorial espera query string e termos_path (caminho para termos_significativos.json)
-            termos_path = localizar_json("termos_significativos.json")
-            vet_results = busca_espaco_vetorial(consulta, termos_path, metadados_path=localizar_json("metadados.json"), top_k=50)
-            # vet_results é lista de {DocId, score, Título?}
-            resultados_list = []
-            for r in vet_results:
-                doc_id = int(r.get("DocId"))
-                score = r.get("score", 0.0)
-                entry = make_result_entry(doc_id, score=score)
-                resultados_list.append(entry)
+        # o resultado vem do cache quando a mesma consulta já rodou nessa geração do índice
+        filtros = filtros_de(ativos)
+        indice, resultado, resultados_list, tem_proxima = buscar_pagina(consulta, modelo, pagina, tamanho, filtros)
+        facetas = gerenciador.facetas(consulta, modelo, filtros)
     except FileNotFoundError as fe:
         flash(str(fe))
         return render_template("index.html")
@@ -168,16 +235,104 @@ def resultados():
         flash("Ocorreu um erro ao processar a busca. Verifique os logs.")
         return render_template("index.html")
 
-    # Ordena resultados por score se presente (desc), senão mantém ordem
-    resultados_list.sort(key=lambda x: x.get("score", 0.0), reverse=True)
+    # os ranqueados já vêm em ordem de score e o booleano em ordem de DocId
+    # nada encontrado (ou só score zero): sugere a consulta com os termos desconhecidos corrigidos
+    sugestao = None
+    if resultado.vazio():
+        sugestao = indice.corretor.sugerir_consulta(consulta)
+
+    return render_template("resultados.html", resultados=resultados_list, consulta=consulta, modelo=modelo,
+                           sugestao=sugestao, pagina=pagina, page_size=tamanho, total=resultado.total,
+                           tem_proxima=tem_proxima, facetas=facetas, ativos=ativos)
+
+@app.route("/api/resultados")
+def api_resultados():
+    # apelido do /api/search (mesmos parâmetros e mesma resposta), com metadados e facetas ligados por padrão, como
+    # na página de resultados
+    return api_search(com_pagina=True)
+
+@app.route("/api/search", methods=["GET", "POST"])
+def api_search(com_pagina: bool = False):
+    # uma consulta: ?consulta=... (ou q=...)&modelo=...&page=1&page_size=10 (ou top_k=10)&metadados=1&facetas=1
+    # &autor=... (ou o mesmo num JSON, com os filtros em "filtros": {"Autor": [...], "Filiacao": [...]})
+    dados = request.get_json(silent=True) if request.is_json else None
+    try:
+        if isinstance(dados, dict):
+            filtros = filtros_do_json(dados.get("filtros"))
+        else:
+            dados = request.values
+            filtros = filtros_de(filtros_da_url(dados))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    consulta, modelo, pagina, tamanho = ler_pedido(dados)
+    if not consulta:
+        return jsonify({"erro": "parâmetro consulta vazio"}), 400
+    metadados = ler_flag(dados.get("metadados", com_pagina))
+    com_facetas = ler_flag(dados.get("facetas", com_pagina))
+    try:
+        indice, resultado = gerenciador.buscar(consulta, modelo, top_k=top_k_pagina(modelo, pagina, tamanho),
+                                               filtros=filtros)
+        facetas = gerenciador.facetas(consulta, modelo, filtros) if com_facetas else None
+        resposta = resposta_consulta(indice, consulta, modelo, resultado, pagina, tamanho, metadados, facetas)
+    except Exception as e:
+        print("Erro ao executar busca:", e)
+        return jsonify({"erro": "falha ao processar a busca"}), 500
+    resposta["geracao"] = indice.geracao
+    return jsonify(resposta)
+
+@app.route("/api/search/batch", methods=["POST"])
+def api_search_batch():
+    # várias consultas num POST JSON, cada uma com as mesmas chaves do /api/search:
+    #   {"consultas": ["a AND b", {"q": "...", "modelo": "bm25", "top_k": 5, "filtros": {"Filiacao": "UFSC"}},
+    #                  {"consulta": "...", "page": 2, "page_size": 20}],
+    #    "modelo": "vetorial", "top_k": 10, "filtros": {...}, "metadados": false, "facetas": false}
+    # modelo/página/filtros de fora valem pras consultas que não trazem os seus; a resposta segue a ordem das consultas
+    dados = request.get_json(silent=True)
+    if not isinstance(dados, dict) or not isinstance(dados.get("consultas"), list):
+        return jsonify({"erro": "esperado um JSON com a lista 'consultas'"}), 400
+    if len(dados["consultas"]) > MAX_LOTE:
+        return jsonify({"erro": f"no máximo {MAX_LOTE} consultas por lote"}), 413
+    metadados = ler_flag(dados.get("metadados"))
+    com_facetas = ler_flag(dados.get("facetas"))
 
-    return render_template("resultados.html", resultados=resultados_list, consulta=consulta, modelo=modelo)
+    pedidos = []
+    try:
+        filtros_padrao = filtros_do_json(dados.get("filtros"))
+        for i, item in enumerate(dados["consultas"]):
+            if isinstance(item, str):
+                item = {"consulta": item}
+            if not isinstance(item, dict):
+                return jsonify({"erro": f"consulta {i} vazia ou inválida"}), 400
+            consulta, modelo, pagina, tamanho = ler_pedido(item, dados)
+            if not consulta:
+                return jsonify({"erro": f"consulta {i} vazia ou inválida"}), 400
+            filtros = filtros_do_json(item["filtros"]) if "filtros" in item else filtros_padrao
+            pedidos.append((consulta, modelo, pagina, tamanho, filtros))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+
+    try:
+        indice, resultados = gerenciador.buscar_lote(
+            [(c, m, top_k_pagina(m, p, t), f) for c, m, p, t, f in pedidos])
+        respostas = [
+            resposta_consulta(indice, c, m, r, p, t, metadados, gerenciador.facetas(c, m, f) if com_facetas else None)
+            for (c, m, p, t, f), r in zip(pedidos, resultados)
+        ]
+    except Exception as e:
+        print("Erro ao executar lote de buscas:", e)
+        return jsonify({"erro": "falha ao processar o lote"}), 500
+    return jsonify({"geracao": indice.geracao, "total_consultas": len(respostas), "resultados": respostas})
 
 @app.route("/detalhes/<int:doc_id>")
 def detalhes(doc_id: int):
     # procura informação completa nos metadados (preferencial) e em dados preparados
-    meta = META_MAP.get(doc_id, {})
-    prep = PREP_MAP.get(doc_id, {})
+    try:
+        indice = gerenciador.obter()
+    except Exception as e:
+        print("Erro ao carregar índice:", e)
+        return render_template("detalhes.html", doc=None)
+    meta = indice.meta(doc_id)
+    prep = indice.prep(doc_id)
     if not meta and not prep:
         return render_template("detalhes.html", doc=None)
     # monta objeto de exibição
@@ -189,13 +344,72 @@ def detalhes(doc_id: int):
     doc['Resumo'] = meta.get("Resumo") or prep.get("Resumo") or ""
     if meta.get("TermosSignificativos"):
         doc['TermosSignificativos'] = meta.get("TermosSignificativos")
+    # artigos parecidos: os vizinhos pelo cosseno TF-IDF já vêm calculados do construcao.py
+    doc['Relacionados'] = []
+    for rel_id, score in indice.relacionados(doc_id):
+        rel = indice.meta(rel_id)
+        if rel:
+            doc['Relacionados'].append({
+                "DocId": rel_id,
+                "Título": rel.get("Titulo") or rel.get("Título") or f"Doc {rel_id}",
+                "Autor": rel.get("Autor") or "",
+                "score": score,
+            })
     # score, se existir (por exemplo vindo de busca vetorial)
     # (não guardamos score globalmente; ele vem apenas junto com resultados)
     return render_template("detalhes.html", doc=doc)
 
+@app.route("/autocomplete")
+def autocomplete():
+    # completa a última palavra digitada com os termos do vocabulário que mais aparecem (maior df), mostrados na forma
+    # escrita nos documentos ("estádios", não o radical "estadio")
+    q = request.args.get("q", "")
+    palavras = q.split()
+    prefixo = dobrar_acentos(palavras[-1].lower()) if palavras and not q[-1:].isspace() else ""
+    try:
+        n = min(max(int(request.args.get("n", MAX_COMPLETACOES)), 1), MAX_COMPLETACOES)
+    except ValueError:
+        n = MAX_COMPLETACOES
+    inicio = q[:len(q) - len(palavras[-1])] if prefixo else q
+    try:
+        indice = gerenciador.obter()
+        completacoes = indice.dicionario.completar(prefixo, n)
+        corretor = indice.corretor
+    except Exception as e:
+        # índice ainda não carregado (ou com erro): sem sugestões, o campo de busca continua funcionando
+        print("Erro ao carregar índice:", e)
+        return jsonify({"prefixo": prefixo, "sugestoes": []})
+    sugestoes = []
+    for termo, df in completacoes:
+        forma = corretor.forma(termo)
+        sugestoes.append({"termo": forma, "df": df, "consulta": inicio + forma})
+    return jsonify({"prefixo": prefixo, "sugestoes": sugestoes})
+
+@app.route("/admin/recarregar", methods=["POST"])
+def admin_recarregar():
+    if ADMIN_TOKEN:
+        autorizado = request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+    else:
+        autorizado = request.remote_addr in ENDERECOS_LOCAIS
+    if not autorizado:
+        return jsonify({"erro": "não autorizado"}), 403
+    # a geração nova é montada em segundo plano; as buscas continuam na atual até a troca
+    if request.args.get("esperar"):
+        gerenciador.recarregar()
+    else:
+        gerenciador.recarregar_em_segundo_plano()
+    return jsonify(gerenciador.estado()), 202
+
+@app.route("/health")
+def health():
+    # 200 quando o índice já está carregado, 503 enquanto ainda não (ou se a carga falhou). Uma geração que ficou
+    # pra trás do metadados.json/stopwords continua servindo (200), com o motivo em "desatualizado"
+    estado = gerenciador.estado()
+    return jsonify(estado), (200 if estado["pronto"] else 503)
+
 
 # Run
 if __name__ == "__main__":
-    print(f"{len(documentos_preparados)} documentos preparados carregados.")
+    gerenciador.carregar_em_segundo_plano()
     app.run(debug=True)
 
@@ -0,0 +1,272 @@
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+sys.path.append(str(RAIZ / "Logica"))
+
+from Logica.construcao import construir
+from Logica.gerenciador_indice import Indice, MODELOS
+from benchmarks.corpus_sintetico import gerar_corpus, VOCABULARIO_PADRAO, TAMANHO_MEDIO_PADRAO
+
+# Faixas de seletividade (fração dos documentos que contém o termo) usadas pra sortear os termos das consultas
+FAIXAS = {
+    "alta": (0.05, 1.01),
+    "media": (0.005, 0.05),
+    "baixa": (0.0, 0.005),
+}
+# Formatos de consulta por modelo; {a}..{d} são termos da mesma faixa
+FORMATOS = {
+    "booleano": {"1 termo": "{a}", "AND": "{a} AND {b}", "OR": "{a} OR {b}", "AND NOT": "{a} AND NOT {b}"},
+    "vetorial": {"1 termo": "{a}", "2 termos": "{a} {b}", "4 termos": "{a} {b} {c} {d}"},
+    "bm25": {"1 termo": "{a}", "2 termos": "{a} {b}", "4 termos": "{a} {b} {c} {d}"},
+    "lsa": {"1 termo": "{a}", "2 termos": "{a} {b}", "4 termos": "{a} {b} {c} {d}"},
+    "hibrido": {"1 termo": "{a}", "AND": "{a} AND {b}", "OR": "{a} OR {b}", "AND NOT": "{a} AND NOT {b}"},
+}
+TOP_K = 10
+CONSULTAS_POR_FORMATO = 50
+REPETICOES = 3
+DIR_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+#Percentil pelo posto mais próximo (sem interpolação), em ms
+def _percentil(ordenados: List[float], p: float) -> float:
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def estatisticas(latencias_ms: List[float]) -> Dict:
+    ordenados = sorted(latencias_ms)
+    return {
+        "n": len(ordenados),
+        "media_ms": sum(ordenados) / len(ordenados),
+        "p50_ms": _percentil(ordenados, 50),
+        "p95_ms": _percentil(ordenados, 95),
+        "p99_ms": _percentil(ordenados, 99),
+        "max_ms": ordenados[-1],
+    }
+
+
+def _tamanho(path: Path) -> int:
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size if path.exists() else 0
+
+
+def tamanho_indice(jsons_dir: Path) -> Dict[str, int]:
+    nomes = ("metadados.json", "dadospreparados.json", "dados_tokenizados.json", "termos_significativos.json",
+             "indice.bin", "indice_tfidf")
+    tamanhos = {nome: _tamanho(jsons_dir / nome) for nome in nomes}
+    tamanhos["total"] = sum(tamanhos.values())
+    return tamanhos
+
+
+#Sorteia termos do vocabulário por faixa de df, pra montar consultas de seletividade conhecida
+def termos_por_faixa(indice: Indice, rng: np.random.Generator, quantidade: int) -> Dict[str, List[str]]:
+    dic = indice.dicionario
+    n = max(len(indice), 1)
+    out = {}
+    for faixa, (lo, hi) in FAIXAS.items():
+        candidatos = [t for t, df in zip(dic.termos, dic.dfs) if lo <= df / n < hi and t.isalpha()]
+        if candidatos:
+            out[faixa] = [candidatos[i] for i in rng.integers(len(candidatos), size=quantidade)]
+    return out
+
+
+def _consultas(formato: str, termos: List[str], rng: np.random.Generator, quantidade: int) -> List[str]:
+    out = []
+    for _ in range(quantidade):
+        a, b, c, d = (termos[i] for i in rng.integers(len(termos), size=4))
+        out.append(formato.format(a=a, b=b, c=c, d=d))
+    return out
+
+
+#Primeira consulta de cada modelo num índice recém-aberto: inclui montar as estruturas preguiçosas que ele usa
+def medir_cold_start(jsons_dir: Path, stopwords: Path, consulta: str) -> Dict[str, float]:
+    out = {}
+    inicio = time.perf_counter()
+    Indice(jsons_dir, stopwords=stopwords)
+    out["abrir_ms"] = (time.perf_counter() - inicio) * 1000.0
+    for modelo in MODELOS:
+        inicio = time.perf_counter()
+        indice = Indice(jsons_dir, stopwords=stopwords)
+        indice.buscar(modelo, consulta, top_k=None if modelo == "booleano" else TOP_K).pagina(0, TOP_K)
+        out[modelo + "_ms"] = (time.perf_counter() - inicio) * 1000.0
+    return out
+
+
+#Latência (sem o cache de resultados) de cada formato de consulta, por modelo e faixa de seletividade
+def medir_consultas(indice: Indice, rng: np.random.Generator, quantidade: int, repeticoes: int) -> Dict:
+    termos = termos_por_faixa(indice, rng, max(quantidade, 4))
+    out: Dict = {}
+    for modelo, formatos in FORMATOS.items():
+        top_k = None if modelo == "booleano" else TOP_K
+        for faixa, lista in termos.items():
+            for nome, formato in formatos.items():
+                consultas = _consultas(formato, lista, rng, quantidade)
+                latencias = []
+                resultados = 0
+                for _ in range(repeticoes):
+                    for consulta in consultas:
+                        inicio = time.perf_counter()
+                        resultado = indice.buscar(modelo, consulta, top_k=top_k)
+                        resultado.pagina(0, TOP_K)
+                        latencias.append((time.perf_counter() - inicio) * 1000.0)
+                        resultados += resultado.total if resultado.total is not None else len(resultado)
+                stats = estatisticas(latencias)
+                stats["resultados_medios"] = resultados / len(latencias)
+                out.setdefault(modelo, {}).setdefault(faixa, {})[nome] = stats
+    return out
+
+
+#Um tamanho de corpus: gera, indexa (todas as etapas, com o indice.bin), mede tamanho, cold start e consultas.
+#Com shards > 0 as consultas passam pelo coordenador dos shards (o cold start continua medido sem shards)
+def executar(n_docs: int, pasta: Path, semente: int = 42, vocabulario: int = VOCABULARIO_PADRAO,
+             tamanho_medio: int = TAMANHO_MEDIO_PADRAO, quantidade: int = CONSULTAS_POR_FORMATO,
+             repeticoes: int = REPETICOES, shards: int = 0) -> Dict:
+    jsons_dir = pasta / "JSONs"
+    stopwords = pasta / "stopwords.txt"
+    shutil.copy(RAIZ / "stopwords.txt", stopwords)
+    inicio = time.perf_counter()
+    gerar_corpus(jsons_dir, n_docs, vocabulario, tamanho_medio, semente, stopwords=stopwords)
+    geracao_s = time.perf_counter() - inicio
+
+    tempos: Dict[str, float] = {}
+    inicio = time.perf_counter()
+    construir(jsons_dir, stopwords, forcar=True, binario=True, tempos=tempos, shards=shards)
+    indexacao_s = time.perf_counter() - inicio
+
+    rng = np.random.default_rng(semente)
+    indice = Indice(jsons_dir, stopwords=stopwords, shards=shards)
+    for modelo in MODELOS:
+        indice.buscar(modelo, "futebol")
+    media = termos_por_faixa(indice, rng, 1).get("media", ["futebol"])[0]
+    try:
+        consultas = medir_consultas(indice, rng, quantidade, repeticoes)
+    finally:
+        indice.fechar()
+    return {
+        "documentos": n_docs,
+        "shards": shards,
+        "termos": len(indice.dicionario),
+        "geracao_corpus_s": geracao_s,
+        "indexacao": {
+            "total_s": indexacao_s,
+            "docs_por_s": n_docs / indexacao_s if indexacao_s else None,
+            "etapas_s": tempos,
+        },
+        "tamanho_bytes": tamanho_indice(jsons_dir),
+        "cold_start": medir_cold_start(jsons_dir, stopwords, media),
+        "consultas": consultas,
+    }
+
+
+def _achatar(resultado: Dict) -> Dict[str, float]:
+    out = {"indexacao.docs_por_s": resultado["indexacao"]["docs_por_s"],
+           "tamanho.total": resultado["tamanho_bytes"]["total"]}
+    for chave, valor in resultado["cold_start"].items():
+        out[f"cold_start.{chave}"] = valor
+    for modelo, faixas in resultado["consultas"].items():
+        for faixa, formatos in faixas.items():
+            for nome, stats in formatos.items():
+                for p in ("p50_ms", "p95_ms", "p99_ms"):
+                    out[f"{modelo}.{faixa}.{nome}.{p}"] = stats[p]
+    return out
+
+
+#Compara dois arquivos de resultado (por exemplo de dois commits), tamanho a tamanho de corpus
+def comparar(base: Dict, atual: Dict) -> List[str]:
+    linhas = []
+    base_por_n = {r["documentos"]: r for r in base["resultados"]}
+    for r in atual["resultados"]:
+        anterior = base_por_n.get(r["documentos"])
+        if anterior is None:
+            continue
+        linhas.append(f"== {r['documentos']} documentos ({base.get('commit')} -> {atual.get('commit')})")
+        a, b = _achatar(anterior), _achatar(r)
+        for chave in sorted(set(a) & set(b)):
+            if a[chave]:
+                variacao = (b[chave] - a[chave]) / a[chave] * 100.0
+                linhas.append(f"{chave:45s} {a[chave]:12.3f} {b[chave]:12.3f} {variacao:+8.1f}%")
+    return linhas
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark de indexação e busca sobre corpora sintéticos.')
+    parser.add_argument('--docs', '-n', default='1000,10000',
+                        help='Tamanhos de corpus separados por vírgula (padrão 1000,10000).')
+    parser.add_argument('--vocabulario', '-v', type=int, default=VOCABULARIO_PADRAO)
+    parser.add_argument('--tamanho', '-t', type=int, default=TAMANHO_MEDIO_PADRAO, help='Palavras por resumo, em média.')
+    parser.add_argument('--consultas', '-q', type=int, default=CONSULTAS_POR_FORMATO,
+                        help='Consultas por formato, modelo e faixa (padrão 50).')
+    parser.add_argument('--repeticoes', '-r', type=int, default=REPETICOES)
+    parser.add_argument('--semente', '-s', type=int, default=42)
+    parser.add_argument('--shards', type=int, default=0,
+                        help='Mede as consultas com o índice dividido em N shards, um processo por shard (padrão 0).')
+    parser.add_argument('--pasta', help='Onde gerar os corpora (padrão: pasta temporária, apagada no final).')
+    parser.add_argument('--saida', '-o', help='JSON de resultado (padrão: benchmarks/resultados/<commit>.json).')
+    parser.add_argument('--comparar', '-c', help='JSON de uma execução anterior pra comparar.')
+    args = parser.parse_args(argv)
+
+    tamanhos = [int(n) for n in args.docs.split(',') if n.strip()]
+    raiz_tmp = Path(args.pasta) if args.pasta else Path(tempfile.mkdtemp(prefix='sri_bench_'))
+    commit = _commit()
+    relatorio = {
+        "commit": commit,
+        "data": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": {"vocabulario": args.vocabulario, "tamanho_medio": args.tamanho, "consultas": args.consultas,
+                       "repeticoes": args.repeticoes, "semente": args.semente, "top_k": TOP_K,
+                       "shards": args.shards},
+        "resultados": [],
+    }
+    try:
+        for n in tamanhos:
+            print(f"Corpus com {n} documentos ...")
+            pasta = raiz_tmp / f"corpus_{n}"
+            pasta.mkdir(parents=True, exist_ok=True)
+            relatorio["resultados"].append(executar(n, pasta, args.semente, args.vocabulario, args.tamanho,
+                                                    args.consultas, args.repeticoes, args.shards))
+    finally:
+        if not args.pasta:
+            shutil.rmtree(raiz_tmp, ignore_errors=True)
+
+    saida = Path(args.saida) if args.saida else DIR_RESULTADOS / f"{commit or 'local'}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    with saida.open('w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em: {saida}")
+    for r in relatorio["resultados"]:
+        print(f"{r['documentos']} docs: indexação {r['indexacao']['docs_por_s']:.0f} docs/s, "
+              f"índice {r['tamanho_bytes']['total'] / 1e6:.1f} MB")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        print("\n".join(comparar(base, relatorio)))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main(sys.argv[1:]))
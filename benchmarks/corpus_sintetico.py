@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+# Gerador de corpus sintético "parecido com português": palavras montadas de sílabas e terminações comuns, com
+# frequência seguindo a lei de Zipf (a palavra de posição k aparece proporcional a 1/k^s). As stopwords reais
+# ocupam as primeiras posições, como num texto de verdade. Grava um metadados.json no formato do corpus real
+SILABAS_INICIO = ("ca", "co", "pa", "pe", "ma", "mo", "ta", "te", "ra", "re", "de", "di", "fu", "jo", "ga", "go",
+                  "li", "lu", "ne", "no", "sa", "se", "vi", "vo", "bra", "cla", "tra", "pro", "gru", "es", "in", "com")
+SILABAS_MEIO = ("ta", "te", "ti", "to", "ra", "re", "ri", "ro", "la", "le", "li", "na", "ne", "ni", "do", "da",
+                "ça", "ci", "ce", "ma", "mi", "me", "ga", "gi", "pa", "po", "sa", "si", "vo", "ve", "bi", "cu")
+TERMINACOES = ("ção", "ções", "mente", "ado", "ada", "ados", "eiro", "eira", "ista", "dade", "al", "ais", "ar",
+               "er", "ir", "ou", "ava", "ia", "ico", "ica", "oso", "ente", "ância", "or", "ores", "o", "a", "os", "as")
+NOMES = ("Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabel", "João", "Karina",
+         "Leonardo", "Marina", "Nelson", "Otávio", "Paula", "Renato", "Sandra", "Tiago", "Vanessa")
+SOBRENOMES = ("Silva", "Santos", "Oliveira", "Souza", "Pereira", "Costa", "Rodrigues", "Almeida", "Nascimento",
+              "Lima", "Araújo", "Fernandes", "Carvalho", "Gomes", "Martins", "Rocha", "Ribeiro", "Alves")
+FILIACOES = ("UFSC", "USP", "UFMG", "UFRJ", "UNICAMP", "UFRGS", "UnB", "UFPR", "UFBA", "UFPE")
+VOCABULARIO_PADRAO = 50000
+TAMANHO_MEDIO_PADRAO = 150
+EXPOENTE_ZIPF = 1.07
+LOTE = 1000
+
+
+#Aqui ele monta o vocabulário: stopwords primeiro e depois palavras inventadas, todas diferentes
+def gerar_vocabulario(n: int, rng: np.random.Generator, stopwords: List[str] = ()) -> List[str]:
+    palavras = list(dict.fromkeys(stopwords))
+    vistas = set(palavras)
+    while len(palavras) < n:
+        partes = [SILABAS_INICIO[rng.integers(len(SILABAS_INICIO))]]
+        partes += [SILABAS_MEIO[i] for i in rng.integers(len(SILABAS_MEIO), size=rng.integers(0, 3))]
+        partes.append(TERMINACOES[rng.integers(len(TERMINACOES))])
+        palavra = "".join(partes)
+        if palavra not in vistas:
+            vistas.add(palavra)
+            palavras.append(palavra)
+    return palavras[:n]
+
+
+def probabilidades_zipf(n: int, s: float = EXPOENTE_ZIPF) -> np.ndarray:
+    p = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** s
+    return p / p.sum()
+
+
+def _autores(rng: np.random.Generator) -> str:
+    n = int(rng.integers(1, 4))
+    return ", ".join(f"{NOMES[rng.integers(len(NOMES))]} {SOBRENOMES[rng.integers(len(SOBRENOMES))]}" for _ in range(n))
+
+
+#Gera n_docs documentos e grava o metadados.json em jsons_dir, um documento por linha (em lotes, sem montar o
+#corpus inteiro na memória). Os tamanhos dos resumos seguem uma distribuição de Poisson em torno do tamanho médio
+def gerar_corpus(jsons_dir: Path, n_docs: int, vocabulario: int = VOCABULARIO_PADRAO,
+                 tamanho_medio: int = TAMANHO_MEDIO_PADRAO, semente: int = 42, expoente: float = EXPOENTE_ZIPF,
+                 stopwords: Optional[Path] = None) -> Path:
+    rng = np.random.default_rng(semente)
+    stops = []
+    if stopwords is not None and Path(stopwords).exists():
+        stops = [linha.strip() for linha in Path(stopwords).open(encoding="utf-8") if linha.strip()]
+    palavras = np.asarray(gerar_vocabulario(vocabulario, rng, stops[:200]), dtype=object)
+    acumulada = np.cumsum(probabilidades_zipf(len(palavras), expoente))
+    jsons_dir = Path(jsons_dir)
+    jsons_dir.mkdir(parents=True, exist_ok=True)
+    out = jsons_dir / "metadados.json"
+    tmp = out.with_name(out.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write("[")
+        for inicio in range(0, n_docs, LOTE):
+            fim = min(inicio + LOTE, n_docs)
+            tamanhos = np.maximum(rng.poisson(tamanho_medio, size=fim - inicio), 5)
+            # amostragem pela inversa da acumulada: um searchsorted pro lote inteiro
+            sorteio = np.searchsorted(acumulada, rng.random(int(tamanhos.sum())), side="right")
+            sorteio = np.minimum(sorteio, len(palavras) - 1)
+            pos = 0
+            for i, tamanho in enumerate(tamanhos):
+                doc_id = inicio + i + 1
+                resumo = palavras[sorteio[pos:pos + tamanho]]
+                pos += tamanho
+                titulo = " ".join(palavras[np.minimum(np.searchsorted(acumulada, rng.random(6)), len(palavras) - 1)])
+                doc = {
+                    "DocId": doc_id,
+                    "Titulo": titulo.capitalize(),
+                    "Autor": _autores(rng),
+                    "Filiacao": FILIACOES[rng.integers(len(FILIACOES))],
+                    "Arquivo": f"doc{doc_id}.pdf",
+                    "Resumo": " ".join(resumo).capitalize() + ".",
+                }
+                f.write("\n" if doc_id == 1 else ",\n")
+                f.write(json.dumps(doc, ensure_ascii=False))
+        f.write("\n]\n")
+    os.replace(tmp, out)
+    return out
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description='Gerar um corpus sintético (metadados.json) com distribuição de Zipf.')
+    parser.add_argument('saida', help='Pasta JSONs de saída.')
+    parser.add_argument('--docs', '-n', type=int, default=1000, help='Número de documentos (padrão 1000).')
+    parser.add_argument('--vocabulario', '-v', type=int, default=VOCABULARIO_PADRAO, help='Tamanho do vocabulário.')
+    parser.add_argument('--tamanho', '-t', type=int, default=TAMANHO_MEDIO_PADRAO, help='Palavras por resumo, em média.')
+    parser.add_argument('--zipf', type=float, default=EXPOENTE_ZIPF, help='Expoente da lei de Zipf (padrão 1.07).')
+    parser.add_argument('--semente', '-s', type=int, default=42)
+    parser.add_argument('--stopwords', help='stopwords.txt (padrão: o da raiz do projeto).')
+    args = parser.parse_args(argv)
+    stopwords = Path(args.stopwords) if args.stopwords else Path(__file__).resolve().parent.parent / 'stopwords.txt'
+    out = gerar_corpus(Path(args.saida), args.docs, args.vocabulario, args.tamanho, args.semente, args.zipf, stopwords)
+    print(f"{args.docs} documentos gravados em: {out}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main(sys.argv[1:]))
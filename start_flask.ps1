@@ -6,6 +6,10 @@ Write-Host "Limpando cache..."
 Get-ChildItem -Recurse -Directory -Filter "__pycache__" | Remove-Item -Recurse -Force -ErrorAction SilentlyContinue
 Get-ChildItem -Recurse -Include *.pyc | Remove-Item -Force -ErrorAction SilentlyContinue
 
+# Refaz só as etapas do índice que mudaram (o servidor não gera índice durante as requisições)
+Write-Host "Atualizando indice..."
+if ($env:SRI_SHARDS) { python Logica\construcao.py --shards $env:SRI_SHARDS } else { python Logica\construcao.py }
+
 # Roda o Flask com debug e reload
 Write-Host "Iniciando Flask..."
 python app.py
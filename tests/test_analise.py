@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Logica.analise import dobrar_acentos, radical
+
+# (palavra, radical esperado): singular e plural de cada par têm que cair no mesmo radical
+CASOS = [
+    ("país", "pais"),
+    ("pais", "pais"),
+    ("países", "pais"),
+    ("português", "portugues"),
+    ("portugueses", "portugues"),
+    ("inglês", "ingles"),
+    ("ingleses", "ingles"),
+    ("meses", "mes"),
+    ("hipótese", "hipotese"),
+    ("hipóteses", "hipotese"),
+    ("mais", "mais"),
+    ("cais", "cais"),
+    ("jornais", "jornal"),
+    ("anéis", "anel"),
+    ("funis", "funil"),
+    ("estádios", "estadio"),
+    ("torcidas", "torcido"),
+    ("jogadoras", "jogador"),
+    ("competições", "competicao"),
+    ("classes", "classe"),
+    ("congresso", "congresso"),
+]
+
+
+@pytest.mark.parametrize("palavra, esperado", CASOS)
+def test_radical(palavra, esperado):
+    assert radical(dobrar_acentos(palavra)) == esperado
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+import app as aplicacao
+from Logica.gerenciador_indice import GerenciadorIndice
+
+
+@pytest.fixture()
+def cliente():
+    return aplicacao.app.test_client()
+
+
+# (texto digitado, sugestão esperada): as sugestões vêm na forma escrita nos documentos, não no radical sem acento
+@pytest.mark.parametrize("q, esperada", [
+    ("está", "estádios"),
+    ("torc", "torcidas"),
+    ("futebol fem", "futebol feminino"),
+])
+def test_autocomplete_forma_escrita(cliente, q, esperada):
+    dados = cliente.get("/autocomplete", query_string={"q": q}).get_json()
+    assert esperada in [s["consulta"] for s in dados["sugestoes"]]
+    assert all(s["consulta"].endswith(s["termo"]) for s in dados["sugestoes"])
+
+
+#Índice que não carrega: o autocompletar responde vazio em vez de 500
+def test_autocomplete_sem_indice(cliente, monkeypatch, tmp_path):
+    monkeypatch.setattr(aplicacao, "gerenciador", GerenciadorIndice(tmp_path))
+    resp = cliente.get("/autocomplete", query_string={"q": "fut"})
+    assert resp.status_code == 200
+    assert resp.get_json() == {"prefixo": "fut", "sugestoes": []}
+
+
+#Os mesmos campos valem na busca única (GET ou JSON), no /api/resultados e em cada item do lote
+@pytest.mark.parametrize("pedido", [
+    {"q": "futebol", "modelo": "bm25", "page": 2, "page_size": 3},
+    {"consulta": "futebol", "modelo": "bm25", "page": "2", "page_size": "3"},
+])
+def test_mesmos_campos_em_toda_api(cliente, pedido):
+    esperado = cliente.get("/api/search", query_string=pedido).get_json()
+    assert (esperado["page"], esperado["page_size"], len(esperado["resultados"])) == (2, 3, 3)
+    assert cliente.post("/api/search", json=pedido).get_json() == esperado
+
+    alias = cliente.get("/api/resultados", query_string=pedido).get_json()
+    assert [r["DocId"] for r in alias["resultados"]] == [r["DocId"] for r in esperado["resultados"]]
+    assert alias["total"] == esperado["total"] and "facetas" in alias
+
+    lote = cliente.post("/api/search/batch", json={"consultas": [pedido]})
+    assert lote.status_code == 200
+    item = lote.get_json()["resultados"][0]
+    assert {k: item[k] for k in esperado if k != "geracao"} == {k: v for k, v in esperado.items() if k != "geracao"}
+
+
+def test_lote_aceita_q(cliente):
+    lote = {"consultas": [{"q": "futebol"}, "futebol feminino"], "modelo": "bm25", "top_k": 2}
+    resp = cliente.post("/api/search/batch", json=lote)
+    assert resp.status_code == 200
+    consultas = [(r["consulta"], len(r["resultados"])) for r in resp.get_json()["resultados"]]
+    assert consultas == [("futebol", 2), ("futebol feminino", 2)]
+    assert cliente.post("/api/search/batch", json={"consultas": [{"q": " "}]}).status_code == 400
@@ -0,0 +1,64 @@
+import math
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Logica.busca_bm25 import B_PADRAO, K1_PADRAO, IndiceBM25
+
+# Corpus sorteado (semente fixa): termos com df bem diferentes, pra o MaxScore ter termos não essenciais a pular
+_rng = random.Random(7)
+_VOCAB = [f"t{i}" for i in range(40)]
+DOCS = {
+    3 * d + 1: {t: _rng.randint(1, 4) for t in _rng.sample(_VOCAB[:8] * 3 + _VOCAB, _rng.randint(3, 15))}
+    for d in range(200)
+}
+
+# (termos da consulta com o peso, top_k, filtro em posições densas)
+CASOS = [
+    ({"t0": 1.0}, 10, None),
+    ({"t0": 1.0, "t1": 1.0}, 1, None),
+    ({"t0": 1.0, "t1": 1.0, "t30": 1.0}, 5, None),
+    ({"t2": 2.0, "t35": 1.0, "t39": 1.0}, 20, None),
+    ({t: 1.0 for t in _VOCAB[:12]}, 10, None),
+    ({t: 1.0 for t in _VOCAB}, 3, None),
+    ({"t0": 1.0, "t20": 1.0}, None, None),
+    ({"t0": 1.0, "t20": 1.0}, 10, list(range(0, 200, 2))),
+    ({"t0": 1.0, "t20": 1.0}, 10, [5, 17, 180]),
+    ({"t0": 1.0, "t20": 1.0}, 10, []),
+    ({"inexistente": 1.0}, 10, None),
+]
+
+
+#BM25 exaustivo, termo a termo, com a fórmula do livro
+def _exaustivo(query_vec, filtro):
+    doc_ids = sorted(DOCS)
+    tamanhos = {d: sum(DOCS[d].values()) for d in doc_ids}
+    media = sum(tamanhos.values()) / len(doc_ids)
+    permitidos = set(doc_ids) if filtro is None else {doc_ids[p] for p in filtro}
+    scores = {}
+    for t, w in query_vec.items():
+        df = sum(1 for d in doc_ids if t in DOCS[d])
+        if not df:
+            continue
+        idf = math.log(1.0 + (len(doc_ids) - df + 0.5) / (df + 0.5))
+        for d in permitidos:
+            tf = DOCS[d].get(t, 0)
+            if tf:
+                norm = 1.0 - B_PADRAO + B_PADRAO * tamanhos[d] / media
+                scores[d] = scores.get(d, 0.0) + w * idf * tf * (K1_PADRAO + 1.0) / (tf + K1_PADRAO * norm)
+    return scores
+
+
+@pytest.mark.parametrize("query_vec, top_k, filtro", CASOS)
+def test_maxscore_igual_ao_exaustivo(query_vec, top_k, filtro):
+    esperado = _exaustivo(query_vec, filtro)
+    resultado = IndiceBM25(DOCS).buscar_vetor(query_vec, top_k, filtro)
+    assert len(resultado) == min(top_k or len(esperado), len(esperado))
+    # os k melhores em ordem (empate: menor DocId primeiro), com o score exato de cada um
+    ordem = sorted(esperado, key=lambda d: (-esperado[d], d))
+    assert [r["DocId"] for r in resultado] == ordem[:len(resultado)]
+    assert all(r["score"] == pytest.approx(esperado[r["DocId"]]) for r in resultado)
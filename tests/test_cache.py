@@ -0,0 +1,83 @@
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from Logica.cache_resultados import CacheResultados
+from Logica.construcao import construir
+from Logica.gerenciador_indice import GerenciadorIndice
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+# (operações, valor lido no fim, contadores esperados). Operações: ("g", geração, chave, valor) guarda,
+# ("o", geração, chave) lê e ("t", segundos) avança o relógio; capacidade 2 e TTL de 10s
+CASOS = [
+    ([("g", 1, "a", "A")], (1, "a"), "A", {"acertos": 1}),
+    ([("g", 1, "a", "A")], (2, "a"), None, {"faltas": 1, "invalidacoes": 1}),
+    ([("g", 2, "a", "A"), ("g", 1, "a", "velho")], (2, "a"), "A", {"acertos": 1}),
+    ([("g", 1, "a", "A"), ("o", 2, "a"), ("g", 1, "a", "velho")], (2, "a"), None,
+     {"faltas": 2, "invalidacoes": 1}),
+    ([("g", 1, "a", "A"), ("t", 11)], (1, "a"), None, {"faltas": 1, "expirados": 1}),
+    ([("g", 1, "a", "A"), ("t", 9)], (1, "a"), "A", {"acertos": 1}),
+    ([("g", 1, "a", "A"), ("g", 1, "b", "B"), ("g", 1, "c", "C")], (1, "a"), None, {"faltas": 1, "despejos": 1}),
+    ([("g", 1, "a", "A"), ("g", 1, "b", "B"), ("o", 1, "a"), ("g", 1, "c", "C")], (1, "a"), "A",
+     {"acertos": 2, "despejos": 1}),
+]
+
+
+@pytest.mark.parametrize("operacoes, leitura, esperado, contadores", CASOS)
+def test_cache(operacoes, leitura, esperado, contadores):
+    relogio = Relogio()
+    cache = CacheResultados(capacidade=2, ttl=10, relogio=relogio)
+    for op, *args in operacoes:
+        if op == "g":
+            cache.guardar(*args)
+        elif op == "o":
+            cache.obter(*args)
+        else:
+            relogio.agora += args[0]
+    assert cache.obter(*leitura) == esperado
+    estado = cache.estado()
+    for nome in ("acertos", "faltas", "despejos", "expirados", "invalidacoes"):
+        assert estado[nome] == contadores.get(nome, 0), nome
+
+
+#Pelo gerenciador: consultas que a análise deixa iguais dividem a entrada, e a geração publicada por um build novo
+#nunca responde com o resultado guardado da anterior
+def test_recarga_invalida(tmp_path):
+    jsons = tmp_path / "JSONs"
+    jsons.mkdir()
+    shutil.copy(RAIZ / "JSONs" / "metadados.json", jsons / "metadados.json")
+    shutil.copy(RAIZ / "stopwords.txt", tmp_path / "stopwords.txt")
+    construir(jsons, tmp_path / "stopwords.txt", lsa=0, vizinhos=0)
+    gerenciador = GerenciadorIndice(jsons, stopwords=tmp_path / "stopwords.txt")
+
+    for modelo in ("booleano", "bm25"):
+        _, a = gerenciador.buscar("Basquete", modelo, top_k=10)
+        _, b = gerenciador.buscar("basquete", modelo, top_k=10)
+        assert a is b and a.total == 0
+    assert gerenciador.cache.estado()["acertos"] == 2
+
+    metadados = json.loads((jsons / "metadados.json").read_text(encoding="utf-8"))
+    metadados.append({"DocId": 21, "Titulo": "Basquete", "Autor": "Ana Lima", "Filiacao": "UFMG",
+                      "Arquivo": "doc21.pdf", "Resumo": "O basquete universitário."})
+    (jsons / "metadados.json").write_text(json.dumps(metadados, ensure_ascii=False), encoding="utf-8")
+    construir(jsons, tmp_path / "stopwords.txt", lsa=0, vizinhos=0)
+    assert gerenciador.verificar_atualizacao()
+    for modelo in ("booleano", "bm25"):
+        indice, resultado = gerenciador.buscar("basquete", modelo, top_k=10)
+        assert indice.geracao == gerenciador.geracao
+        assert resultado.total == 1
+    assert gerenciador.cache.estado()["invalidacoes"] == 1
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Logica.analise import dobrar_acentos
+from Logica.correcao_termos import MAX_CORRECOES, CorretorTermos
+
+DFS = {"futebol": 9, "futsal": 4, "futuro": 4, "estadio": 7, "estado": 7, "estatuto": 1, "gol": 5, "golo": 2,
+       "torcido": 6, "torcedor": 3, "clube": 8, "clubes": 1, "ação": 2, "acao": 3, "juiz": 2, "juizes": 1}
+FORMAS = {"torcido": "torcida", "estadio": "estádio"}
+
+# (termo digitado, correções esperadas): vale a menor distância sem acento; no empate, a distância com acento e
+# depois o maior df
+CASOS = [
+    ("futebl", ("futebol",)),
+    ("fuetbol", ("futebol",)),
+    ("futbol", ("futebol",)),
+    ("estadoi", ("estado",)),
+    ("estdio", ("estadio",)),
+    ("estadi", ("estadio", "estado")),
+    ("torcid", ("torcido",)),
+    ("açao", ("acao", "ação")),
+    ("açãoo", ("ação", "acao")),
+    ("clubr", ("clube",)),
+    ("jiuz", ()),
+    ("futebol", ()),
+    ("go", ()),
+    ("1234", ()),
+    ("xyzwq", ()),
+]
+
+
+def _distancia(a, b):
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = atual
+    return anterior[-1]
+
+
+#Varre o vocabulário inteiro com a distância sem limite (o que o índice de trigramas evita)
+def _forca_bruta(termo):
+    if termo in DFS or len(termo) < 3 or termo.isdigit():
+        return ()
+    alvo = dobrar_acentos(termo)
+    limite = 1 if len(alvo) <= 5 else 2
+    achados = sorted((_distancia(alvo, dobrar_acentos(t)), _distancia(termo, t), -df, t) for t, df in DFS.items())
+    achados = [a for a in achados if a[0] <= limite]
+    return tuple(a[3] for a in achados[:MAX_CORRECOES] if a[0] == achados[0][0]) if achados else ()
+
+
+@pytest.fixture(scope="module")
+def corretor():
+    return CorretorTermos(DFS, formas=lambda: FORMAS)
+
+
+@pytest.mark.parametrize("termo, esperado", CASOS)
+def test_corrigir(corretor, termo, esperado):
+    assert corretor.corrigir(termo) == esperado
+    assert corretor.corrigir(termo) == _forca_bruta(termo)
+
+
+# (consulta, sugestão): operadores, curingas e palavras certas ficam; a correção aparece na forma escrita
+@pytest.mark.parametrize("consulta, sugestao", [
+    ("futebl", "futebol"),
+    ("Futebl AND torcidas", "Futebol AND torcidas"),
+    ("torcid OR estdio", "torcida OR estádio"),
+    ("futebol NOT clube", None),
+    ("futeb* AND golo", None),
+    ("fuetbol NEAR/2 clube", "futebol NEAR/2 clube"),
+])
+def test_sugerir_consulta(corretor, consulta, sugestao):
+    assert corretor.sugerir_consulta(consulta) == sugestao
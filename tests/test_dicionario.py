@@ -0,0 +1,52 @@
+import sys
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Logica.dicionario_termos import DicionarioTermos
+from Logica.indice_invertido import construir_indice_invertido
+from Logica.motor_bitset import MotorBitset
+
+DFS = {"futebol": 9, "futsal": 4, "fut": 1, "futuro": 4, "furacao": 2, "estadio": 7, "estado": 7, "estatuto": 1,
+       "estadual": 3, "gol": 5, "goleiro": 5, "golaco": 1, "ação": 2, "acao": 3, "a": 1, "zebra": 1}
+
+PADROES = ["fut*", "fut?", "fut??ol", "*", "est*o", "esta?o", "*ol", "g*o", "?", "a*", "ação", "futebol", "fute",
+           "x*", "**", "f*t*", "est*d*l"]
+PREFIXOS = ["f", "fu", "fut", "est", "esta", "g", "gol", "a", "z", "q", ""]
+
+
+@pytest.fixture(scope="module")
+def dicionario():
+    return DicionarioTermos(DFS)
+
+
+#Curinga: mesmos termos do fnmatch sobre o vocabulário inteiro, em ordem alfabética
+@pytest.mark.parametrize("padrao", PADROES)
+def test_expandir(dicionario, padrao):
+    assert dicionario.expandir(padrao) == tuple(t for t in sorted(DFS) if fnmatchcase(t, padrao))
+
+
+#Autocompletar: os de maior df que começam com o prefixo (empate em ordem alfabética), pré-calculados ou não
+@pytest.mark.parametrize("prefixo", PREFIXOS)
+@pytest.mark.parametrize("n", [1, 3, 10])
+def test_completar(dicionario, prefixo, n):
+    esperado = sorted(((t, df) for t, df in DFS.items() if prefixo and t.startswith(prefixo)), key=lambda x: (-x[1], x[0]))
+    assert dicionario.completar(prefixo, n) == tuple(esperado[:n])
+
+
+# (consulta com curinga, DocIds): o curinga é o OR dos termos que casam, e entra nos operadores como um termo
+@pytest.mark.parametrize("consulta, esperado", [
+    ("fut*", [1, 2, 3]),
+    ("fut* AND NOT futebol", [2, 3]),
+    ("gol?", []),
+    ("gol*", [3, 4]),
+    ("est?do AND gol*", [4]),
+    ("est?d?o", [1]),
+    ("NOT fut*", [4]),
+])
+def test_curinga_no_motor(consulta, esperado):
+    docs = {1: {"futebol", "estadio"}, 2: {"futsal"}, 3: {"futuro", "goleiro"}, 4: {"gol", "estado"}}
+    assert MotorBitset(construir_indice_invertido(docs)).buscar(consulta) == esperado
@@ -0,0 +1,74 @@
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Logica.facetas import IndiceFacetas, normalizar_filtros, posicoes_de_bits
+from Logica.motor_bitset import _posicoes_para_bitset
+
+METAS = [
+    {"DocId": 10, "Autor": "Ana Lima, Rui Alves", "Filiacao": "UFSC", "Arquivo": "a.pdf"},
+    {"DocId": 11, "Autor": "Ana Lima", "Filiacao": "USP", "Arquivo": "b.pdf"},
+    {"DocId": 12, "Autor": "Rui Alves", "Filiacao": "ufsc", "Arquivo": "c.pdf"},
+    {"DocId": 13, "Autor": "José Souza", "Filiacao": "UFSC", "Arquivo": "d.pdf"},
+    {"DocId": 14, "Autor": "Jose  Souza, Ana Lima, Ana Lima", "Filiacao": "", "Arquivo": "e.pdf"},
+    {"DocId": 15, "Filiacao": "UFMG"},
+]
+DOC_IDS = [m["DocId"] for m in METAS]
+
+# (filtros como chegam da API, DocIds que passam): valores do mesmo campo são OR, campos diferentes são AND, e a
+# comparação ignora acento, caixa e espaços
+FILTROS = [
+    ({"Filiacao": "UFSC"}, [10, 12, 13]),
+    ({"Filiacao": ["usp", "UFMG"]}, [11, 15]),
+    ({"Autor": "ana lima"}, [10, 11, 14]),
+    ({"Autor": "José Souza"}, [13, 14]),
+    ({"Autor": ["Ana Lima"], "Filiacao": ["UFSC"]}, [10]),
+    ({"Autor": ["Rui Alves", "José Souza"], "Filiacao": "ufsc"}, [10, 12, 13]),
+    ({"Filiacao": "Unicamp"}, []),
+    ({"Filiacao": ["", "  "]}, DOC_IDS),
+    ({}, DOC_IDS),
+]
+
+
+@pytest.fixture(scope="module")
+def facetas():
+    return IndiceFacetas(DOC_IDS, METAS)
+
+
+def _docs(bits):
+    return [DOC_IDS[p] for p in posicoes_de_bits(bits, len(DOC_IDS))]
+
+
+@pytest.mark.parametrize("filtros, esperado", FILTROS)
+def test_filtro(facetas, filtros, esperado):
+    bits = facetas.filtro(normalizar_filtros(filtros))
+    assert (DOC_IDS if bits is None else _docs(bits)) == esperado
+
+
+def test_campo_desconhecido():
+    with pytest.raises(ValueError):
+        normalizar_filtros({"Titulo": "x"})
+
+
+#Contagem dentro do resultado, pelo caminho dos documentos (resultado pequeno) ou dos bitsets (grande): os valores
+#mais frequentes, no empate em ordem do rótulo, com o rótulo da primeira forma vista
+@pytest.mark.parametrize("resultado", [[10], [10, 14], [11, 12, 13], DOC_IDS, []])
+@pytest.mark.parametrize("n", [1, 2, 10])
+def test_contar(facetas, resultado, n):
+    bits = _posicoes_para_bitset([DOC_IDS.index(d) for d in resultado], len(DOC_IDS))
+    contado = facetas.contar(bits, n=n)
+    rotulos = {"Autor": {"ana lima": "Ana Lima", "rui alves": "Rui Alves", "jose souza": "José Souza"},
+               "Filiacao": {"ufsc": "UFSC", "usp": "USP", "ufmg": "UFMG"}}
+    for campo in ("Autor", "Filiacao", "Arquivo"):
+        contagem = Counter()
+        for meta in METAS:
+            if meta["DocId"] in resultado and meta.get(campo):
+                partes = meta[campo].split(",") if campo == "Autor" else [meta[campo]]
+                chaves = {" ".join(p.lower().replace("é", "e").split()) for p in partes}
+                contagem.update(rotulos.get(campo, {}).get(c, c) for c in chaves)
+        esperado = sorted(contagem.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+        assert [(f["valor"], f["contagem"]) for f in contado[campo]] == esperado
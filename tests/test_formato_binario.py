@@ -0,0 +1,91 @@
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Logica.formato_binario import CAMPOS, IndiceBinario, _CABECALHO, gravar_indice_binario
+from Logica.tokenizacao import posicoes_termos
+
+# (metadados, contagens {DocId: {termo: tf}}, resumos preparados): o que é gravado tem que voltar igual
+CASOS = {
+    "pequeno": (
+        [{"DocId": 1, "Titulo": "Futebol", "Autor": "Ana", "Filiacao": "UFSC", "Arquivo": "a.pdf",
+          "Resumo": "Futebol e clubes."},
+         {"DocId": 4, "Título": "Clubes", "Autor": "Bia", "Resumo": "Clubes de futebol."}],
+        {1: {"futebol": 1, "clube": 1}, 4: {"clube": 1, "futebol": 1}},
+        {1: "futebol clube", 4: "clube futebol"},
+    ),
+    # tf e deltas de linha nas fronteiras do varint (1, 2 e 3 bytes), DocIds esparsos e de 64 bits
+    "varints": (
+        [{"DocId": d} for d in (0, 127, 128, 2 ** 40)],
+        {0: {"a": 127}, 127: {"a": 128, "b": 16383}, 128: {"b": 16384}, 2 ** 40: {"a": 1, "b": 2 ** 21}},
+        {},
+    ),
+    # termos com acento e fora do ASCII (ordem por bytes UTF-8), documento sem termo nenhum
+    "utf8": (
+        [{"DocId": 2, "Resumo": "ação órgão"}, {"DocId": 3, "Resumo": ""}, {"DocId": 9, "Autor": "Zé Ñandú"}],
+        {2: {"acao": 2, "orgao": 1, "ção": 1}, 3: {}, 9: {"zé": 1, "ñandú": 3}},
+        {2: "acao orgao acao ção"},
+    ),
+}
+
+
+@pytest.fixture(params=list(CASOS))
+def gravado(request, tmp_path):
+    metadados, contagens, preparados = CASOS[request.param]
+    path = gravar_indice_binario(tmp_path / "indice.bin", metadados, contagens, preparados)
+    return IndiceBinario(path), metadados, contagens, preparados
+
+
+def test_ida_e_volta(gravado):
+    ind, metadados, contagens, preparados = gravado
+    doc_ids = sorted(contagens)
+    assert list(ind.doc_ids) == doc_ids and len(ind) == len(doc_ids)
+    assert list(ind.tamanhos) == [sum(contagens[d].values()) for d in doc_ids]
+    assert ind.n_tokens == sum(sum(c.values()) for c in contagens.values())
+
+    postings = {}
+    for linha, d in enumerate(doc_ids):
+        for termo, tf in contagens[d].items():
+            postings.setdefault(termo, []).append((linha, tf))
+    assert ind.dfs() == {t: len(p) for t, p in postings.items()}
+    assert [ind.termo(i) for i in range(ind.n_termos)] == sorted(postings, key=lambda t: t.encode("utf-8"))
+    for termo, lista in postings.items():
+        assert ind.postings_linhas(termo) == lista
+        assert ind.lista(termo) == [doc_ids[linha] for linha, _ in lista]
+    assert ind.linhas_tfs("inexistente") is None and ind.df("inexistente") == 0
+
+    for linha, d in enumerate(doc_ids):
+        termos, tfs = ind.termos_da_linha(linha)
+        assert {ind.termo(int(t)): int(tf) for t, tf in zip(termos, tfs)} == contagens[d]
+        for termo, posicoes in posicoes_termos(preparados.get(d, "")).items():
+            if termo in contagens[d]:
+                assert ind.posicoes(termo, linha) == posicoes
+        # momentos: a norma TF-IDF sai deles pra qualquer N
+        n = 1000
+        norma2 = sum((tf * (math.log(n) - math.log(len(postings[t])))) ** 2 for t, tf in contagens[d].items())
+        a, b, c = ind.momentos[linha]
+        assert math.log(n) ** 2 * a - 2 * math.log(n) * b + c == pytest.approx(norma2, rel=1e-9, abs=1e-9)
+
+    for meta in metadados:
+        doc = ind.documento(meta["DocId"])
+        assert doc["Titulo"] == (meta.get("Titulo") or meta.get("Título") or "")
+        assert all(doc[c] == str(meta.get(c) or "") for c in CAMPOS if c not in ("Titulo", "ResumoPreparado"))
+        assert doc["ResumoPreparado"] == preparados.get(meta["DocId"], "")
+    assert ind.documento(-1) == {} and ind.linha(-1) is None
+
+
+@pytest.mark.parametrize("campo, valor, erro", [(0, b"XXXX", "não é um índice"), (1, 99, "não suportada")])
+def test_cabecalho_invalido(tmp_path, campo, valor, erro):
+    metadados, contagens, preparados = CASOS["pequeno"]
+    path = gravar_indice_binario(tmp_path / "indice.bin", metadados, contagens, preparados)
+    dados = bytearray(path.read_bytes())
+    cab = list(_CABECALHO.unpack_from(dados, 0))
+    cab[campo] = valor
+    _CABECALHO.pack_into(dados, 0, *cab)
+    path.write_bytes(bytes(dados))
+    with pytest.raises(ValueError, match=erro):
+        IndiceBinario(path)
@@ -0,0 +1,110 @@
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from Logica.construcao import construir
+from Logica.gerenciador_indice import Indice
+from Logica.indexacao_incremental import EstadoIncremental
+from Logica.preparacao import carregar_stopwords
+
+NOVOS = [
+    {"DocId": 21, "Titulo": "Basquete universitário", "Autor": "Ana Lima", "Filiacao": "UFMG",
+     "Arquivo": "doc21.pdf", "Resumo": "O basquete universitário e o futebol de várzea dividem quadras e torcidas."},
+    # sem "futebol", que está em todos os documentos da base (idf zero lá, positivo no corpus final)
+    {"DocId": 22, "Titulo": "Natação amadora", "Autor": "Rui Alves", "Filiacao": "UFPR",
+     "Arquivo": "doc22.pdf", "Resumo": "O objetivo do estudo é a saúde de atletas amadores de natação."},
+]
+ATUALIZADO = {"DocId": 3, "Titulo": "Torcidas organizadas", "Autor": "Paulo Reis", "Filiacao": "USP",
+              "Arquivo": "doc3.pdf", "Resumo": "Torcidas organizadas, violência e estádios de futebol no Brasil."}
+REMOVIDO = 7
+
+CONSULTAS = ["futebol", "futebol objetivo", "torcidas organizadas", "basquete", "futebl", "violência estádios",
+             "clube pesquisador", "futebol AND NOT torcida", "torcida OR basquete", "futeb*", '"torcidas organizadas"',
+             '"violência e estádios"', 'torcidas NEAR/2 violência', '"clubes de futebol"', 'futebol NEAR/2 várzea']
+
+
+def _corpus(destino: Path) -> Path:
+    jsons = destino / "JSONs"
+    jsons.mkdir(parents=True)
+    shutil.copy(RAIZ / "JSONs" / "metadados.json", jsons / "metadados.json")
+    shutil.copy(RAIZ / "stopwords.txt", destino / "stopwords.txt")
+    return jsons
+
+
+#O mesmo corpus de dois jeitos: a base com os segmentos (dois novos, um substituído e uma lápide) por cima, e o
+#corpus final reconstruído do zero
+@pytest.fixture(scope="module")
+def indices(tmp_path_factory):
+    incremental = _corpus(tmp_path_factory.mktemp("incremental"))
+    construir(incremental, incremental.parent / "stopwords.txt", lsa=0)
+    estado = EstadoIncremental(incremental)
+    stops = carregar_stopwords(incremental.parent / "stopwords.txt")
+    for novo in NOVOS:
+        estado.adicionar(novo, stops)
+    estado.atualizar(ATUALIZADO, stops)
+    estado.remover(REMOVIDO)
+
+    completo = _corpus(tmp_path_factory.mktemp("completo"))
+    metadados = json.loads((completo / "metadados.json").read_text(encoding="utf-8"))
+    metadados = [m for m in metadados if m["DocId"] not in (ATUALIZADO["DocId"], REMOVIDO)] + NOVOS + [ATUALIZADO]
+    (completo / "metadados.json").write_text(json.dumps(metadados, ensure_ascii=False), encoding="utf-8")
+    construir(completo, completo.parent / "stopwords.txt", lsa=0)
+    return (Indice(incremental, stopwords=incremental.parent / "stopwords.txt"),
+            Indice(completo, stopwords=completo.parent / "stopwords.txt"))
+
+
+def _scores(resultado):
+    return dict(resultado.pagina(0, resultado.total))
+
+
+def test_mesmo_corpus(indices):
+    sobreposto, completo = indices
+    assert not sobreposto.incremental.vazio
+    assert len(sobreposto) == len(completo)
+    assert sobreposto.motor_booleano.doc_ids == completo.motor_booleano.doc_ids
+    d, c = sobreposto.dicionario, completo.dicionario
+    assert dict(zip(d.termos, d.dfs)) == dict(zip(c.termos, c.dfs))
+
+
+@pytest.mark.parametrize("consulta", CONSULTAS)
+def test_booleano_e_bm25_iguais(indices, consulta):
+    sobreposto, completo = indices
+    for modelo in ("booleano", "bm25"):
+        a = sobreposto.buscar(modelo, consulta)
+        b = completo.buscar(modelo, consulta)
+        assert a.pagina(0, a.total) == b.pagina(0, b.total)
+
+
+@pytest.mark.parametrize("consulta", CONSULTAS)
+def test_vetorial_e_hibrido_iguais(indices, consulta):
+    sobreposto, completo = indices
+    for modelo in ("vetorial", "hibrido"):
+        a = _scores(sobreposto.buscar(modelo, consulta))
+        b = _scores(completo.buscar(modelo, consulta))
+        assert a.keys() == b.keys()
+        assert np.allclose([a[d] for d in b], list(b.values()), rtol=1e-5)
+
+
+@pytest.mark.parametrize("doc_id", [1, 3, 4, 21, 22])
+def test_relacionados_com_os_segmentos(indices, doc_id):
+    sobreposto, completo = indices
+    a = dict(sobreposto.relacionados(doc_id, 10))
+    b = dict(completo.relacionados(doc_id, 10))
+    assert a.keys() == b.keys()
+    assert np.allclose([a[d] for d in b], list(b.values()), rtol=1e-5)
+
+
+def test_removido_some(indices):
+    sobreposto, _ = indices
+    assert sobreposto.meta(REMOVIDO) == {}
+    assert sobreposto.relacionados(REMOVIDO) == []
+    assert all(REMOVIDO not in dict(sobreposto.relacionados(d)) for d in (1, 3, 21))
+    # um documento da base acha os dos segmentos
+    assert 21 in dict(sobreposto.relacionados(3))
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Logica.busca_booleana import _eval_postfix_for_doc, _infix_to_postfix, _tokenize_query, busca_booleana_indice
+from Logica.indice_invertido import construir_indice_invertido
+from Logica.motor_bitset import MotorBitset, _chave_consulta
+
+DOCS = {
+    2: {"futebol", "clube", "estadio"},
+    5: {"futebol", "gol"},
+    7: {"clube", "juiz"},
+    11: {"bola", "campo", "gol"},
+    13: {"futebol", "clube", "gol", "juiz"},
+}
+
+# (consulta, DocIds esperados)
+CONSULTAS = [
+    ("futebol", [2, 5, 13]),
+    ("FUTEBOL", [2, 5, 13]),
+    ("futebol AND clube", [2, 13]),
+    ("futebol OR juiz", [2, 5, 7, 13]),
+    ("futebol AND NOT gol", [2]),
+    ("NOT futebol", [7, 11]),
+    ("NOT (futebol OR clube)", [11]),
+    ("(clube OR bola) AND gol", [11, 13]),
+    ("futebol && !clube", [5]),
+    ("gol || estadio", [2, 5, 11, 13]),
+    ("NOT NOT juiz", [7, 13]),
+    ("inexistente", []),
+    ("NOT inexistente", [2, 5, 7, 11, 13]),
+    ("futebol AND", []),
+    ("", []),
+]
+
+
+@pytest.fixture(scope="module")
+def motor():
+    return MotorBitset(construir_indice_invertido(DOCS))
+
+
+#O motor de bitsets dá o mesmo das listas de postings e da avaliação documento a documento
+@pytest.mark.parametrize("consulta, esperado", CONSULTAS)
+def test_consultas(motor, consulta, esperado):
+    assert motor.buscar(consulta) == esperado
+    assert list(motor.iterar(motor.avaliar(consulta))) == esperado
+    if _tokenize_query(consulta):
+        postfix = _infix_to_postfix(_tokenize_query(consulta))
+        assert busca_booleana_indice(consulta, construir_indice_invertido(DOCS)) == esperado
+        assert [d for d, toks in sorted(DOCS.items()) if _eval_postfix_for_doc(postfix, toks)] == esperado
+
+
+#Consultas que só mudam em caixa, espaços e sinônimos de operador caem no mesmo plano compilado
+@pytest.mark.parametrize("a, b", [
+    ("futebol and clube", "FUTEBOL  AND  clube"),
+    ("futebol && !gol", "futebol AND NOT gol"),
+    ("Futebol OR (Juiz)", "futebol or ( juiz )"),
+])
+def test_mesma_chave(a, b):
+    assert _chave_consulta(a) == _chave_consulta(b)
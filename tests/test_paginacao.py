@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+import app as aplicacao
+from Logica.gerenciador_indice import MODELOS
+from Logica.paginacao import (BLOCO_RANKING, MAX_RANKING, TAMANHO_PAGINA_MAXIMO, TAMANHO_PAGINA_PADRAO, ler_pagina,
+                              prefixo_para, top_k_para)
+
+
+# (page, page_size recebidos, página e tamanho usados)
+@pytest.mark.parametrize("page, page_size, esperado", [
+    (1, 10, (1, 10)),
+    ("3", "25", (3, 25)),
+    (0, 0, (1, 1)),
+    (-4, -1, (1, 1)),
+    ("x", None, (1, TAMANHO_PAGINA_PADRAO)),
+    (2, 10 ** 6, (2, TAMANHO_PAGINA_MAXIMO)),
+])
+def test_ler_pagina(page, page_size, esperado):
+    assert ler_pagina(page, page_size) == esperado
+
+
+# (fim da página, top_k ranqueado, prefixo booleano): blocos inteiros, o ranqueado com folga de 1 e teto
+@pytest.mark.parametrize("fim, top_k, prefixo", [
+    (1, BLOCO_RANKING, BLOCO_RANKING),
+    (BLOCO_RANKING - 1, BLOCO_RANKING, BLOCO_RANKING),
+    (BLOCO_RANKING, 2 * BLOCO_RANKING, BLOCO_RANKING),
+    (BLOCO_RANKING + 1, 2 * BLOCO_RANKING, 2 * BLOCO_RANKING),
+    (MAX_RANKING, MAX_RANKING, MAX_RANKING),
+    (10 * MAX_RANKING, MAX_RANKING, 10 * MAX_RANKING),
+])
+def test_blocos(fim, top_k, prefixo):
+    assert top_k_para(fim) == top_k
+    assert prefixo_para(fim) == prefixo
+
+
+#Andar página a página pela API dá a mesma sequência (e o mesmo total) da primeira página grande, e tem_mais só
+#desliga na última
+@pytest.mark.parametrize("modelo", MODELOS)
+@pytest.mark.parametrize("consulta, tamanho", [("futebol", 3), ("clube OR torcida", 4), ("futebol feminino", 7)])
+def test_paginas_pela_api(modelo, consulta, tamanho):
+    cliente = aplicacao.app.test_client()
+    tudo = cliente.get("/api/search", query_string={"q": consulta, "modelo": modelo, "top_k": 100}).get_json()
+    vistos = []
+    for page in range(1, 100):
+        dados = cliente.get("/api/search", query_string={"q": consulta, "modelo": modelo, "page": page,
+                                                       "page_size": tamanho}).get_json()
+        assert dados["total"] == tudo["total"]
+        vistos += dados["resultados"]
+        if not dados["tem_mais"]:
+            break
+        assert len(dados["resultados"]) == tamanho
+    assert vistos == tudo["resultados"]
+    depois = cliente.get("/api/search", query_string={"q": consulta, "modelo": modelo, "page": page + 1,
+                                                    "page_size": tamanho}).get_json()
+    assert depois["resultados"] == [] and not depois["tem_mais"]
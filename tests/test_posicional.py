@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from Logica.gerenciador_indice import Indice
+from Logica.indice_invertido import construir_indice_invertido
+from Logica.indice_posicional import IndicePosicional, PosicionalBinario, trechos_proximos
+from Logica.motor_bitset import MotorBitset
+from Logica.tokenizacao import posicoes_termos
+
+JSONS = RAIZ / "JSONs"
+
+# (consulta, nº de documentos): frases e NEAR que filtram uma parte dos que têm todos os termos
+CONSULTAS = [('"clubes de futebol"', 2), ('clube AND futebol', 8), ('clube NEAR/2 futebol', 3),
+             ('"futebol profissional"', 2), ('futebol NEAR/2 profissional', 3), ('"objetivo específico"', 2),
+             ('"pesquisa de campo"', 2), ('"violência nos estádios"', 1), ('"futebol feminino"', 1),
+             ('futebol NEAR/1 brasileiro', 3), ('futebol AND NOT "clubes de futebol"', 18),
+             ('"resultados obtidos" OR "pesquisa bibliográfica"', 4), ('"torcidas organizadas"', 0)]
+
+# Textos já preparados (termos analisados, na ordem do resumo: torcida vira torcido) e (consulta, DocIds): a ordem
+# e a distância das palavras contam
+TEXTOS = {
+    1: "torcido organizado futebol estadio",
+    2: "futebol torcido estadio organizado",
+    3: "estadio futebol clube torcido gol organizado",
+    4: "futebol futebol clube",
+}
+FRASES = [('"torcida organizada"', [1]), ('"organizada torcida"', []), ('"futebol clube"', [3, 4]),
+          ('"futebol futebol"', [4]), ('"estadio futebol clube"', [3]), ('torcida NEAR/1 organizada', [1]),
+          ('organizada NEAR/1 torcida', [1]), ('torcida NEAR/2 organizada', [1, 2, 3]),
+          ('"futebol clube" NEAR/1 gol', []), ('"futebol clube" NEAR/2 gol', [3]),
+          ('futebol AND NOT "futebol clube"', [1, 2]), ('"torcida organizada" OR "futebol clube"', [1, 3, 4]),
+          ('"futebol clube" AND torcida', [3]), ('torcida NEAR/9 inexistente', [])]
+# (trechos de a, trechos de b, k, perto?): distância entre o fim de um e o início do outro, em qualquer ordem
+TRECHOS = [([(0, 0)], [(1, 1)], 1, True), ([(0, 0)], [(2, 2)], 1, False), ([(5, 6)], [(2, 3)], 2, True),
+           ([(5, 6)], [(2, 3)], 1, False), ([(2, 5)], [(3, 3)], 0, True),
+           ([(0, 0), (20, 21)], [(9, 9), (23, 23)], 2, True), ([], [(1, 1)], 5, False)]
+
+
+@pytest.mark.parametrize("consulta, esperado", FRASES)
+def test_frase_e_near_em_textos(consulta, esperado):
+    docs = {d: set(t.split()) for d, t in TEXTOS.items()}
+    motor = MotorBitset(construir_indice_invertido(docs), posicional=lambda: IndicePosicional(TEXTOS))
+    assert motor.buscar(consulta) == esperado
+
+
+@pytest.mark.parametrize("a, b, k, perto", TRECHOS)
+def test_trechos_proximos(a, b, k, perto):
+    assert trechos_proximos(a, b, k) is perto
+    assert trechos_proximos(b, a, k) is perto
+
+
+@pytest.fixture(scope="module")
+def indice():
+    indice = Indice(JSONS, stopwords=RAIZ / "stopwords.txt")
+    assert indice.binario is not None and indice.incremental.vazio
+    return indice
+
+
+#As posições lidas do indice.bin são as mesmas que o IndicePosicional tira do resumo preparado
+def test_posicoes_gravadas(indice):
+    posicional = indice.posicional
+    assert isinstance(posicional, PosicionalBinario)
+    for doc_id in indice.binario.doc_ids:
+        resumo = indice.prep(doc_id).get("Resumo", "")
+        for termo, lista in posicoes_termos(resumo).items():
+            assert posicional.posicoes_de(termo, doc_id) == lista
+    assert posicional.posicoes_de("termo_que_nao_existe", indice.binario.doc_ids[0]) == []
+
+
+@pytest.mark.parametrize("consulta, total", CONSULTAS)
+def test_frase_e_near(indice, consulta, total):
+    textos = {d: indice.prep(d).get("Resumo", "") for d in indice.binario.doc_ids}
+    em_memoria = MotorBitset(indice.binario, posicional=lambda: IndicePosicional(textos), stopwords=indice.stopwords)
+    resultado = indice.motor_booleano.buscar(consulta)
+    assert len(resultado) == total
+    assert resultado == em_memoria.buscar(consulta)
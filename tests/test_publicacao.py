@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from Logica.construcao import construir
+from Logica.gerenciador_indice import GerenciadorIndice
+from Logica.publicacao import DIR_PUBLICACOES, MANTER_PUBLICACOES, PONTEIRO, ler_ponteiro
+
+NOVO = {"DocId": 21, "Titulo": "Basquete universitário", "Autor": "Ana Lima", "Filiacao": "UFMG",
+        "Arquivo": "doc21.pdf", "Resumo": "O basquete universitário e o futebol de várzea dividem quadras."}
+
+
+@pytest.fixture()
+def jsons(tmp_path):
+    jsons = tmp_path / "JSONs"
+    jsons.mkdir()
+    shutil.copy(RAIZ / "JSONs" / "metadados.json", jsons / "metadados.json")
+    shutil.copy(RAIZ / "stopwords.txt", tmp_path / "stopwords.txt")
+    construir(jsons, tmp_path / "stopwords.txt", lsa=0, vizinhos=0)
+    return jsons
+
+
+#Grava como o build grava (.tmp + os.replace)
+def _gravar(path: Path, dados: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(dados)
+    os.replace(tmp, path)
+
+
+def _acrescentar(jsons: Path, doc):
+    metadados = json.loads((jsons / "metadados.json").read_text(encoding="utf-8"))
+    _gravar(jsons / "metadados.json", json.dumps(metadados + [doc], ensure_ascii=False).encode("utf-8"))
+
+
+def test_build_em_dia_nao_publica(jsons):
+    ponteiro = ler_ponteiro(jsons)
+    relatorio = construir(jsons, jsons.parent / "stopwords.txt", lsa=0, vizinhos=0)
+    assert relatorio["publicacao"] == "em dia"
+    assert ler_ponteiro(jsons) == ponteiro
+
+
+#Artefatos reescritos na pasta JSONs (um build no meio do caminho) não disparam recarga: só a troca do ponteiro,
+#no fim do build, e uma vez só
+def test_recarrega_so_no_fim_do_build(jsons):
+    gerenciador = GerenciadorIndice(jsons, stopwords=jsons.parent / "stopwords.txt")
+    indice = gerenciador.obter()
+    assert indice.jsons_dir == jsons / ler_ponteiro(jsons)["pasta"]
+    assert len(indice) == 20
+
+    _acrescentar(jsons, NOVO)
+    _gravar(jsons / "indice.bin", b"pela metade")
+    assert not gerenciador.verificar_atualizacao()
+    assert gerenciador.obter().buscar("booleano", "basquete").total == 0
+
+    construir(jsons, jsons.parent / "stopwords.txt", lsa=0, vizinhos=0)
+    assert gerenciador.verificar_atualizacao()
+    assert not gerenciador.verificar_atualizacao()
+    assert gerenciador.recargas == 1
+    novo = gerenciador.obter()
+    assert len(novo) == 21
+    assert novo.buscar("booleano", "basquete").total == 1
+
+
+def test_geracoes_antigas_saem(jsons):
+    for i in range(MANTER_PUBLICACOES + 1):
+        _acrescentar(jsons, dict(NOVO, DocId=100 + i))
+        construir(jsons, jsons.parent / "stopwords.txt", lsa=0, vizinhos=0)
+    pastas = sorted(p.name for p in (jsons / DIR_PUBLICACOES).iterdir())
+    assert len(pastas) == MANTER_PUBLICACOES
+    assert ler_ponteiro(jsons)["pasta"] == f"{DIR_PUBLICACOES}/{pastas[-1]}"
+    assert not (jsons / (PONTEIRO + ".tmp")).exists()
+
+
+#O /health (estado) e o observador avisam quando as fontes mudaram e o build ainda não publicou, sem reconstruir nada
+def test_desatualizado(jsons):
+    gerenciador = GerenciadorIndice(jsons, stopwords=jsons.parent / "stopwords.txt")
+    assert gerenciador.estado()["desatualizado"] is None
+
+    _acrescentar(jsons, NOVO)
+    motivo = gerenciador.estado()["desatualizado"]
+    assert motivo is not None and "metadados.json" in motivo
+    assert gerenciador.obter().buscar("booleano", "basquete").total == 0
+
+    construir(jsons, jsons.parent / "stopwords.txt", lsa=0, vizinhos=0)
+    assert gerenciador.verificar_fontes() is None
+
+    stopwords = jsons.parent / "stopwords.txt"
+    stopwords.write_text(stopwords.read_text(encoding="utf-8") + "\nbasquete\n", encoding="utf-8")
+    assert "stopwords" in gerenciador.verificar_fontes()
+    assert construir(jsons, stopwords, lsa=0, vizinhos=0, verificar=True)["publicacao"] != "em dia"
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from Logica.formato_binario import IndiceBinario, gravar_indice_binario
+from Logica.indexacao_incremental import CorpusVivo, EstadoIncremental, montar_registro
+
+STOPS = {"de", "e", "o", "a"}
+BASE = {1: "futebol de várzea", 2: "torcida e estádio", 3: "clube de futebol profissional"}
+
+# (operações sobre a base, corpus final esperado {DocId: resumo})
+CASOS = [
+    ([("adicionar", 4, "futebol feminino")], {**BASE, 4: "futebol feminino"}),
+    ([("adicionar", 2, "estádio novo do clube")], {**BASE, 2: "estádio novo do clube"}),
+    ([("remover", 3)], {1: BASE[1], 2: BASE[2]}),
+    ([("adicionar", 5, "basquete"), ("remover", 5)], BASE),
+    ([("remover", 1), ("adicionar", 1, "futebol de areia")], {**BASE, 1: "futebol de areia"}),
+    ([("remover", 99)], BASE),
+    ([("adicionar", 4, "vôlei"), ("adicionar", 4, "vôlei de praia"), ("remover", 2)],
+     {1: BASE[1], 3: BASE[3], 4: "vôlei de praia"}),
+    ([("remover", 1), ("remover", 2), ("remover", 3)], {}),
+]
+
+
+def _meta(doc_id, resumo):
+    return {"DocId": doc_id, "Titulo": f"Doc {doc_id}", "Resumo": resumo}
+
+
+def _binario(path: Path, corpus) -> IndiceBinario:
+    contagens = {d: montar_registro(_meta(d, r), STOPS)["Tokens"] for d, r in corpus.items()}
+    return IndiceBinario(gravar_indice_binario(path, [_meta(d, r) for d, r in corpus.items()], contagens))
+
+
+#O CorpusVivo (base + segmentos + lápides) tem os mesmos documentos, df e listas de um índice do corpus final
+def _confere(vivo: CorpusVivo, esperado: IndiceBinario):
+    assert vivo.doc_ids == list(esperado.doc_ids)
+    assert vivo.dfs() == esperado.dfs()
+    assert vivo.n_tokens == esperado.n_tokens
+    assert vivo.tamanhos_np.tolist() == list(esperado.tamanhos)
+    for termo in set(vivo.binario.dfs()) | set(esperado.dfs()):
+        a, b = vivo.linhas_tfs(termo), esperado.linhas_tfs(termo)
+        assert (a is None) == (b is None), termo
+        if a is not None:
+            assert np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1]), termo
+
+
+@pytest.mark.parametrize("operacoes, final", CASOS)
+def test_segmentos_e_lapides(tmp_path, operacoes, final):
+    base = _binario(tmp_path / "base.bin", BASE)
+    esperado = _binario(tmp_path / "final.bin", final)
+    estado = EstadoIncremental(tmp_path)
+    for op, doc_id, *resumo in operacoes:
+        if op == "adicionar":
+            estado.adicionar(_meta(doc_id, resumo[0]), STOPS)
+        else:
+            estado.remover(doc_id)
+    _confere(CorpusVivo(base, estado), esperado)
+
+    # o log relido do disco, e depois da mescla num segmento só, dá o mesmo corpus
+    _confere(CorpusVivo(base, EstadoIncremental(tmp_path)), esperado)
+    estado.mesclar()
+    relido = EstadoIncremental(tmp_path)
+    assert len(relido.segmentos) <= 1
+    _confere(CorpusVivo(base, relido), esperado)
@@ -0,0 +1,99 @@
+import json
+import random
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from benchmarks.corpus_sintetico import gerar_corpus
+from Logica.construcao import construir
+from Logica.facetas import normalizar_filtros
+from Logica.gerenciador_indice import Indice, MODELOS
+
+N_DOCS = 600
+N_SHARDS = 4
+
+
+@pytest.fixture(scope="module")
+def jsons(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("shards")
+    shutil.copy(RAIZ / "stopwords.txt", pasta / "stopwords.txt")
+    jsons = pasta / "JSONs"
+    gerar_corpus(jsons, N_DOCS, vocabulario=3000, tamanho_medio=60, stopwords=pasta / "stopwords.txt")
+    construir(jsons, pasta / "stopwords.txt", vizinhos=0, lsa=16, shards=N_SHARDS)
+    return jsons
+
+
+@pytest.fixture(scope="module")
+def indices(jsons):
+    base = Indice(jsons, stopwords=jsons.parent / "stopwords.txt")
+    sh = Indice(jsons, stopwords=jsons.parent / "stopwords.txt", shards=N_SHARDS)
+    assert sh.usar_shards
+    yield base, sh
+    sh.fechar()
+
+
+#150 consultas (10 formatos x 15 sorteios entre os termos mais frequentes) com e sem filtro de faceta, nos cinco
+#modelos: os shards dão o mesmo resultado do índice inteiro (nos ranqueados, a menos da ordem de empates)
+def _consultas(base):
+    d = base.dicionario
+    termos = [t for _, t in sorted(zip((-x for x in d.dfs), d.termos))][:400]
+    rng = random.Random(3)
+    consultas = []
+    for _ in range(15):
+        a, b, c = rng.sample(termos, 3)
+        consultas += [a, f"{a} {b}", f"{a} AND {b}", f"{a} OR {b}", f"{a} AND NOT {b}", f"NOT {a}",
+                      f"({a} OR {b}) AND NOT {c}", f"{a[:3]}*", f'"{a} {b}"', a[:-1] + "x" + a[-1]]
+    return consultas
+
+
+def test_mesmos_resultados(indices):
+    base, sh = indices
+    consultas = _consultas(base)
+    assert len(consultas) == 150
+    filiacao = base.meta(base.motor_booleano.doc_ids[0])["Filiacao"]
+    for consulta in consultas:
+        for filtros in ((), normalizar_filtros({"Filiacao": [filiacao]})):
+            for modelo in MODELOS:
+                for k in ((None,) if modelo == "booleano" else (None, 10)):
+                    a = base.buscar(modelo, consulta, k, filtros)
+                    b = sh.buscar(modelo, consulta, k, filtros)
+                    assert a.total == b.total, (consulta, modelo, k)
+                    pa, pb = a.pagina(0, N_DOCS), b.pagina(0, N_DOCS)
+                    if modelo == "booleano":
+                        assert pa == pb, consulta
+                        continue
+                    assert len(pa) == len(pb)
+                    assert all(abs(sa - sb) <= 1e-6 * max(1, abs(sa)) for (_, sa), (_, sb) in zip(pa, pb))
+                    if k is None:
+                        assert {d for d, _ in pa} == {d for d, _ in pb}, (consulta, modelo)
+            assert base.contar_facetas("bm25", consulta, filtros) == sh.contar_facetas("bm25", consulta, filtros)
+
+
+#Um build sem --shards depois de o corpus mudar refaz os shards gravados (mesmo número); shards=0 apaga a pasta, e
+#shards de outro corpus nunca são usados
+def test_shards_acompanham_o_corpus(tmp_path, jsons):
+    copia = tmp_path / "JSONs"
+    shutil.copytree(jsons, copia)
+    stopwords = jsons.parent / "stopwords.txt"
+    metadados = json.loads((copia / "metadados.json").read_text(encoding="utf-8"))
+    (copia / "metadados.json").write_text(json.dumps(metadados[:-1], ensure_ascii=False), encoding="utf-8")
+
+    # shards velhos ao lado do corpus novo (o build ainda não rodou)
+    assert not Indice(copia, stopwords=stopwords, shards=N_SHARDS).usar_shards
+
+    assert construir(copia, stopwords, vizinhos=0, lsa=16, verificar=True)["shards"].startswith("desatualizada")
+    assert construir(copia, stopwords, vizinhos=0, lsa=16)["shards"].startswith(f"refeita ({N_SHARDS} shards")
+    info = json.loads((copia / "shards" / "info.json").read_text(encoding="utf-8"))
+    assert info["n_docs"] == N_DOCS - 1
+    indice = Indice(copia, stopwords=stopwords, shards=N_SHARDS)
+    assert indice.usar_shards
+    indice.fechar()
+
+    assert construir(copia, stopwords, vizinhos=0, lsa=16, shards=0)["shards"] == "apagados"
+    assert not (copia / "shards").exists()
+    assert "shards" not in construir(copia, stopwords, vizinhos=0, lsa=16, verificar=True)
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.append(str(RAIZ))
+
+from Logica.busca_espaco_vetorial import busca_espaco_vetorial
+from Logica.busca_vetorial_esparsa import carregar_matriz_tfidf
+
+TERMOS = RAIZ / "JSONs" / "termos_significativos.json"
+
+CONSULTAS = ["futebol", "torcidas organizadas", "futebol feminino", "violência nos estádios", "clube pesquisa campo",
+             "Futebol FUTEBOL futebol", "palavrainexistente", "", "de a o"]
+
+
+@pytest.fixture(scope="module")
+def matriz():
+    return carregar_matriz_tfidf(str(TERMOS))
+
+
+#A matriz esparsa dá os mesmos scores (e a mesma ordem, empates na ordem dos documentos) da busca por dicionários
+@pytest.mark.parametrize("consulta", CONSULTAS)
+@pytest.mark.parametrize("top_k", [None, 3])
+def test_mesmo_ranking_da_busca_por_dicionarios(matriz, consulta, top_k):
+    esperado = busca_espaco_vetorial(consulta, str(TERMOS), top_k=top_k)
+    resultado = matriz.buscar(consulta, top_k=top_k)
+    assert [r["DocId"] for r in resultado] == [r["DocId"] for r in esperado]
+    assert np.allclose([r["score"] for r in resultado], [r["score"] for r in esperado])
+
+
+#O lote e a pontuação só das linhas filtradas dão o mesmo que uma consulta por vez sobre todas as linhas
+@pytest.mark.parametrize("linhas", [[0], [1, 4, 7, 18], list(range(0, 20, 2))])
+def test_lote_e_linhas(matriz, linhas):
+    lote = matriz.pontuar_lote(CONSULTAS)
+    for consulta, scores in zip(CONSULTAS, lote):
+        assert np.allclose(scores, matriz.pontuar(consulta))
+        assert np.allclose(matriz.pontuar_linhas(consulta, np.asarray(linhas)), scores[linhas])